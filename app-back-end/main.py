@@ -3,19 +3,31 @@ import asyncio
 import uvicorn
 
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
 
-from pickledb import PickleDB
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, Form, Query
+from fastapi import FastAPI, HTTPException, UploadFile, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from web.services.update import update_serv
-from web.services.verify import verify_serv
+from web.services.verify import verify_serv, estimate_verify_memory, VERIFY_WINDOW, VERIFY_MAX_WORKERS
 from web.services.result import result_serv
 from web.services.delete import delete_serv
-from web.services.status import status_serv
+from web.services.cancel import cancel_serv
+from web.services.status import status_serv, status_stream_serv, task_status
 from web.services.generate import gen_serv
+from web.services.mismatch import mismatch_serv, mismatch_compare_serv
+from web.utils.http import close_client
+from web.utils.store import TaskStore
+from web.utils.tuner import ThroughputHistory
+from web.utils.metrics import render_metrics
+from web.utils.events import task_events
+from web.utils.scheduler import JobScheduler, physical_memory
+from web.utils.ingest import ColumnCache, COLUMN_CACHE_BUDGET
+from web.utils.result_cache import ResultCache, RESULT_CACHE_DAYS, RESULT_CACHE_BUDGET
 
 
 OPERA_MAP = ['+', '-', '*', '/', "+'", "/'", '^']
@@ -31,7 +43,19 @@ OPERA_DICT = {
 
 DEFAULT_DIR_OUT = Path("../run-dir/seq_data/")
 DEFAULT_CAL_DIR = Path("../run-dir/par_data/")
-DEFAULT_DB_DIR = Path("../run-dir/tasks.json")
+DEFAULT_DB_DIR = Path("../run-dir/tasks.db")
+DEFAULT_CACHE_DIR = Path("../run-dir/cache/columns/")
+DEFAULT_RESULT_CACHE_DIR = Path("../run-dir/cache/results/")
+LEGACY_DB_DIR = Path("../run-dir/tasks.json")
+TASK_RETENTION_DAYS = 30
+TASK_RETENTION_LIMIT = 10000
+CPU_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+VERIFY_MAX_JOBS = 2
+VERIFY_MEMORY_BUDGET = physical_memory() // 2
+VERIFY_CONF_LEVEL = 0.9999
+VERIFY_ERROR_RATE = 0.001
+VERIFY_BATCH_TIMEOUT = 3600.        # seconds, a batch taking longer is considered stuck
+VERIFY_TASK_TIMEOUT = None          # seconds from the start of a task, no limit by default
 DEFAULT_SCRIPT_DIR = Path("../scripts")
 DEFAULT_COMBINED_FILE = "combinedResult.csv"
 DEFAULT_URI = "http://localhost:9000"
@@ -39,24 +63,52 @@ DEFAULT_URI = "http://localhost:9000"
 os.makedirs(DEFAULT_DIR_OUT, exist_ok=True)
 os.makedirs(DEFAULT_CAL_DIR, exist_ok=True)
 
-tasks: Dict[str, dict] = {}
-db = PickleDB(DEFAULT_DB_DIR)
+tasks: TaskStore
+history: ThroughputHistory
+scheduler: JobScheduler
+column_cache: ColumnCache
+result_cache: ResultCache
+cpu_executor: ProcessPoolExecutor
+
+
+def publish_status(id: str, record: dict):
+    # pushes every change of a watched task to its /stat/stream subscribers
+    if task_events.watched(id):
+        task_events.publish(id, task_status(id, record))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global tasks
+    global tasks, history, scheduler, column_cache, result_cache, cpu_executor
+
+    tasks = TaskStore(DEFAULT_DB_DIR, TASK_RETENTION_DAYS, TASK_RETENTION_LIMIT)
+    imported = tasks.import_json(LEGACY_DB_DIR)
+    if imported:
+        print(f"Imported {imported} tasks from {LEGACY_DB_DIR}")
+    pruned = tasks.prune()
+    interrupted = tasks.interrupt_active("Interrupted by a restart of the backend.")
+    tasks.add_listener(publish_status)
+    history = ThroughputHistory(DEFAULT_DB_DIR)
+    scheduler = JobScheduler(tasks, VERIFY_MAX_JOBS, VERIFY_MEMORY_BUDGET)
+    column_cache = ColumnCache(DEFAULT_CACHE_DIR, COLUMN_CACHE_BUDGET)
+    result_cache = ResultCache(DEFAULT_RESULT_CACHE_DIR, RESULT_CACHE_DAYS, RESULT_CACHE_BUDGET)
+    expired = result_cache.evict()
+    print(
+        f"Opened database: {DEFAULT_DB_DIR} "
+        f"(pruned {pruned} expired tasks, {expired} cached results, interrupted {interrupted} tasks)"
+    )
 
-    tasks = db.get('tasks')
-    if tasks is None:
-        tasks = {}
-    print(f"Loaded database: {DEFAULT_DB_DIR}")
+    # spawned workers don't inherit the event loop and database threads of this process
+    cpu_executor = ProcessPoolExecutor(CPU_WORKERS, mp_context=get_context("spawn"))
 
     yield
 
-    db.set('tasks', tasks)
-    db.save()
-    print(f"Saved database: {DEFAULT_DB_DIR}")
+    await scheduler.shutdown("Interrupted by a shutdown of the backend.")
+    cpu_executor.shutdown(cancel_futures=True)
+    await close_client()
+    history.close()
+    tasks.close()
+    print(f"Closed database: {DEFAULT_DB_DIR}")
 
 
 app = FastAPI(lifespan=lifespan)
@@ -74,9 +126,10 @@ async def file_update(
     file: UploadFile,
     id: str = Form("test"),
     party: str = Form(...),
+    stream: bool = Form(True),
 ):
     try:
-        ret = await update_serv(file, id, party, tasks, DEFAULT_DIR_OUT)
+        ret = await update_serv(file, id, party, tasks, DEFAULT_DIR_OUT, stream)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -95,42 +148,110 @@ async def run_process(
     split_n: int = 0,
     workers: int = 8,
     scale: int = 1,
+    window: int = VERIFY_WINDOW,
+    batch_format: str = "csv",
+    seed: Optional[int] = None,
+    resume: bool = False,
+    auto: bool = False,
+    incremental: bool = True,
+    mode: str = "mpc",
+    priority: int = 0,
+    batch_timeout: Optional[float] = VERIFY_BATCH_TIMEOUT,
+    task_timeout: Optional[float] = VERIFY_TASK_TIMEOUT,
 ):
     try:
-        global tasks
-        asyncio.create_task(
-            verify_serv(
-                id, 
-                operator, 
-                operate, 
-                split_n, 
-                workers, 
-                scale, 
-                0.9999,
-                0.001,
-                tasks,
-                OPERA_DICT,
-                DEFAULT_DIR_OUT,
-                DEFAULT_URI,
-                True
+        global tasks, history, scheduler, column_cache, result_cache, cpu_executor
+        if scheduler.active(id):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Verify task (ID = '{id}') is already queued or running."
+            )
+        if tasks.get(id, {}).get("status") in ("running", "queued"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Task (ID = '{id}') is still running."
+            )
+        if not 1 <= workers <= VERIFY_MAX_WORKERS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid workers: {workers}. Valid range is 1 to {VERIFY_MAX_WORKERS}."
             )
+
+        job = lambda job_slot: verify_serv(
+            id, 
+            operator, 
+            operate, 
+            split_n, 
+            workers, 
+            scale, 
+            VERIFY_CONF_LEVEL,
+            VERIFY_ERROR_RATE,
+            tasks,
+            OPERA_DICT,
+            DEFAULT_DIR_OUT,
+            DEFAULT_URI,
+            True,
+            window=window,
+            batch_format=batch_format,
+            seed=seed,
+            resume=resume,
+            auto=auto,
+            history=history,
+            batch_timeout=batch_timeout,
+            column_cache=column_cache,
+            executor=cpu_executor,
+            result_cache=result_cache,
+            incremental=incremental,
+            mode=mode,
+            job_slot=job_slot
+        )
+        memory = estimate_verify_memory(
+            tasks.get(id, {}).get("length") or 0, split_n, VERIFY_CONF_LEVEL, VERIFY_ERROR_RATE
         )
+        position = scheduler.submit(id, job, memory, priority, task_timeout)
 
+        if position is not None:
+            return {
+                "status": "success",
+                "message": f"Verify task (ID = '{id}') has been queued at position {position}.",
+                "task_id": id,
+                "queue_position": position
+            }
         return {
             "status": "success",
             "message": f"Verify task (ID = '{id}') has been started.",
             "task_id": id
         }
     
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/result")
-async def get_result(id: str = "test"):
+async def get_result(
+    request: Request,
+    id: str = "test",
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+    mismatches_only: bool = False,
+    compress: bool = False,
+):
     try:
-        return await result_serv(id, DEFAULT_DIR_OUT)
+        return await result_serv(
+            id, 
+            DEFAULT_DIR_OUT, 
+            offset=offset, 
+            limit=limit, 
+            mismatches_only=mismatches_only,
+            range_header=request.headers.get("range"),
+            accept_encoding=request.headers.get("accept-encoding"),
+            compress=compress
+        )
     
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -144,6 +265,51 @@ async def delete_files(id: Optional[str] = Query(default=None)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/mismatch")
+async def get_mismatch(
+    id: str = Query(...),
+    offset: int = 0,
+    limit: int = 100,
+    row_from: Optional[int] = None,
+    row_to: Optional[int] = None,
+):
+    try:
+        return await mismatch_serv(id, DEFAULT_DIR_OUT, offset, limit, row_from, row_to)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/mismatch/compare")
+async def compare_mismatch(
+    id: str = Query(...),
+    other: str = Query(...),
+    limit: int = 100,
+):
+    try:
+        global tasks
+        return await mismatch_compare_serv(id, other, tasks, DEFAULT_DIR_OUT, limit)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cancel")
+async def cancel_task(id: str = Query(...)):
+    try:
+        global tasks, scheduler
+        return await cancel_serv(id, tasks, scheduler)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/stat")
 async def get_task_stat(id: str = Query(...)):
     try:
@@ -154,23 +320,46 @@ async def get_task_stat(id: str = Query(...)):
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.get("/stat/stream")
+async def stream_task_stat(id: str = Query(...)):
+    try:
+        global tasks
+        return await status_stream_serv(id, tasks, task_events)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/gen")
 async def generate_data(
     id: str,
     operator: Optional[str],
     data_length: int,
+    seed: Optional[int] = None,
 ):
     try:
-        global tasks
+        global tasks, cpu_executor, scheduler
         return await gen_serv(
             id=id,
             operator=operator,
             data_length=data_length, 
             tasks=tasks,
             OPERA_DICT=OPERA_DICT,
-            DEFAULT_DIR_OUT=DEFAULT_DIR_OUT
+            DEFAULT_DIR_OUT=DEFAULT_DIR_OUT,
+            executor=cpu_executor,
+            scheduler=scheduler,
+            seed=seed
         )
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from web.utils.precheck import (
+    go_log, go_log10, significant_digits, precheck_files, save_precheck, load_precheck, cross_check
+)
+
+# (x, math.Log(x), math.Log10(x), getMantissa(x, 6)) as printed by Go 1.21 on amd64, in hex so the
+# bits are exact: powers of ten, the ends of the log reduction, subnormals, and inputs where
+# glibc's log rounds differently from Go's
+GO_REFERENCE = [
+    ('0x1.c6bf526340000p+49', '0x1.144f69ff9ffc4p+5', '0x1.dffffffffffffp+3', '0x1.e848000000000p+19'),
+    ('0x1.ef2d0f5da7dd9p-84', '-0x1.cc845b54b54f2p+5', '-0x1.9000000000000p+4', '0x1.86a0000000001p+16'),
+    ('0x1.52d02c7e14af6p+76', '0x1.a7acf7dd4aa4fp+5', '0x1.7000000000000p+4', '0x1.869ffffffffffp+16'),
+    ('0x1.431e0fae6d721p+96', '0x1.0b199121c551bp+6', '0x1.cffffffffffffp+4', '0x1.e848000000000p+19'),
+    ('0x1.93e5939a08ceap+99', '0x1.144f69ff9ffc4p+6', '0x1.dffffffffffffp+4', '0x1.e848000000000p+19'),
+    ('0x1.4f8b588e368f1p-17', '-0x1.7069e2aa2aa5bp+3', '-0x1.4000000000000p+2', '0x1.86a0000000000p+16'),
+    ('0x1.0f0cf064dd592p+73', '0x1.95414621954fep+5', '0x1.6000000000000p+4', '0x1.86a0000000000p+16'),
+    ('0x1.7e43c8800759cp+996', '0x1.5963447f87fb5p+9', '0x1.2c00000000000p+8', '0x1.869fffffffffcp+16'),
+    ('0x1.56e1fc2f8f359p-997', '-0x1.5963447f87fb5p+9', '-0x1.2c00000000000p+8', '0x1.86a0000000004p+16'),
+    ('0x1.0000000000000p+0', '0x0.0p+0', '0x0.0p+0', '0x1.869ffffffffffp+16'),
+    ('0x1.4000000000000p+3', '0x1.26bb1bbb55516p+1', '0x1.0000000000000p+0', '0x1.86a0000000000p+16'),
+    ('0x1.999999999999ap-4', '-0x1.26bb1bbb55515p+1', '-0x1.fffffffffffffp-1', '0x1.86a0000000001p+16'),
+    ('0x1.e847f00000000p+19', '0x1.ba18a88c907b9p+3', '0x1.7fffff16d7018p+2', '0x1.e847f00000000p+19'),
+    ('0x1.ad7f2843813c2p-24', '-0x1.01e3b85156a08p+4', '-0x1.c000001750e5ep+2', '0x1.e847fe6666666p+19'),
+    ('0x1.6a09e667f3bcdp-1', '-0x1.62e42fefa39eep-2', '-0x1.34413509f79fep-3', '0x1.594458ff7aee4p+19'),
+    ('0x1.6a09e667f3bccp-1', '-0x1.62e42fefa39f1p-2', '-0x1.34413509f7a00p-3', '0x1.594458ff7aee3p+19'),
+    ('0x0.0000000000001p-1022', '-0x1.628b76e3a7b61p+9', '-0x1.33f424bcb5221p+8', '0x1.b295b16375a30p-35'),
+    ('0x0.012688b70e62bp-1022', '-0x1.628ae3f3c2ff6p+9', '-0x1.33f3a51bf529cp+8', '0x1.f3ffffffe3759p+9'),
+    ('0x1.5bf0a8b145769p+1', '0x1.0000000000000p+0', '0x1.bcb7b1526e50ep-2', '0x1.09750bb3bf4f0p+18'),
+    ('0x1.e240c9fbe76c9p+16', '0x1.77281cad8a844p+3', '0x1.45db61a282513p+2', '0x1.e240c9fbe76c9p+16'),
+    ('0x1.adaccd000d6f9p-126', '-0x1.5b46577a7e61cp+6', '-0x1.2da397c63835cp+5', '0x1.81588af0642a0p+17'),
+    ('0x1.c97105edeb50ep-115', '-0x1.3c869bee970f6p+6', '-0x1.12ee4af521703p+5', '0x1.a417faa2c8d3ep+18'),
+    ('0x1.36048195f087dp+43', '0x1.dff2d000708b1p+4', '0x1.a0e0c1e26ff54p+3', '0x1.a0193caf7400fp+16'),
+    ('0x1.386ca67f13fdbp-60', '-0x1.4b1dfe91b67e7p+5', '-0x1.1f9acea806fd4p+4', '0x1.9d7d82679afb8p+16'),
+    ('0x1.76388286b6eeap+76', '0x1.a87888823cabdp+5', '0x1.70b0d077bd1d8p+4', '0x1.af7277cd7c505p+16'),
+    ('0x1.358de8d2a3d86p+45', '0x1.f61af2e85cb56p+4', '0x1.b41f832c79ebcp+3', '0x1.9f7a0f28c20bdp+18'),
+    ('0x1.9326c347c7a38p-71', '-0x1.861313c4897b7p+5', '-0x1.52d07e0e65678p+4', '0x1.45a9c2522f012p+19'),
+    ('0x1.4b688f0974fa0p-94', '-0x1.039734690d420p+6', '-0x1.c2f483cbcb9f6p+4', '0x1.3f227c7d3e94ap+19'),
+    ('0x1.0d0f4c48b6928p+46', '0x1.fef3d1eaa9163p+4', '0x1.bbcec12493360p+3', '0x1.69203a93c303dp+19'),
+    ('0x1.9ab887c21568ap+106', '0x1.27c90cacb0b7ep+6', '0x1.00ea77ca68c84p+5', '0x1.fc729fbcefe2fp+16'),
+    ('0x1.01e14845c16d2p-87', '-0x1.e25f34f937b82p+5', '-0x1.a2fba00720636p+4', '0x1.3ddc953c157d7p+19'),
+    ('0x1.10b3e707166cap+81', '0x1.c1aa3e3e5fedfp+5', '0x1.8692f60f1626cp+4', '0x1.f70c3ad30d3f5p+17'),
+    ('0x1.c163caccd38c4p-109', '-0x1.2bf618eb449a0p+6', '-0x1.048b07f4cc3d2p+5', '0x1.0820a9f5cf94dp+18'),
+    ('0x1.dc82a08c42b4cp-129', '-0x1.632dbf2568432p+6', '-0x1.3481199ec1b7fp+5', '0x1.0b17de8b396b6p+18'),
+    ('0x1.baa3a62082181p+93', '0x1.040a83075ca6dp+6', '0x1.c3bcd2e36ef94p+4', '0x1.4e72e233b279cp+17'),
+    ('0x1.1463b4a41f77ap+127', '0x1.606ce09779ac4p+6', '0x1.321cdbbc02aacp+5', '0x1.66c628322d215p+17'),
+    ('0x1.fd36bc5ae324ap-18', '-0x1.793f26530c057p+3', '-0x1.47ac1bf548408p+2', '0x1.728076aec3262p+19'),
+    ('0x1.93012ffd4437cp-50', '-0x1.11a0f2f4950bfp+5', '-0x1.db577cf642c9cp+3', '0x1.11162925ec283p+17'),
+    ('0x1.6cc1ca8e949c0p+65', '0x1.6b44dae8e50fep+5', '0x1.3b880ac1fedb6p+4', '0x1.00acc76ed8132p+19'),
+    ('0x1.b07dd6d88f754p-123', '-0x1.52ee4d960e2b7p+6', '-0x1.266440d6ce6f4p+5', '0x1.364c276691038p+17'),
+]
+
+
+def reference(column: int):
+    return np.array([float.fromhex(row[column]) for row in GO_REFERENCE])
+
+
+@pytest.mark.parametrize("emulated, column", [(go_log, 1), (go_log10, 2), (significant_digits, 3)])
+def test_matches_go(emulated, column):
+    values = reference(0)
+    assert emulated(values).tobytes() == reference(column).tobytes()
+
+
+def test_power_of_ten_boundary():
+    # Log10(1e15) is just below 15 in Go, so its 6 significant digits are 1000000, not 100000
+    assert go_log10(np.array([1e15]))[0] == 14.999999999999998
+    assert significant_digits(np.array([1e15]))[0] == 1e6
+
+
+def test_special_values():
+    logs = go_log(np.array([0., -0., -1., np.inf, np.nan]))
+    assert logs[0] == -np.inf and logs[1] == -np.inf and logs[3] == np.inf
+    assert np.isnan(logs[2]) and np.isnan(logs[4])
+
+
+# rows of a task: exact, off by less than the tolerance, off by more, NaN in Result and inf in Alice;
+# 2.5 has 6 significant digits at 1e-5, so results differ from it in units of 1e-5
+PRECHECK_CASES = [
+    # (operate, scale, a, b, within tolerance, beyond tolerance)
+    (0, 1, 1.25, 1.25, 2.500005, 2.50002),
+    (1, 0, 3., .5, 2.50009, 2.50012),       # subtraction compares with 10 unless a scale is given
+    (1, 1, 3., .5, 2.500005, 2.50002),
+    (2, 1, 1.25, 2., 2.500005, 2.50002),
+    (3, 1, 5., 2., 2.500005, 2.50002),
+    (3, 3, 5., 2., 2.500025, 2.50004),
+    (4, 1, 1.25, 1.25, 2.500005, 2.50002),
+    (5, 1, 5., 2., 2.500005, 2.50002),
+    # exp compares log(R) with log(A) * B, log(8) has 6 significant digits at 1e-5 too
+    (6, 1, 2., 3., 8 * math.exp(5e-6), 8 * math.exp(3e-5)),
+]
+
+
+def write_parties(path, a, b, r):
+    files = {}
+    for label, data in (('A', a), ('B', b), ('R', r)):
+        files[label] = str(path / f"{label}.csv")
+        pd.DataFrame({'number': np.arange(1, len(data) + 1), 'data': data}).to_csv(files[label], index=False)
+    return files
+
+
+@pytest.mark.parametrize("operate, scale, a, b, within, beyond", PRECHECK_CASES)
+def test_precheck_files(tmp_path, operate, scale, a, b, within, beyond):
+    exact = np.exp(math.log(a) * b) if operate == 6 else {
+        0: a + b, 1: a - b, 2: a * b, 3: a / b, 4: a + b, 5: a / b
+    }[operate]
+    files = write_parties(
+        tmp_path,
+        [a, a, a, a, np.inf],
+        [b] * 5,
+        [exact, within, beyond, np.nan, exact]
+    )
+
+    # chunks smaller than the files, so rows are read across chunk boundaries
+    mismatched = precheck_files(files, operate, scale, 5, chunk_rows=2)
+    assert mismatched.tolist() == [False, False, True, True, True]
+
+
+def test_precheck_row_count(tmp_path):
+    files = write_parties(tmp_path, [1., 2.], [1., 2.], [2., 4.])
+    with pytest.raises(ValueError):
+        precheck_files(files, 0, 1, 3)
+
+
+def test_cross_check(tmp_path):
+    save_precheck(tmp_path, np.array([False, False, True, True, True]))
+    precheck = load_precheck(tmp_path)
+    assert precheck.tolist() == [False, False, True, True, True]
+
+    # row 2 isn't sampled, the verifier alone reports row 1 and the pre-check alone row 4
+    assert cross_check(precheck, np.array([1, 3, 4, 5]), np.array([1, 3, 5])) == {
+        "rows": 4,
+        "agreed": 2,
+        "verifier_only": 1,
+        "precheck_only": 1,
+    }
@@ -0,0 +1,112 @@
+import os
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from web.services import verify
+from web.utils.store import TaskStore
+from web.utils.scheduler import JobScheduler
+
+ROWS = 20
+OPERA_DICT = {"mul": 2}
+MISMATCHED = 7      # row of the Result upload that is wrong
+
+
+def write_uploads(base_path):
+    os.makedirs(base_path)
+    numbers = np.arange(1, ROWS + 1)
+    a, b = numbers * 0.5, numbers + 0.25
+    r = a * b
+    r[MISMATCHED - 1] += 1
+    for party, data in (("Alice", a), ("Bob", b), ("Result", r)):
+        pd.DataFrame({"number": numbers, "data": data}).to_csv(base_path / f"{party}.csv", index=False)
+
+
+def fake_verifier(monkeypatch, calls, blocked=()):
+    # checks the rows of a batch in place of the Go verifier, and hangs on the blocked ones
+    async def process_files(part_files, task_id, file_id, operate, workers, scale, result_dir, base_url, **kwargs):
+        calls.append(file_id)
+        if file_id in blocked:
+            await asyncio.Event().wait()
+
+        numbers = pd.read_csv(part_files["A"])["number"]
+        result_file = os.path.join(result_dir, f"result_{file_id}.csv")
+        matched = np.where(numbers == MISMATCHED, "false", "true")
+        pd.DataFrame({"number": numbers, "data": matched}).to_csv(result_file, index=False)
+        return result_file, int((matched == "false").sum()), 0, 0.
+
+    async def no_verifier(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(verify, "process_files", process_files)
+    monkeypatch.setattr(verify, "fetch_capacity", no_verifier)
+    monkeypatch.setattr(verify, "stop_batches", no_verifier)
+
+
+def verify_job(tasks, dir_out, resume=False):
+    return lambda job_slot: verify.verify_serv(
+        "t", None if resume else "mul", None, 0 if resume else 2, 1, 1, 0.95, 0.01,
+        tasks, OPERA_DICT, dir_out, "http://verifier", resume=resume, job_slot=job_slot
+    )
+
+
+def test_resume_after_shutdown(tmp_path, monkeypatch):
+    db_path, dir_out = tmp_path / "tasks.db", tmp_path / "out"
+    write_uploads(dir_out / "t")
+
+    async def interrupted():
+        calls = []
+        fake_verifier(monkeypatch, calls, blocked=(2,))
+        tasks = TaskStore(db_path)
+        tasks["t"] = {}
+        scheduler = JobScheduler(tasks, 1, 1 << 30)
+        scheduler.submit("t", verify_job(tasks, dir_out), 0)
+        while "0" not in tasks["t"].get("checkpoint", {}).get("batches", {}):
+            await asyncio.sleep(0.01)
+
+        await scheduler.shutdown("Interrupted by a shutdown of the backend.")
+        assert not scheduler.active("t")
+        tasks.close()
+
+    async def resumed():
+        calls = []
+        fake_verifier(monkeypatch, calls)
+        tasks = TaskStore(db_path)
+        assert tasks.interrupt_active("Interrupted by a restart of the backend.") == 0
+
+        record = tasks["t"]
+        assert record["status"] == "failed"
+        assert record["error"] == "Interrupted by a shutdown of the backend."
+        assert list(record["checkpoint"]["batches"]) == ["0"]
+
+        result = await verify_job(tasks, dir_out, resume=True)(0)
+        assert calls == [2]
+        assert result["data_length"] == ROWS
+        assert result["checked_mistakes"] == "1"
+        assert tasks["t"]["status"] == "completed"
+        assert tasks["t"]["mismatches"]["first"] == [MISMATCHED]
+        tasks.close()
+
+    asyncio.run(interrupted())
+    asyncio.run(resumed())
+
+
+def test_interrupt_active_after_crash(tmp_path):
+    db_path = tmp_path / "tasks.db"
+    tasks = TaskStore(db_path)
+    tasks["running"] = {"status": "running", "checkpoint": {"batches": {}}, "cancel": {"status": "failed"}}
+    tasks["queued"] = {"status": "queued", "queue": {"position": 1}}
+    tasks["done"] = {"status": "completed", "checked": {"status": "running"}}
+    tasks.close()
+
+    tasks = TaskStore(db_path)
+    assert tasks.interrupt_active("Interrupted by a restart of the backend.") == 2
+    assert tasks["running"] == {
+        "status": "failed",
+        "checkpoint": {"batches": {}},
+        "error": "Interrupted by a restart of the backend."
+    }
+    assert tasks["queued"] == {"status": "failed", "error": "Interrupted by a restart of the backend."}
+    assert tasks["done"]["status"] == "completed"
+    tasks.close()
@@ -0,0 +1,32 @@
+from typing import Dict, Any
+from fastapi import HTTPException
+
+from ..utils.store import TaskStore, ACTIVE_STATUS
+from ..utils.scheduler import JobScheduler
+
+
+async def cancel_serv(
+    id: str,
+    tasks: TaskStore,
+    scheduler: JobScheduler
+) -> Dict[str, Any]:
+    if id not in tasks:
+        raise HTTPException(status_code=404, detail=f"Task (ID = '{id}') not found, or created failed.")
+
+    if not await scheduler.cancel(id, "Cancelled by request."):
+        record = tasks[id]
+        if record.get("status") not in ACTIVE_STATUS or scheduler.active(id):
+            raise HTTPException(status_code=409, detail=f"Task (ID = '{id}') is not queued or running.")
+
+        # orphaned, marked active by a job that is gone
+        for key in ("checkpoint", "queue", "cancel"):
+            record.pop(key, None)
+        record.update(status="cancelled", error="Cancelled by request.")
+        tasks[id] = record
+
+    return {
+        "status": "success",
+        "message": f"Task (ID = '{id}') has been cancelled.",
+        "task_id": id,
+        "task_stat": tasks[id]["status"]
+    }
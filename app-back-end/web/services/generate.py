@@ -1,100 +1,261 @@
 import os
-import io
-import csv
-import random
+import shutil
+import asyncio
 
-import aiofiles
 import numpy as np
-import dask.array as da
-import dask.dataframe as dd
+import pandas as pd
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Optional
+from concurrent.futures import Executor
 from fastapi import HTTPException
 
-from ..utils.data import data_summary
+from ..utils.file import StreamSummary, COPY_BUFFER_SIZE
+from ..utils.index import RowIndex, INDEX_STEP
+from ..utils.operate import calculate
+from ..utils.sampler import new_seed
+from ..utils.store import TaskStore
+from ..utils.scheduler import JobScheduler
 
+# a multiple of INDEX_STEP, so the indexed rows of every chunk line up with the whole file
+GEN_CHUNK_ROWS = 256 * INDEX_STEP
+CSV_HEADER = b"number,data\n"
 
-def generate_df(N):
-    df = dd.from_array(da.arange(1, N + 1), columns=['number'])
-    df['data'] = da.random.uniform(0, 1, size=N)
-    df = df.set_index('number')
-    return df
 
+def write_part(part_file: str, numbers: np.ndarray, data: np.ndarray, index_step: int):
+    lines = pd.DataFrame({'number': numbers, 'data': data}).to_csv(
+        index=False, header=False, lineterminator='\n'
+    ).encode()
+    with open(part_file, 'wb') as f:
+        f.write(lines)
 
-def do_calculate(df_a, df_b, operator):
-    data_a = da.from_array(df_a['data'].compute())
-    data_b = da.from_array(df_b['data'].compute())
+    raw = np.frombuffer(lines, dtype=np.uint8)
+    line_ends = np.flatnonzero(raw == ord('\n'))
+    line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+    picked = np.arange(0, len(numbers), index_step)
 
-    df_r = dd.from_array(da.arange(1, data_a.shape[0] + 1), columns=['number'])
-    df_r = df_r.set_index('number')
+    mean = float(data.mean())
+    return {
+        "path": part_file,
+        "size": len(lines),
+        "count": len(data),
+        "mean": mean,
+        "m2": float(np.square(data - mean).sum()),
+        "max": float(data.max()),
+        "min": float(data.min()),
+        "numbers": numbers[picked],
+        "offsets": line_starts[picked].astype(np.int64),
+    }
+
+
+def generate_chunk(
+    part_dir: str,
+    chunk_id: int,
+    start: int,
+    length: int,
+    operator: str,
+    seed_seq: np.random.SeedSequence
+):
+    # runs in a worker process, every chunk draws from its own independent stream
+    rng = np.random.default_rng(seed_seq)
+    numbers = np.arange(start + 1, start + length + 1, dtype=np.int64)
+    data_a = rng.uniform(0, 1, size=length)
+    data_b = rng.uniform(0, 1, size=length)
+    data_r = calculate(data_a, data_b, operator, out=np.empty(length))
+
+    return {
+        party: write_part(os.path.join(part_dir, f"{party}-{chunk_id}.csv"), numbers, data, INDEX_STEP)
+        for party, data in (("Alice", data_a), ("Bob", data_b), ("Result", data_r))
+    }
+
+
+def concat_parts(save_path: Path, parts):
+    summary = StreamSummary()
+    summary.update(CSV_HEADER)
+
+    offset = len(CSV_HEADER)
+    index_numbers, index_offsets = [], []
+    with open(save_path, 'wb') as out:
+        out.write(CSV_HEADER)
+        for part in parts:
+            with open(part["path"], 'rb') as f:
+                while block := f.read(COPY_BUFFER_SIZE):
+                    out.write(block)
+                    summary.md5_hash.update(block)
+            os.remove(part["path"])
+
+            summary.merge_moments(part["count"], part["mean"], part["m2"], part["max"], part["min"])
+            index_numbers.append(part["numbers"])
+            index_offsets.append(part["offsets"] + offset)
+            offset += part["size"]
+
+    RowIndex(
+        np.concatenate(index_numbers),
+        np.concatenate(index_offsets),
+        INDEX_STEP,
+        summary.count,
+        offset,
+        ["number", "data"]
+    ).save(save_path)
+    return summary.result()
+
+
+async def gen_job(
+    id: str,
+    operator: str,
+    data_length: int,
+    seed: int,
+    tasks: TaskStore,
+    executor: Executor,
+    DEFAULT_DIR_OUT: Path
+):
+    part_dir = DEFAULT_DIR_OUT / id / "gen"
+    try:
+        os.makedirs(part_dir, exist_ok=True)
+
+        n_chunks = (data_length + GEN_CHUNK_ROWS - 1) // GEN_CHUNK_ROWS
+        seed_seqs = np.random.SeedSequence(seed).spawn(n_chunks)
+
+        loop = asyncio.get_running_loop()
+        jobs = [
+            loop.run_in_executor(
+                executor,
+                generate_chunk,
+                str(part_dir),
+                x,
+                x * GEN_CHUNK_ROWS,
+                min(GEN_CHUNK_ROWS, data_length - x * GEN_CHUNK_ROWS),
+                operator,
+                seed_seqs[x]
+            )
+            for x in range(n_chunks)
+        ]
+
+        chunks = [None] * n_chunks
+        finished = 0
 
-    if operator.lower() == 'add':
-        data_r = data_a + data_b
-    elif operator.lower() == 'sub':
-        data_r = data_a - data_b
-    elif operator.lower() == 'mul':
-        data_r = data_a * data_b
-    elif operator.lower() == 'div':
-        data_r = data_a / data_b
-    elif operator.lower() == 'exp':
-        data_r = data_a ** data_b
-    else:
-        raise ValueError(f"Unsupported operator: {operator}")
+        async def track(x, job):
+            nonlocal finished
 
-    df_r['data'] = data_r.compute()
-    return df_r
+            chunks[x] = await job
+            finished += 1
+            tasks[id]["info"]["sub_stage"] = f"{finished}/{n_chunks} - chunks of data."
+            tasks.save(id)
+
+        try:
+            await asyncio.gather(*(track(x, job) for x, job in enumerate(jobs)))
+        except BaseException:
+            for job in jobs:
+                job.cancel()
+            raise
+
+        tasks[id]["stage"] = "2/2"
+        tasks[id]["info"] = {
+            "desc": "Writing generated data:",
+            "sub_stage": "data of Alice, Bob and Result."
+        }
+        tasks.save(id)
+
+        summaries = await asyncio.gather(*(
+            asyncio.to_thread(
+                concat_parts, DEFAULT_DIR_OUT / id / f"{party}.csv", [chunk[party] for chunk in chunks]
+            )
+            for party in ("Alice", "Bob", "Result")
+        ))
+        summary_a, summary_b, summary_r = summaries
+
+        tasks[id] = {
+            **tasks[id],
+            "status": "generated",
+            "length": data_length,
+            "Alice": {"summary": summary_a},
+            "Bob": {"summary": summary_b},
+            "Result": {"summary": summary_r},
+            "info": {
+                "desc": "Data generated.",
+                "sub_stage": ""
+            },
+            "generated": {
+                "operator": operator,
+                "seed": seed
+            }
+        }
+        tasks.save(id)
+
+    except asyncio.CancelledError:
+        # by /cancel, or a shutdown of the backend
+        record = {key: value for key, value in tasks.get(id, {}).items() if key != "cancel"}
+        cancel = tasks.get(id, {}).get("cancel") or {"status": "failed", "reason": "Generation was interrupted."}
+        tasks[id] = {
+            **record,
+            "status": cancel["status"],
+            "error": cancel["reason"]
+        }
+        raise
+
+    except Exception as e:
+        tasks[id] = {
+            **tasks.get(id, {}),
+            "status": "failed",
+            "error": str(e)
+        }
+
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
 
 
 async def gen_serv(
     id: str,
     operator: str,
     data_length: int,
-    tasks: Dict[str, Any],
+    tasks: TaskStore,
     OPERA_DICT: Dict[str, int],
-    DEFAULT_DIR_OUT: Path
+    DEFAULT_DIR_OUT: Path,
+    executor: Executor,
+    scheduler: JobScheduler,
+    seed: Optional[int] = None
 ):
     if operator not in OPERA_DICT:
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail=f"Invalid operator: {operator}. Valid options are: {list(OPERA_DICT.keys())}."
         )
-    
-    os.makedirs(DEFAULT_DIR_OUT / id, exist_ok=True)
-    save_paths = {
-        'A': DEFAULT_DIR_OUT / id / "Alice.csv",
-        'B': DEFAULT_DIR_OUT / id / "Bob.csv",
-        'R': DEFAULT_DIR_OUT / id / "Result.csv",
-    }
 
-    df_a = generate_df(data_length)
-    df_b = generate_df(data_length)
-    df_r = do_calculate(df_a, df_b, operator)
+    if data_length <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="data_length must be positive."
+        )
+
+    if scheduler.active(id) or tasks.get(id, {}).get("status") in ("running", "queued"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Task (ID = '{id}') is still running."
+        )
 
-    summary_a = data_summary(df_a)
-    summary_b = data_summary(df_b)
-    summary_r = data_summary(df_r)
+    if seed is None:
+        seed = new_seed()
 
-    df_a.to_hdf(save_paths["A"], key='data', mode='w')
-    df_b.to_hdf(save_paths["B"], key='data', mode='w')
-    df_r.to_hdf(save_paths["R"], key='data', mode='w')
+    os.makedirs(DEFAULT_DIR_OUT / id, exist_ok=True)
 
-    if not id in tasks:
-        tasks[id] = {}
+    tasks[id] = {
+        **tasks.get(id, {}),
+        "status": "running",
+        "stage": "1/2",
+        "info": {
+            "desc": "Generating data:",
+            "sub_stage": "0 chunks of data."
+        }
+    }
+    tasks.save(id)
 
-    tasks[id]["length"] = data_length
-    tasks[id]["Alice"] = {"summary": summary_a}
-    tasks[id]["Bob"] = {"summary": summary_b}
-    tasks[id]["Result"] = {"summary": summary_r}
+    # tracked by the scheduler so /cancel reaches it, but never queued behind verifications
+    scheduler.track(id, gen_job(id, operator, data_length, seed, tasks, executor, DEFAULT_DIR_OUT))
 
     return {
         "status": "success",
         "task_id": id,
-        "message": f"File for id='{id}' generated successfully.",
+        "message": f"Generating data for id='{id}' has been started.",
         "data_length": data_length,
-        "summary": {
-            "a": summary_a,
-            "b": summary_b,
-            "r": summary_r
-        }
-    }
\ No newline at end of file
+        "seed": seed
+    }
@@ -0,0 +1,123 @@
+import asyncio
+import numpy as np
+
+from pathlib import Path
+from typing import Optional, Dict, Any
+from fastapi import HTTPException
+
+from ..utils.file import index_results
+from ..utils.sampler import draw_sample
+from ..utils.mismatch import mismatch_path, collect_mismatches, save_mismatches, load_mismatches
+from ..utils.store import TaskStore
+
+MISMATCH_PAGE_ROWS = 100
+MISMATCH_MAX_PAGE_ROWS = 1_000_000
+
+
+async def get_mismatches(id: str, DEFAULT_DIR_OUT: Path) -> np.ndarray:
+    task_dir = DEFAULT_DIR_OUT / id
+    if mismatch_path(task_dir).exists():
+        return await asyncio.to_thread(load_mismatches, task_dir)
+
+    if not (task_dir / "Verified.csv").exists():
+        raise HTTPException(
+            status_code=404,
+            detail=f"Verified data is not found for ID '{id}'."
+        )
+
+    # tasks verified before mismatches were collected get them on first use
+    if not (task_dir / "Mismatched.csv").exists():
+        await asyncio.to_thread(index_results, task_dir / "Verified.csv", task_dir / "Mismatched.csv")
+    numbers = await asyncio.to_thread(collect_mismatches, task_dir / "Mismatched.csv")
+    save_mismatches(task_dir, numbers)
+    return numbers
+
+
+def checked_rows(id: str, tasks: TaskStore) -> Optional[np.ndarray]:
+    # None when every row was checked, otherwise the sorted sampled rows
+    sample = tasks.get(id, {}).get("sample")
+    if sample is None or sample["full"]:
+        return None
+    # drawn from the rows that were verified, which later uploads may have changed
+    rows = sample.get("rows") or tasks[id].get("checked", {}).get("data_length") or tasks[id]["length"]
+    return draw_sample(rows, sample["size"], sample["seed"])
+
+
+async def mismatch_serv(
+    id: str,
+    DEFAULT_DIR_OUT: Path,
+    offset: int = 0,
+    limit: int = MISMATCH_PAGE_ROWS,
+    row_from: Optional[int] = None,
+    row_to: Optional[int] = None
+) -> Dict[str, Any]:
+    if offset < 0 or limit < 0 or limit > MISMATCH_MAX_PAGE_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"offset must not be negative and limit must be between 0 and {MISMATCH_MAX_PAGE_ROWS}."
+        )
+
+    numbers = await get_mismatches(id, DEFAULT_DIR_OUT)
+    total = len(numbers)
+
+    start = 0 if row_from is None else int(np.searchsorted(numbers, row_from, side='left'))
+    end = total if row_to is None else int(np.searchsorted(numbers, row_to, side='right'))
+    selected = numbers[start:end]
+
+    return {
+        "status": "success",
+        "task_id": id,
+        "total": total,
+        "matched": len(selected),
+        "offset": offset,
+        "numbers": selected[offset:offset + limit].tolist()
+    }
+
+
+async def mismatch_compare_serv(
+    id: str,
+    other: str,
+    tasks: TaskStore,
+    DEFAULT_DIR_OUT: Path,
+    limit: int = MISMATCH_PAGE_ROWS
+) -> Dict[str, Any]:
+    if limit < 0 or limit > MISMATCH_MAX_PAGE_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 0 and {MISMATCH_MAX_PAGE_ROWS}."
+        )
+
+    numbers_x, numbers_y = await asyncio.gather(
+        get_mismatches(id, DEFAULT_DIR_OUT),
+        get_mismatches(other, DEFAULT_DIR_OUT)
+    )
+
+    # sampled tasks can only be compared on the rows both of them actually checked
+    checked_x, checked_y = checked_rows(id, tasks), checked_rows(other, tasks)
+    if checked_x is not None or checked_y is not None:
+        if checked_x is None:
+            checked = checked_y
+        elif checked_y is None:
+            checked = checked_x
+        else:
+            checked = np.intersect1d(checked_x, checked_y, assume_unique=True)
+        numbers_x = numbers_x[np.isin(numbers_x, checked, assume_unique=True)]
+        numbers_y = numbers_y[np.isin(numbers_y, checked, assume_unique=True)]
+
+    common = np.intersect1d(numbers_x, numbers_y, assume_unique=True)
+    only_x = np.setdiff1d(numbers_x, numbers_y, assume_unique=True)
+    only_y = np.setdiff1d(numbers_y, numbers_x, assume_unique=True)
+
+    return {
+        "status": "success",
+        "task_id": id,
+        "other_id": other,
+        "checked_rows": None if checked_x is None and checked_y is None else len(checked),
+        "same": len(only_x) == 0 and len(only_y) == 0,
+        "common": len(common),
+        "only_task": len(only_x),
+        "only_other": len(only_y),
+        "common_numbers": common[:limit].tolist(),
+        "only_task_numbers": only_x[:limit].tolist(),
+        "only_other_numbers": only_y[:limit].tolist()
+    }
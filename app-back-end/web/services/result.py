@@ -1,19 +1,167 @@
+import os
+import re
+import zlib
+import asyncio
+
 from pathlib import Path
+from typing import Optional
 from fastapi import HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from ..utils.file import index_results, read_indexed_rows, RESULT_HEADER, COPY_BUFFER_SIZE
+from ..utils.index import RowIndex
+
+try:
+    import zstandard
+except ImportError:     # zstd encoding is only offered when the package is installed
+    zstandard = None
 # from runner import DEFAULT_DIR_OUT
 
+RESULT_PAGE_ROWS = 1000
+RESULT_MAX_PAGE_ROWS = 1_000_000
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    accepted = set()
+    for token in (accept_encoding or '').split(','):
+        name, _, params = token.partition(';')
+        quality = re.search(r'q=([\d.]+)', params)
+        if not quality or float(quality.group(1)) > 0:
+            accepted.add(name.strip().lower())
+
+    if 'zstd' in accepted and zstandard is not None:
+        return 'zstd'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compressor(encoding: str):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def iter_file(file_path: Path, start: int, end: int, encoding: Optional[str] = None):
+    compress = compressor(encoding) if encoding else None
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(COPY_BUFFER_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield compress.compress(block) if compress else block
+
+    if compress:
+        yield compress.flush()
+
+
+def parse_range(range_header: str, size: int):
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', range_header)
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first == '':     # suffix range, the last N bytes
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last != '' else size
+    if start >= end:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Range '{range_header}' is not satisfiable for {size} bytes."
+        )
+    return start, end
+
+
+async def load_result_index(file_path: Path, verified_path: Path, mismatch_path: Path) -> RowIndex:
+    row_index = RowIndex.load(file_path) if file_path.exists() else None
+    if row_index is None:
+        # results combined before the index existed get one on first use
+        await asyncio.to_thread(index_results, verified_path, mismatch_path)
+        row_index = RowIndex.load(file_path)
+    return row_index
+
 
 async def result_serv(
-    id: str, 
-    DEFAULT_DIR_OUT: Path
-) -> FileResponse:
-    file_path = DEFAULT_DIR_OUT / id / "Verified.csv"
-        
-    if not file_path.exists():
+    id: str,
+    DEFAULT_DIR_OUT: Path,
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+    mismatches_only: bool = False,
+    range_header: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    compress: bool = False
+) -> Response:
+    verified_path = DEFAULT_DIR_OUT / id / "Verified.csv"
+    mismatch_path = DEFAULT_DIR_OUT / id / "Mismatched.csv"
+
+    if not verified_path.exists():
         raise HTTPException(
-            status_code=404, 
+            status_code=404,
             detail=f"Verified data is not found for ID '{id}'."
         )
 
-    return FileResponse(file_path, media_type="text/csv", filename=f"{id}_verified.csv")
+    file_path = mismatch_path if mismatches_only else verified_path
+    file_name = f"{id}_mismatched.csv" if mismatches_only else f"{id}_verified.csv"
+    encoding = negotiate_encoding(accept_encoding)
+
+    if offset is not None or limit is not None:
+        offset = offset or 0
+        limit = RESULT_PAGE_ROWS if limit is None else limit
+        if offset < 0 or limit < 0 or limit > RESULT_MAX_PAGE_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"offset must not be negative and limit must be between 0 and {RESULT_MAX_PAGE_ROWS}."
+            )
+
+        row_index = await load_result_index(file_path, verified_path, mismatch_path)
+        content = RESULT_HEADER + await asyncio.to_thread(read_indexed_rows, file_path, row_index, offset, limit)
+
+        headers = {
+            "X-Total-Count": str(row_index.rows),
+            "X-Offset": str(offset),
+            "X-Limit": str(limit),
+            "Vary": "Accept-Encoding",
+        }
+        if encoding:
+            compress = compressor(encoding)
+            content = compress.compress(content) + compress.flush()
+            headers["Content-Encoding"] = encoding
+        return Response(content, media_type="text/csv", headers=headers)
+
+    if mismatches_only:
+        await load_result_index(file_path, verified_path, mismatch_path)
+
+    size = os.path.getsize(file_path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{file_name}"',
+    }
+    if compress:
+        # full downloads are only encoded on request, so plain ones keep a length and resume by range
+        headers["Vary"] = "Accept-Encoding"
+
+    byte_range = parse_range(range_header, size) if range_header else None
+    if byte_range is not None:
+        # ranges address the stored bytes, so they are always served without content encoding
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["Content-Length"] = str(end - start)
+        return StreamingResponse(
+            iter_file(file_path, start, end), status_code=206, media_type="text/csv", headers=headers
+        )
+
+    if compress and encoding:
+        # the length of the encoded stream isn't known up front, and ranges can't address it
+        del headers["Accept-Ranges"]
+        headers["Content-Encoding"] = encoding
+        return StreamingResponse(iter_file(file_path, 0, size, encoding), media_type="text/csv", headers=headers)
+
+    return FileResponse(
+        file_path, media_type="text/csv", filename=file_name,
+        headers={key: value for key, value in headers.items() if key != "Content-Disposition"}
+    )
@@ -1,35 +1,72 @@
+import json
+import asyncio
+
 from typing import Dict, Any
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
 # from runner import tasks
+from ..utils.store import TaskStore
+from ..utils.events import TaskEvents
+
+STREAM_KEEPALIVE = 15.      # seconds between comments that keep idle streams open through proxies
+FINAL_STATUS = {"completed", "generated", "failed", "cancelled"}
 
 
 async def status_serv(
     id: str, 
-    tasks: Dict[str, Any]
+    tasks: TaskStore
 ) -> Dict[str, Any]:
-    task_id = id
-
-    if task_id not in tasks:
+    if id not in tasks:
         raise HTTPException(status_code=404, detail=f"Task (ID = '{id}') not found, or created failed.")
+    return task_status(id, tasks[id])
+
 
-    task = tasks[task_id]
-    if task["status"] == "running":
+def task_status(task_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+    # uploaded data without a task yet has no status
+    status = task.get("status")
+    if status == "running":
         return {
             "status": "success",
             "task_id": task_id,
             "task_stat": task["status"],
             "task_info": task["info"],
-            "task_stage": task["stage"]
+            "task_stage": task["stage"],
+            "task_progress": task.get("progress")
+        }
+    elif status == "queued":
+        return {
+            "status": "success",
+            "task_id": task_id,
+            "task_stat": task["status"],
+            "task_queue": task["queue"]
         }
-    elif task["status"] == "completed":
+    elif status == "completed":
         return {
             "status": "success",
             "task_id": task_id,
             "task_stat": task["status"],
             "task_info": task["info"],
-            "task_result": task["checked"]
+            "task_result": task.get("checked"),
+            "task_precheck": task.get("precheck")
         }
-    elif task["status"] == "failed":
+    elif status == "generated":
+        return {
+            "status": "success",
+            "task_id": task_id,
+            "task_stat": task["status"],
+            "task_info": task["info"],
+            "task_result": {
+                **task["generated"],
+                "data_length": task["length"],
+                "summary": {
+                    "a": task["Alice"]["summary"],
+                    "b": task["Bob"]["summary"],
+                    "r": task["Result"]["summary"]
+                }
+            }
+        }
+    elif status == "failed" or status == "cancelled":
         return {
             "status": "success",
             "task_id": task_id,
@@ -42,3 +79,39 @@ async def status_serv(
             "task_id": task_id,
             "task_stat": "unknown",
         }
+
+
+async def status_stream_serv(
+    id: str,
+    tasks: TaskStore,
+    events: TaskEvents
+) -> StreamingResponse:
+    if id not in tasks:
+        raise HTTPException(status_code=404, detail=f"Task (ID = '{id}') not found, or created failed.")
+
+    # subscribed before the first snapshot, so no change falls in between
+    queue = events.subscribe(id)
+    first = json.dumps(task_status(id, tasks[id]), default=str)
+
+    async def stream():
+        try:
+            payload, last = first, None
+            while True:
+                if payload != last:
+                    yield f"event: status\ndata: {payload}\n\n"
+                    last = payload
+                    if json.loads(payload)["task_stat"] in FINAL_STATUS:
+                        break
+
+                try:
+                    payload = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            events.unsubscribe(id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,20 +1,25 @@
 import os
+import asyncio
 import aiofiles
 
 from pathlib import Path
-from typing import Optional, Dict, Any
 from fastapi import HTTPException, UploadFile
 
-from ..utils.file import file_summary
+from ..utils.file import file_summary, StreamSummary
+from ..utils.index import RowIndex
+from ..utils.store import TaskStore
 # from runner import DEFAULT_DIR_OUT
 
+CHUNK_SIZE = 16 * 1024 * 1024  # 16MB
+
 
 async def update_serv(
     file: UploadFile,
     id: str,
     party: str,
-    tasks: Dict[str, Any],
-    DEFAULT_DIR_OUT: Path
+    tasks: TaskStore,
+    DEFAULT_DIR_OUT: Path,
+    stream: bool = True
 ):
     if not party in {'Alice', 'Bob', 'Result'}:
         raise HTTPException(
@@ -25,18 +30,35 @@ async def update_serv(
     os.makedirs(DEFAULT_DIR_OUT / id, exist_ok=True)
     save_path = DEFAULT_DIR_OUT / id / f"{party}.csv"
 
-    # buffer = bytes('', encoding='utf-8')
-    # chunk_size = 1024 * 1024 * 1024 # 1GB
+    if stream:
+        stream_summary = StreamSummary()
+        async with aiofiles.open(save_path, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                await asyncio.gather(
+                    f.write(chunk),
+                    asyncio.to_thread(stream_summary.update, chunk)
+                )
+        summary = stream_summary.result()
+
+        row_index = stream_summary.row_index()
+        if row_index is not None:
+            row_index.save(save_path)
+        else:
+            RowIndex.remove(save_path)
+
+    else:
+        buffer = await file.read()
+        async with aiofiles.open(save_path, "wb") as f:
+            await f.write(buffer)
 
-    buffer = await file.read()
-    async with aiofiles.open(save_path, "wb") as f:
-        await f.write(buffer)
+        summary = await file_summary(file_cont=buffer)
+        RowIndex.remove(save_path)
 
-    summary = await file_summary(file_cont=buffer)
     if not id in tasks:
         tasks[id] = {}
     tasks[id]["length"] = summary["items"]
     tasks[id][party] = {"summary": summary}
+    tasks.save(id)
 
     return {
         "status": "success",
@@ -1,17 +1,161 @@
 import os
+import math
 import time
-import secrets
+import shutil
+import threading
 
 import asyncio
 import numpy as np
 import pandas as pd
 
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Iterable, Optional, Dict
+from concurrent.futures import Executor
 from fastapi import HTTPException
 
-from ..utils.file import check_equal_row_count, process_files, combine_results, boost_split_csv
+from ..utils.file import (
+    check_equal_row_count, check_equal_counts, count_csv_rows, process_files, 
+    combine_results, index_results, boost_split_csv, sample_split_csv, get_part_ranges, BATCH_WRITERS
+)
 from ..utils.data import get_sample_size
+from ..utils.sampler import draw_sample, new_seed
+from ..utils.mismatch import collect_mismatches, save_mismatches
+from ..utils.metrics import (
+    timed, StageTimer, STAGE_SECONDS, SPLIT_SECONDS, TASKS_TOTAL, BATCHES_TOTAL, ROWS_TOTAL, MISMATCHES_TOTAL,
+    RESULT_CACHE_TOTAL
+)
+from ..utils.tuner import ThroughputHistory, WorkerTuner, fetch_capacity, plan_batches
+from ..utils.http import get_request
+from ..utils.handoff import shared_data_dir
+from ..utils.ingest import ColumnCache
+from ..utils.result_cache import ResultCache, result_key, remove_result_files
+from ..utils.precheck import precheck_files, precheck_path, save_precheck, load_precheck, cross_check
+from ..utils.incremental import (
+    plan_incremental, merge_results, save_snapshot, remove_snapshot, INCREMENTAL_MAX_RATIO
+)
+from ..utils.store import TaskStore
+
+VERIFIER_BASE_PORT = 9050
+VERIFIER_JOB_PORTS = 256          # ports of the verifier one running job may bind, from its job slot on
+VERIFY_MAX_WORKERS = VERIFIER_JOB_PORTS // 2   # workers of a batch, whose two parties bind a port each
+MISMATCH_PREVIEW = 10
+CHUNK_MEMORY = 128 * 1024 * 1024   # one sampled chunk of each party, see sample_split_csv
+PART_ROW_MEMORY = 64               # one buffered row of a batch part, as a DataFrame and being written
+CLEANUP_TIMEOUT = 5.               # seconds for the verifier to stop and delete the batches of a task
+VERIFY_MODES = ("mpc", "plain")    # plain: the plaintext pre-check of every row instead of MPC
+VERIFY_WINDOW = 2                  # batches verified concurrently by default
+
+
+def estimate_verify_memory(
+    row_count: int,
+    split_n: int,
+    conf_level: float,
+    error_rate: float,
+    check_all: bool = False
+) -> int:
+    # peak memory of verify_serv: the three parties are sampled and split at the same time
+    sample_size = get_sample_size(conf_level, error_rate, row_count) if row_count else 0
+    if row_count <= 100_0000 or check_all:
+        sample_size = row_count
+
+    batch_rows = math.ceil(sample_size / split_n) if split_n > 0 else min(sample_size, 100_0000)
+    return 3 * CHUNK_MEMORY + sample_size * np.dtype(np.int64).itemsize + 3 * batch_rows * PART_ROW_MEMORY
+
+
+async def finish_threads(job: asyncio.Future, stop: Optional[threading.Event] = None):
+    # threads can't be cancelled: they are asked to stop and awaited, so cleanup never races them
+    try:
+        return await asyncio.shield(job)
+    except asyncio.CancelledError:
+        if stop is not None:
+            stop.set()
+        await asyncio.wait([job])
+        if not job.cancelled():
+            job.exception()     # the stopped threads' error is superseded by the cancellation
+        raise
+
+
+async def stop_batches(id: str, batches: Iterable[int], DEFAULT_URI: str):
+    # /delete kills a verifier run still going on a batch, then removes its files; best effort
+    await asyncio.gather(*(
+        get_request(DEFAULT_URI + "/delete", {"id": f"{id}_{x + 1}"}, timeout=CLEANUP_TIMEOUT)
+        for x in batches
+    ), return_exceptions=True)
+
+
+async def cleanup_cancelled(id: str, split_n: int, base_path: Path, DEFAULT_URI: str):
+    shutil.rmtree(base_path / "split", ignore_errors=True)
+    shutil.rmtree(base_path / "temp", ignore_errors=True)
+
+    # batches already handed to the verifier
+    await stop_batches(id, range(split_n), DEFAULT_URI)
+
+
+async def run_precheck(
+    id: str,
+    operate: int,
+    scale: int,
+    row_count: int,
+    md5s: Dict[str, Optional[str]],
+    files: Dict[str, Path],
+    base_path: Path,
+    tasks: TaskStore,
+    stage_timer: StageTimer,
+    is_async: bool,
+    column_cache: Optional[ColumnCache],
+    executor: Optional[Executor]
+):
+    stage_timer.start("precheck")
+    if is_async:
+        tasks[id]["stage"] = "2/2"
+        tasks[id]["info"] = {
+            "desc": "Checking plaintext data:",
+            "sub_stage": "computing the expected results of every row."
+        }
+        tasks.save(id)
+
+    stop = threading.Event()
+    parties = {'A': "Alice", 'B': "Bob", 'R': "Result"}
+
+    def check_rows():
+        parsed = {
+            label: column_cache.get(file, md5s[parties[label]], row_count, executor, stop)
+            for label, file in files.items()
+        } if column_cache is not None else None
+        return precheck_files(files, operate, scale, row_count, parsed, stop=stop)
+
+    started = time.perf_counter()
+    mismatched = await finish_threads(asyncio.ensure_future(asyncio.to_thread(check_rows)), stop)
+    await asyncio.to_thread(save_precheck, base_path, mismatched)
+    stage_timer.stop()
+
+    mismatches = np.flatnonzero(mismatched)[:MISMATCH_PREVIEW] + 1
+    count = int(mismatched.sum())
+    precheck = {
+        "status": "success",
+        "data_length": row_count,
+        "operate_between": operate,
+        "scale": scale,
+        "mismatches": count,
+        "mistake_rate": f'{round(count / max(row_count, 1) * 100, 4)}%',
+        "first": mismatches.tolist(),
+        "md5": md5s,
+        "time_cost": f'{round(time.perf_counter() - started, 4)} s',
+    }
+    TASKS_TOTAL.inc(status="completed")
+
+    if is_async:
+        tasks[id]["status"] = "completed"
+        tasks[id]["stage"] = "done"
+        tasks[id]["precheck"] = precheck
+        tasks[id]["info"] = {
+            "desc": "Plaintext pre-check done.",
+            "sub_stage": ""
+        }
+        tasks.save(id)
+
+    return precheck
+
 
 async def verify_serv(
     id: str,
@@ -22,15 +166,43 @@ async def verify_serv(
     scale: int,
     conf_level: float,
     error_rate: float,
-    tasks: Dict[str, Any],
+    tasks: TaskStore,
     OPERA_DICT: Dict[str, int],
     DEFAULT_DIR_OUT: Path,
     DEFAULT_URI: str,
     is_csv: bool = True,
     check_all: bool = False,
     is_async: bool = True,
+    window: int = VERIFY_WINDOW,
+    batch_format: str = 'csv',
+    seed: Optional[int] = None,
+    resume: bool = False,
+    auto: bool = False,
+    history: Optional[ThroughputHistory] = None,
+    batch_timeout: Optional[float] = None,
+    column_cache: Optional[ColumnCache] = None,
+    executor: Optional[Executor] = None,
+    result_cache: Optional[ResultCache] = None,
+    incremental: bool = False,
+    mode: str = "mpc",
+    job_slot: int = 0,
 ):
+    timings = {"stages": {}, "split": {}, "batches": {}, "combine": {}}
+    stage_timer = StageTimer(timings["stages"], STAGE_SECONDS)
     try:
+        checkpoint = None
+        max_workers = None
+        capacity = None
+        cache_key = None
+        changed = None      # number ranges re-verified by an incremental verification
+        if resume:
+            checkpoint = tasks.get(id, {}).get("checkpoint")
+            if checkpoint is None:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Task (ID = '{id}') has no checkpoint to resume from."
+                )
+
         if operator:
             if operator not in OPERA_DICT:
                 raise HTTPException(
@@ -38,12 +210,31 @@ async def verify_serv(
                     detail=f"Invalid operator: {operator}. Valid options are: {list(OPERA_DICT.keys())}."
                 )
             operate = OPERA_DICT[operator.lower()] 
+        elif operate is None and checkpoint is not None:
+            operate = checkpoint["operate"]
         elif operate is None:
             raise HTTPException(
                 status_code=400, 
                 detail="Either 'operator' or 'operate' must be specified."
             )
 
+        if batch_format not in BATCH_WRITERS:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Invalid batch format: {batch_format}. Valid options are: {list(BATCH_WRITERS.keys())}."
+            )
+
+        if mode not in VERIFY_MODES:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Invalid mode: {mode}. Valid options are: {list(VERIFY_MODES)}."
+            )
+        if mode == "plain" and (resume or not is_csv):
+            raise HTTPException(
+                status_code=400, 
+                detail="The plaintext pre-check reads CSV uploads and can't be resumed."
+            )
+
         base_path = DEFAULT_DIR_OUT / id
         if not base_path.exists():
             raise HTTPException(
@@ -57,116 +248,376 @@ async def verify_serv(
 
         if is_async:
             tasks[id] = {
+                **tasks[id],
                 "status": "running",
                 "stage": "1/4",
                 "info": {
                     "desc": "Checking and applying data files.",
                     "sub_stage": ""
                 },
-                **tasks[id]
+                "timings": timings
             }
 
-        if is_csv:
-            origin_df_a = pd.read_csv(file_name_a).set_index('number')
-            origin_df_b = pd.read_csv(file_name_b).set_index('number')
-            origin_df_r = pd.read_csv(file_name_r).set_index('number')
+        party_files = {
+            'A': ("Alice", file_name_a),
+            'B': ("Bob", file_name_b),
+            'R': ("Result", file_name_r),
+        }
 
-        else:
-            origin_df_a = pd.read_hdf(file_name_a, key='data')
-            origin_df_b = pd.read_hdf(file_name_b, key='data')
-            origin_df_r = pd.read_hdf(file_name_r, key='data')
+        md5s = {
+            party: tasks.get(id, {}).get(party, {}).get("summary", {}).get("md5")
+            for party, _ in party_files.values()
+        }
+        snapshot_files = {label: file_name for label, (_, file_name) in party_files.items()}
+
+        if checkpoint is not None:
+            if operate != checkpoint["operate"] or md5s != checkpoint["md5"]:
+                raise HTTPException(
+                    status_code=400, 
+                    detail="Operator or uploaded data changed since the checkpoint, start a new verification instead."
+                )
+
+            missing = [f for files in checkpoint["split_files"].values() for f in files if not os.path.exists(f)]
+            if missing:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Split files of the checkpoint are missing: {missing[0]}."
+                )
+
+            scale = checkpoint["scale"]
+            split_n = checkpoint["split_n"]
+            row_count = checkpoint["row_count"]
+            sample_size = checkpoint["sample_size"]
+            seed = checkpoint["seed"]
+            verify_rows = checkpoint.get("verify_rows", sample_size)
+            changed = checkpoint.get("changed")
+            cache_key = result_key(md5s, operate, scale, sample_size, None if sample_size == row_count else seed)
+            split_files = checkpoint["split_files"]
+            os.makedirs(base_path / "temp", exist_ok=True)
 
-        row_count = check_equal_row_count([origin_df_a, origin_df_b, origin_df_r])
-        if split_n < 0 or split_n > row_count:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"split_n must be between 0 and {row_count}."
-            )
-        
-        sample_size = get_sample_size(conf_level, error_rate, row_count)
-        if row_count <= 100_0000 or check_all:
-            sample_size = row_count
-            sample_indexes = np.arange(1, row_count + 1).tolist()
         else:
-            np.random.seed(secrets.randbelow(2 ** 32 - 2))
-            sample_indexes = np.random.choice(np.arange(1, row_count + 1), size=sample_size, replace=False).tolist()
+            stage_timer.start("read")
+            if is_csv:
+                row_counts = []
+                for party, file_name in party_files.values():
+                    summary = tasks.get(id, {}).get(party, {}).get("summary")
+                    if summary is not None:
+                        row_counts.append(summary["items"])
+                    else:
+                        row_counts.append(await asyncio.to_thread(count_csv_rows, file_name))
+                row_count = check_equal_counts(row_counts)
+
+            else:
+                origin_dfs = {
+                    label: pd.read_hdf(file_name, key='data') 
+                    for label, (_, file_name) in party_files.items()
+                }
+                row_count = check_equal_row_count(list(origin_dfs.values()))
+
+            if split_n < 0 or split_n > row_count:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"split_n must be between 0 and {row_count}."
+                )
+
+            if mode == "plain":
+                return await run_precheck(
+                    id, operate, scale, row_count, md5s, snapshot_files, base_path, tasks,
+                    stage_timer, is_async, column_cache, executor
+                )
         
-        await asyncio.sleep(0.01)
-        df_a: pd.DataFrame = origin_df_a.loc[sample_indexes]
+            stage_timer.start("sample")
+            sample_size = get_sample_size(conf_level, error_rate, row_count)
+            if row_count <= 100_0000 or check_all:
+                sample_size = row_count
 
-        await asyncio.sleep(0.01)
-        df_b: pd.DataFrame = origin_df_b.loc[sample_indexes]
+            # only the sampled rows of changed blocks are verified when the last verification of
+            # the task can be updated
+            plan = None
+            if incremental and is_csv:
+                plan = await asyncio.to_thread(
+                    plan_incremental,
+                    base_path, snapshot_files, operate, scale, row_count, sample_size, seed
+                )
+                if plan is not None and len(plan["sample_indexes"]) > INCREMENTAL_MAX_RATIO * sample_size:
+                    plan = None
 
-        await asyncio.sleep(0.01)
-        df_r: pd.DataFrame = origin_df_r.loc[sample_indexes]
+            # a sample is only drawn again with the seed it was drawn with, any seed checks every row
+            reproducible = seed is not None or sample_size == row_count or plan is not None
+            if plan is not None:
+                seed = plan["seed"]
+            elif seed is None:
+                seed = new_seed()
+            if result_cache is not None:
+                cache_key = result_key(md5s, operate, scale, sample_size, None if sample_size == row_count else seed)
+            if cache_key is not None and reproducible:
+                cached = await asyncio.to_thread(result_cache.restore, cache_key, base_path)
+                RESULT_CACHE_TOTAL.inc(result="hit" if cached else "miss")
+                if cached:
+                    stage_timer.stop()
+                    TASKS_TOTAL.inc(status="completed")
+                    verify_result = {**cached["checked"], "cached": True}
+                    if is_async:
+                        tasks[id]["status"] = "completed"
+                        tasks[id]["stage"] = "done"
+                        tasks[id]["sample"] = {
+                            "seed": verify_result["sample_seed"],
+                            "size": sample_size,
+                            "full": sample_size == row_count,
+                            "rows": row_count
+                        }
+                        tasks[id]["checked"] = verify_result
+                        tasks[id]["mismatches"] = cached["mismatches"]
+                        tasks[id].pop("incremental", None)
+                        tasks[id]["info"] = {
+                            "desc": "Verify all done, results of identical data reused.",
+                            "sub_stage": ""
+                        }
+                        tasks.save(id)
+                    await asyncio.to_thread(
+                        save_snapshot, base_path, snapshot_files, operate, scale, row_count, sample_size, seed
+                    )
+                    return verify_result
+
+            if plan is not None:
+                sample_indexes = plan["sample_indexes"]
+                changed = plan["changed"]
+            else:
+                sample_indexes = draw_sample(row_count, sample_size, seed)
+            verify_rows = len(sample_indexes)
+            if is_async:
+                tasks[id]["sample"] = {
+                    "seed": seed,
+                    "size": sample_size,
+                    "full": sample_size == row_count,
+                    "rows": row_count
+                }
+                if plan is not None:
+                    tasks[id]["incremental"] = {"rows": verify_rows, "changed_blocks": plan["changed_blocks"]}
+                else:
+                    tasks[id].pop("incremental", None)
+                tasks.save(id)
             
-        if split_n == 0:   # auto detect
-            split_n = sample_size // 100_0000
-            split_n += 1 if sample_size % 100_0000 != 0 else 0
+            if auto and verify_rows > 0:
+                capacity = await fetch_capacity(DEFAULT_URI)
+                batch_plan = plan_batches(
+                    verify_rows, operate, capacity["max_workers"] if capacity else workers, window, history
+                )
+                split_n, workers, max_workers = batch_plan["split_n"], batch_plan["workers"], batch_plan["max_workers"]
+                if is_async:
+                    tasks[id]["tuning"] = {**batch_plan, "batch_workers": {}}
+                    tasks.save(id)
 
-        os.makedirs(base_path / "split", exist_ok=True)
-        os.makedirs(base_path / "temp", exist_ok=True)
+            if split_n == 0:   # auto detect
+                split_n = verify_rows // 100_0000
+                split_n += 1 if verify_rows % 100_0000 != 0 else 0
+            split_n = min(split_n, verify_rows)
 
-        split_files = {}
+            stage_timer.start("split")
+            os.makedirs(base_path / "split", exist_ok=True)
+            os.makedirs(base_path / "temp", exist_ok=True)
 
-        if is_async:
-            tasks[id]["status"] = "running"
-            tasks[id]["stage"] = "2/4"
-            tasks[id]["info"] = {
-                "desc": "Splitting original data:",
-                "sub_stage": "1/3 - data of Alice."
-            }        
-        split_files['A'] = await boost_split_csv(df_a, "Alice.csv", sample_size, split_n, base_path / "split")
+            split_files = {}
 
-        if is_async:
-            tasks[id]["info"]["sub_stage"] = "2/3 - data of Bob."
-        split_files['B'] = await boost_split_csv(df_b, "Bob.csv", sample_size, split_n, base_path / "split")
+            if is_async:
+                tasks[id]["status"] = "running"
+                tasks[id]["stage"] = "2/4"
+                tasks[id]["info"] = {
+                    "desc": "Splitting original data:",
+                    "sub_stage": "sampling data of Alice, Bob and Result."
+                }
+                tasks.save(id)
 
-        if is_async:
-            tasks[id]["info"]["sub_stage"] = "3/3 - data of Result."
-        split_files['R'] = await boost_split_csv(df_r, "Result.csv", sample_size, split_n, base_path / "split")
+            stop_split = threading.Event()
+
+            def split_party(party, file_name):
+                if split_n == 0:    # nothing changed since the last verification
+                    return []
+                try:
+                    with timed(timings["split"], party, SPLIT_SECONDS, party=party):
+                        parsed = None
+                        if column_cache is not None:
+                            parsed = column_cache.get(file_name, md5s[party], row_count, executor, stop_split)
+                        return sample_split_csv(
+                            file_name, sample_indexes, split_n, base_path / "split", batch_format,
+                            stop=stop_split, parsed=parsed
+                        )
+                except BaseException:
+                    stop_split.set()    # the other parties are no use without this one
+                    raise
+
+            if is_csv:
+                # every thread is awaited, not only the first to fail, before split/ is touched again
+                part_lists = await finish_threads(asyncio.gather(*(
+                    asyncio.to_thread(split_party, party, file_name)
+                    for party, file_name in party_files.values()
+                ), return_exceptions=True), stop_split)
+                errors = [error for error in part_lists if isinstance(error, BaseException)]
+                if errors:
+                    raise next((error for error in errors if not isinstance(error, InterruptedError)), errors[0])
+                split_files = dict(zip(party_files.keys(), part_lists))
+
+            else:
+                for x, (label, (party, _)) in enumerate(party_files.items()):
+                    if is_async:
+                        tasks[id]["info"]["sub_stage"] = f"{x + 1}/3 - data of {party}."
+
+                    with timed(timings["split"], party, SPLIT_SECONDS, party=party):
+                        df: pd.DataFrame = origin_dfs.pop(label).loc[sample_indexes]
+                        split_files[label] = await boost_split_csv(
+                            df, f"{party}.csv", sample_size, split_n, base_path / "split", batch_format
+                        )
+
+            checkpoint = {
+                "operate": operate,
+                "scale": scale,
+                "split_n": split_n,
+                "row_count": row_count,
+                "sample_size": sample_size,
+                "seed": seed,
+                "verify_rows": verify_rows,
+                "changed": changed,
+                "md5": md5s,
+                "split_files": split_files,
+                "batches": {},
+            }
+            if is_async:
+                tasks[id]["checkpoint"] = checkpoint
+                tasks.save(id)
 
         result_file_names = []
         difference, comm_cost, time_cost = 0, 0, 0.
 
+        # batches already verified before an interruption keep their checkpointed results
+        batch_results = [checkpoint["batches"].get(str(x)) for x in range(split_n)]
+        pending_batches = [x for x in range(split_n) if batch_results[x] is None or not os.path.exists(batch_results[x][0])]
+        finished = split_n - len(pending_batches)
+
+        if capacity is None:
+            capacity = await fetch_capacity(DEFAULT_URI)
+        shared_dir = shared_data_dir(capacity, base_path / "split")
+
+        tuner = None
+        if auto:
+            if max_workers is None:     # resumed, the batches are split already
+                max_workers = max(1, (capacity["max_workers"] if capacity else workers) // max(window, 1))
+                workers = min(workers, max_workers)
+                if is_async:
+                    tasks[id]["tuning"] = {"workers": workers, "max_workers": max_workers, "batch_workers": {}}
+            max_workers = min(max_workers, VERIFY_MAX_WORKERS)
+            workers = min(workers, max_workers)
+            tuner = WorkerTuner(workers, max_workers)
+        elif capacity and min(window, len(pending_batches)) > 1:
+            # the verifier checks workers per request, the batches in flight share its processes
+            workers = max(1, min(workers, capacity["max_workers"] // min(window, len(pending_batches))))
+        workers = min(workers, VERIFY_MAX_WORKERS)
+        port_span = max_workers if tuner is not None else workers
+        batch_rows = [end - start for start, end in get_part_ranges(verify_rows, split_n)] if split_n > 0 else []
+
+        # concurrent jobs run in their own port ranges, which bound the batches in flight
+        window = max(1, min(window, len(pending_batches), VERIFIER_JOB_PORTS // (2 * port_span)))
+        in_flight = asyncio.Semaphore(window)
+        free_slots = list(range(window))
+
+        # rows already verified before a resume don't count towards the throughput
+        rows_resumed = rows_done = sum(batch_rows) - sum(batch_rows[x] for x in pending_batches)
+        verify_started = time.perf_counter()
+
+        def batch_progress(batch: Optional[int]):
+            rows_per_s = (rows_done - rows_resumed) / max(time.perf_counter() - verify_started, 1e-6)
+            return {
+                "batch": batch,
+                "batches_done": finished,
+                "batches_total": split_n,
+                "rows_done": rows_done,
+                "rows_total": verify_rows,
+                "rows_per_s": round(rows_per_s, 1),
+                "eta_s": round((verify_rows - rows_done) / rows_per_s, 1) if rows_per_s > 0 else None
+            }
+
+        stage_timer.start("verify")
         if is_async:
             tasks[id]["status"] = "running"
             tasks[id]["stage"] = "3/4"
             tasks[id]["info"] = {
                 "desc": "Verifying calculated results:",
-                "sub_stage": f"0/{split_n} - batch data."
+                "sub_stage": f"{finished}/{split_n} - batch data."
             } 
+            tasks[id]["progress"] = batch_progress(None)
+            tasks.save(id)
 
-        for x in range(split_n):
-            if is_async:
-                tasks[id]["info"]["sub_stage"] = f"{x + 1}/{split_n} - batch data."
+        async def run_batch(x: int):
+            nonlocal finished, rows_done
 
-            part_files = {
-                'A': split_files['A'][x],
-                'B': split_files['B'][x],
-                'R': split_files['R'][x],
-            }
+            async with in_flight:
+                # every slot owns its own port range on the verifier, so concurrent
+                # batches never bind the same sharer/verifier ports
+                slot = free_slots.pop()
+                batch_workers = tuner.workers if tuner is not None else workers
+                try:
+                    batch_results[x] = await asyncio.wait_for(process_files(
+                        {
+                            'A': split_files['A'][x],
+                            'B': split_files['B'][x],
+                            'R': split_files['R'][x],
+                        },
+                        task_id=id,
+                        file_id=x + 1, 
+                        operate=operate, 
+                        workers=batch_workers, 
+                        scale=scale, 
+                        result_dir=base_path / "temp", 
+                        base_url=DEFAULT_URI,
+                        port=VERIFIER_BASE_PORT + job_slot * VERIFIER_JOB_PORTS + slot * 2 * port_span,
+                        timings=timings["batches"].setdefault(str(x + 1), {}),
+                        shared_dir=shared_dir
+                    ), batch_timeout)
+                except asyncio.TimeoutError:
+                    # the verifier goes on with a batch whose request is dropped, it is stopped
+                    # before its ports are handed to another batch or a resumed run
+                    await stop_batches(id, [x], DEFAULT_URI)
+                    raise HTTPException(
+                        status_code=504,
+                        detail=f"Batch {x + 1} didn't finish within {batch_timeout}s."
+                    )
+                except asyncio.CancelledError:
+                    await stop_batches(id, [x], DEFAULT_URI)
+                    raise
+                finally:
+                    free_slots.append(slot)
 
-            f_name, diff, c_cost, t_cost = await process_files(
-                part_files, 
-                task_id=id,
-                file_id=x + 1, 
-                operate=operate, 
-                workers=workers, 
-                scale=scale, 
-                result_dir=base_path / "temp", 
-                base_url=DEFAULT_URI
-            )
+            BATCHES_TOTAL.inc()
+            batch_seconds = sum(timings["batches"][str(x + 1)].values())
+            if history is not None and batch_seconds > 0:
+                history.record(operate, batch_rows[x], batch_workers, batch_rows[x] / batch_seconds)
+            if tuner is not None:
+                tuner.record(batch_workers, batch_rows[x], batch_seconds)
+                if is_async:
+                    tasks[id]["tuning"]["batch_workers"][str(x + 1)] = batch_workers
+
+            finished += 1
+            rows_done += batch_rows[x]
+            checkpoint["batches"][str(x)] = list(batch_results[x])
+            if is_async:
+                tasks[id]["info"]["sub_stage"] = f"{finished}/{split_n} - batch data."
+                tasks[id]["progress"] = batch_progress(x + 1)
+                tasks.save(id)
+
+        batch_jobs = [asyncio.create_task(run_batch(x)) for x in pending_batches]
+        try:
+            await asyncio.gather(*batch_jobs)
+        except BaseException:
+            for job in batch_jobs:
+                job.cancel()
+            raise
 
+        for f_name, diff, c_cost, t_cost in batch_results:
             result_file_names.append(f_name)
             difference += diff
             comm_cost += c_cost
             time_cost += t_cost
-            if is_async:
-                await asyncio.sleep(0.1)
-            else:
-                time.sleep(0.1)
 
+        stage_timer.start("combine")
         if is_async:
             tasks[id]["status"] = "running"
             tasks[id]["stage"] = "4/4"
@@ -174,14 +625,46 @@ async def verify_serv(
                 "desc": "Combining verified results.",
                 "sub_stage": ""
             } 
-        combine_results(result_file_names, base_path / "Verified.csv")
+            tasks.save(id)
+        # results of an earlier run may be hardlinked with the result cache, they are replaced, not rewritten
+        remove_snapshot(base_path)
+        with timed(timings["combine"], "concat"):
+            if changed is not None:
+                await finish_threads(asyncio.ensure_future(asyncio.to_thread(
+                    merge_results, base_path / "Verified.csv", result_file_names, changed,
+                    base_path / "Verified.merged.csv"
+                )))
+                remove_result_files(base_path)
+                os.replace(base_path / "Verified.merged.csv", base_path / "Verified.csv")
+            else:
+                remove_result_files(base_path)
+                await finish_threads(asyncio.ensure_future(
+                    asyncio.to_thread(combine_results, result_file_names, base_path / "Verified.csv")
+                ))
+        with timed(timings["combine"], "index"):
+            await finish_threads(asyncio.ensure_future(
+                asyncio.to_thread(index_results, base_path / "Verified.csv", base_path / "Mismatched.csv")
+            ))
+        with timed(timings["combine"], "mismatches"):
+            mismatches = await finish_threads(asyncio.ensure_future(
+                asyncio.to_thread(collect_mismatches, base_path / "Mismatched.csv")
+            ))
+            save_mismatches(base_path, mismatches)
+        stage_timer.stop()
+
+        TASKS_TOTAL.inc(status="completed")
+        ROWS_TOTAL.inc(verify_rows)
+        MISMATCHES_TOTAL.inc(len(mismatches))
+        if changed is not None:
+            # the rows kept from the last verification count as they did then
+            difference = len(mismatches)
         
         total_mistake_rate = float(difference) / sample_size
         mistake_rate = f'{round(total_mistake_rate * 100, 4)}% ± {round(error_rate * 100, 2)}%'
         mistakes = f'{max(round(row_count * total_mistake_rate) - round(row_count * error_rate), 0)} ~ ' \
                    f'{min(round(row_count * total_mistake_rate) + round(row_count * error_rate), row_count)}'
 
-        if row_count <= 100_0000 or check_all:
+        if sample_size == row_count:
             error_rate = 0.
             conf_level = 1.
             mistakes = f'{difference}'
@@ -197,21 +680,71 @@ async def verify_serv(
             "error_rate": f'{error_rate * 100}%',
             "comm_cost": f'{comm_cost} bits',
             "time_cost": f'{round(time_cost, 4)} ms',
+            "sample_seed": seed,
+        }
+        if changed is not None:
+            verify_result["verified_rows"] = verify_rows
+
+        precheck = tasks.get(id, {}).get("precheck")
+        if (
+            precheck is not None and None not in md5s.values() and precheck["md5"] == md5s
+            and (precheck["operate_between"], precheck["scale"]) == (operate, scale)
+            and precheck_path(base_path).exists()
+        ):
+            verify_result["cross_check"] = await asyncio.to_thread(
+                lambda: cross_check(load_precheck(base_path), draw_sample(row_count, sample_size, seed), mismatches)
+            )
+
+        mismatch_summary = {
+            "count": len(mismatches),
+            "first": mismatches[:MISMATCH_PREVIEW].tolist()
         }
+        if result_cache is not None and cache_key is not None:
+            await asyncio.to_thread(
+                result_cache.store, cache_key, base_path, {"checked": verify_result, "mismatches": mismatch_summary}
+            )
+        await asyncio.to_thread(
+            save_snapshot, base_path, snapshot_files, operate, scale, row_count, sample_size, seed
+        )
 
         if is_async:
             tasks[id]["status"] = "completed"
             tasks[id]["stage"] = "done"
             tasks[id]["checked"] = verify_result
+            tasks[id]["mismatches"] = mismatch_summary
             tasks[id]["info"] = {
                 "desc": "Verify all done.",
                 "sub_stage": ""
             }
+            tasks.save(id)
 
         return verify_result
     
+    except asyncio.CancelledError:
+        stage_timer.stop()
+        record = {key: value for key, value in tasks.get(id, {}).items() if key != "cancel"}
+        cancel = tasks.get(id, {}).get("cancel") or {"status": "failed", "reason": "Verification was interrupted."}
+        TASKS_TOTAL.inc(status=cancel["status"])
+
+        # a cancelled task is dropped with its batches, any other interruption can be resumed
+        if cancel["status"] == "cancelled":
+            record.pop("checkpoint", None)
+        tasks[id] = {
+            **record,
+            "status": cancel["status"],
+            "error": cancel["reason"]
+        }
+
+        if cancel["status"] == "cancelled":
+            await cleanup_cancelled(id, split_n, DEFAULT_DIR_OUT / id, DEFAULT_URI)
+        raise
+
     except Exception as e:
+        stage_timer.stop()
+        TASKS_TOTAL.inc(status="failed")
+        # keep the rest of the record, the checkpoint in particular, so the task can be resumed
         tasks[id] = {
+            **{key: value for key, value in tasks.get(id, {}).items() if key != "cancel"},
             "status": "failed",
             "error": str(e)
         }
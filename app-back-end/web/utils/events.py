@@ -0,0 +1,61 @@
+import json
+import asyncio
+import threading
+
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+EVENT_QUEUE_SIZE = 64       # events a slow stream may lag behind before the oldest are dropped
+
+
+class TaskEvents:
+    # fans the changes of each task out to the streams subscribed to it
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(list)
+
+    def subscribe(self, id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(self.queue_size)
+        with self.lock:
+            self.subscribers[id].append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, id: str, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers[id] = [pair for pair in self.subscribers[id] if pair[1] is not queue]
+            if not self.subscribers[id]:
+                del self.subscribers[id]
+
+    def watched(self, id: str) -> bool:
+        with self.lock:
+            return id in self.subscribers
+
+    def publish(self, id: str, data: Dict[str, Any]):
+        with self.lock:
+            targets = list(self.subscribers.get(id, ()))
+        if not targets:
+            return
+
+        # serialized right away, the record keeps changing in place after this
+        payload = json.dumps(data, default=str)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        for loop, queue in targets:
+            if loop is running:
+                self._put(queue, payload)
+            else:
+                loop.call_soon_threadsafe(self._put, queue, payload)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, payload: str):
+        # a slow client misses intermediate events instead of piling them up
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+
+task_events = TaskEvents()
@@ -1,14 +1,28 @@
 import os
 import json
+import math
+import shutil
 import hashlib
 import asyncio
+import threading
+import numpy as np
 import pandas as pd
 
 from io import BytesIO
-from typing import List
+from typing import List, Optional
 from concurrent.futures import ThreadPoolExecutor
 
-from .http import check_exception, post_file, get_request
+from .index import RowIndex, RowIndexBuilder, INDEX_STEP
+from .metrics import timed, BATCH_STEP_SECONDS
+from .http import check_exception, post_file, link_file, get_request, download_file, VERIFY_TIMEOUT
+from .handoff import read_handoff_token, take_result
+
+SAMPLE_CHUNK_ROWS = 1_000_000
+INDEX_SCAN_RATIO = 0.5      # above this share of the file, a sequential scan beats seeking
+RESULT_CHUNK_ROWS = 1_000_000
+RESULT_HEADER = b"number,data\n"
+MATCHED_SUFFIX = b",true"
+COPY_BUFFER_SIZE = 16 * 1024 * 1024  # 16MB
 
 
 async def file_summary(file_cont: bytes):
@@ -30,6 +44,102 @@ async def file_summary(file_cont: bytes):
     }
 
 
+class StreamSummary:
+    def __init__(self, index_step: int = INDEX_STEP):
+        self.md5_hash = hashlib.md5()
+        self.columns = None
+        self.tail = b''
+        self.offset = 0
+        self.index_builder = RowIndexBuilder(index_step)
+
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.max = -math.inf
+        self.min = math.inf
+
+    def update(self, chunk: bytes):
+        self.md5_hash.update(chunk)
+
+        buffer = self.tail + chunk
+        end = buffer.rfind(b'\n')
+        if end < 0:
+            self.tail = buffer
+            return
+
+        self.tail = buffer[end + 1:]
+        self._parse_lines(buffer[:end + 1])
+
+    def _parse_lines(self, lines: bytes):
+        start_offset = self.offset
+        self.offset += len(lines)
+
+        if self.columns is None:
+            header_end = lines.find(b'\n')
+            self.columns = [c.strip() for c in lines[:header_end].decode().split(',')]
+            if "data" not in self.columns:
+                raise ValueError("The column 'data' is missing in the file.")
+            if "number" not in self.columns:
+                self.index_builder.valid = False
+
+            lines = lines[header_end + 1:]
+            start_offset += header_end + 1
+
+        if not lines.strip():
+            return
+
+        usecols = ["number", "data"] if self.index_builder.valid else ["data"]
+        chunk = pd.read_csv(BytesIO(lines), header=None, names=self.columns, usecols=usecols)
+        if self.index_builder.valid:
+            self.index_builder.add(lines, start_offset, chunk["number"].to_numpy(dtype=np.int64))
+
+        self._merge(chunk["data"].to_numpy(dtype=np.float64))
+
+    def _merge(self, data: np.ndarray):
+        n = len(data)
+        if n == 0:
+            return
+
+        chunk_mean = float(data.mean())
+        chunk_m2 = float(np.square(data - chunk_mean).sum())
+        self.merge_moments(n, chunk_mean, chunk_m2, float(data.max()), float(data.min()))
+
+    def merge_moments(self, n: int, mean: float, m2: float, max_value: float, min_value: float):
+        if n == 0:
+            return
+
+        # Chan/Welford combination of the running moments with a chunk's moments
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+        self.max = max(self.max, max_value)
+        self.min = min(self.min, min_value)
+
+    def result(self):
+        if self.tail.strip():
+            self._parse_lines(self.tail + b'\n')
+            self.offset -= 1
+        self.tail = b''
+
+        if self.columns is None:
+            raise ValueError("The column 'data' is missing in the file.")
+
+        return {
+            "md5": self.md5_hash.hexdigest(),
+            "items": self.count,
+            "mean": self.mean if self.count > 0 else math.nan,
+            "std": math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan,
+            "max": self.max if self.count > 0 else math.nan,
+            "min": self.min if self.count > 0 else math.nan
+        }
+
+    def row_index(self) -> Optional[RowIndex]:
+        return self.index_builder.build(self.offset, self.columns or [])
+
+
 async def process_files(
     part_files, 
     task_id,
@@ -38,24 +148,44 @@ async def process_files(
     workers, 
     scale, 
     result_dir, 
-    base_url
+    base_url,
+    port=None,
+    timings=None,
+    shared_dir=None
 ):
     real_file_id = f'{task_id}_{file_id}'
+    timings = {} if timings is None else timings
+
+    # a verifier on the same filesystem links the batch files instead of receiving them
+    token = read_handoff_token(shared_dir) if shared_dir is not None else None
+    with timed(timings, "upload", BATCH_STEP_SECONDS, step="upload"):
+        if token is not None:
+            uploads = await asyncio.gather(*(
+                link_file(base_url + "/link", part_files[label], party, real_file_id, token)
+                for party, label in (('Alice', 'A'), ('Bob', 'B'), ('Result', 'R'))
+            ))
+        else:
+            uploads = await asyncio.gather(*(
+                post_file(base_url + "/update", part_files[label], party, real_file_id)
+                for party, label in (('Alice', 'A'), ('Bob', 'B'), ('Result', 'R'))
+            ))
+    for response in uploads:
+        check_exception(response)
+
+    params = {
+        'id': real_file_id, 
+        'operate': str(operate), 
+        'workers': workers,
+        'scale': scale
+    }
+    if port is not None:
+        params['port'] = str(port)
 
-    check_exception(post_file(base_url + "/update", part_files['A'], 'Alice', real_file_id))
-    check_exception(post_file(base_url + "/update", part_files['B'], 'Bob', real_file_id))
-    check_exception(post_file(base_url + "/update", part_files['R'], 'Result', real_file_id))
-
-    response = get_request(
-        base_url + "/verify", 
-        params={
-            'id': real_file_id, 
-            'operate': str(operate), 
-            'workers': workers,
-            'scale': scale
-        }
-    )
+    with timed(timings, "verify", BATCH_STEP_SECONDS, step="verify"):
+        response = await get_request(base_url + "/verify", params, timeout=VERIFY_TIMEOUT)
     verify_response = json.loads(response.text)
+    if 'error' in verify_response:
+        raise ValueError(f"Error: {verify_response['error']}")
 
     share_info = verify_response['share_info']
     verify_info = verify_response['verify_info']
@@ -66,17 +196,145 @@ async def process_files(
     real_time = max(share_info['output_alice']['total_time'], share_info['output_bob']['total_time'])
     real_time += max(verify_info['output_alice']['total_time'], verify_info['output_bob']['total_time'])
 
-    response = get_request(base_url + "/result", params={'id': real_file_id})
     result_file = os.path.join(result_dir, f"result_{file_id}.csv")
-    with open(result_file, 'wb') as f:
-        f.write(response.content)
+    with timed(timings, "download", BATCH_STEP_SECONDS, step="download"):
+        if shared_dir is None or not take_result(shared_dir, real_file_id, result_file):
+            await download_file(base_url + "/result", {'id': real_file_id}, result_file)
 
     return result_file, verify_response['checked_errors'], real_comm, real_time
 
 
-def combine_results(result_files: str, combined_filename: str):
-    combined_df = pd.concat([pd.read_csv(f, dtype={'number': int, 'data': str}) for f in result_files])
-    combined_df.to_csv(combined_filename, index=False)
+def combine_results(
+    result_files: List[str], 
+    combined_filename: str, 
+    sample_indexes: Optional[np.ndarray] = None, 
+    mismatches_first: bool = False,
+    chunk_rows: int = RESULT_CHUNK_ROWS
+):
+    # batch outputs are streamed one chunk at a time, so memory stays bounded by chunk_rows
+    if sample_indexes is None and not mismatches_first:
+        with open(combined_filename, 'wb') as out:
+            out.write(RESULT_HEADER)
+            for result_file in result_files:
+                with open(result_file, 'rb') as f:
+                    f.readline()
+                    shutil.copyfileobj(f, out, COPY_BUFFER_SIZE)
+        return
+
+    # matched rows wait in a spool file until every mismatch has been written
+    spool_filename = f"{combined_filename}.matched"
+    with open(combined_filename, 'wb') as out, open(spool_filename, 'w+b') as spool:
+        out.write(RESULT_HEADER)
+        for result_file in result_files:
+            for chunk in pd.read_csv(result_file, dtype={'number': np.int64, 'data': str}, chunksize=chunk_rows):
+                if sample_indexes is not None:
+                    # batch-local row numbers count from 1 over the whole sample
+                    chunk['number'] = sample_indexes[chunk['number'].to_numpy() - 1]
+
+                if not mismatches_first:
+                    out.write(chunk.to_csv(header=False, index=False, lineterminator='\n').encode())
+                    continue
+
+                matched = (chunk['data'] == 'true').to_numpy()
+                out.write(chunk[~matched].to_csv(header=False, index=False, lineterminator='\n').encode())
+                spool.write(chunk[matched].to_csv(header=False, index=False, lineterminator='\n').encode())
+
+        spool.seek(0)
+        shutil.copyfileobj(spool, out, COPY_BUFFER_SIZE)
+    os.remove(spool_filename)
+
+
+def index_results(combined_filename: str, mismatch_filename: str, step: int = INDEX_STEP):
+    # one pass over Verified.csv: copies the mismatched rows aside and indexes the offsets
+    # of every step-th row of both files, so a page can be read without scanning
+    rows, mismatches = 0, 0
+    row_offsets, mismatch_offsets = [], []
+
+    with open(combined_filename, 'rb') as f, open(mismatch_filename, 'wb') as out:
+        header = f.readline()
+        out.write(header)
+        offset, mismatch_offset = len(header), len(header)
+
+        def index_lines(lines: bytes):
+            nonlocal rows, mismatches, offset, mismatch_offset
+
+            raw = np.frombuffer(lines, dtype=np.uint8)
+            line_ends = np.flatnonzero(raw == ord('\n'))
+            line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+            lengths = line_ends - line_starts + 1
+
+            matched = lengths > len(MATCHED_SUFFIX)
+            for k, byte in enumerate(MATCHED_SUFFIX):
+                matched &= raw[np.maximum(line_ends - len(MATCHED_SUFFIX) + k, 0)] == byte
+            mismatch_lengths = lengths[~matched]
+
+            picked = np.arange((-rows) % step, len(line_ends), step)
+            row_offsets.append(line_starts[picked] + offset)
+
+            mismatch_starts = np.concatenate([[0], np.cumsum(mismatch_lengths)[:-1]])
+            picked = np.arange((-mismatches) % step, len(mismatch_lengths), step)
+            mismatch_offsets.append(mismatch_starts[picked] + mismatch_offset)
+
+            out.write(raw[np.repeat(~matched, lengths)].tobytes())
+
+            rows += len(line_ends)
+            mismatches += len(mismatch_lengths)
+            offset += len(lines)
+            mismatch_offset += int(mismatch_lengths.sum())
+
+        tail = b''
+        while block := f.read(COPY_BUFFER_SIZE):
+            buffer = tail + block
+            end = buffer.rfind(b'\n')
+            if end < 0:
+                tail = buffer
+                continue
+
+            tail = buffer[end + 1:]
+            index_lines(buffer[:end + 1])
+
+        if tail.strip():
+            index_lines(tail + b'\n')
+            offset -= 1
+
+    columns = [c.strip() for c in header.decode().split(',')]
+    for file, count, offsets, size in (
+        (combined_filename, rows, row_offsets, offset),
+        (mismatch_filename, mismatches, mismatch_offsets, mismatch_offset)
+    ):
+        RowIndex(
+            np.arange(0, count, step, dtype=np.int64),
+            np.concatenate(offsets).astype(np.int64) if offsets else np.empty(0, np.int64),
+            step,
+            count,
+            size,
+            columns
+        ).save(file)
+
+    return rows, mismatches
+
+
+def read_indexed_rows(file: str, row_index: RowIndex, offset: int, limit: int) -> bytes:
+    # rows [offset, offset + limit) of a file indexed by row position
+    end = min(offset + limit, row_index.rows)
+    if offset >= end:
+        return b''
+
+    first_block = offset // row_index.step
+    last_block = (end - 1) // row_index.step
+    bounds = np.append(row_index.offsets, row_index.size)
+
+    with open(file, 'rb') as f:
+        f.seek(int(bounds[first_block]))
+        lines = f.read(int(bounds[last_block + 1] - bounds[first_block]))
+    if not lines.endswith(b'\n'):
+        lines += b'\n'
+
+    raw = np.frombuffer(lines, dtype=np.uint8)
+    line_ends = np.flatnonzero(raw == ord('\n'))
+    skip = offset - first_block * row_index.step
+    start = int(line_ends[skip - 1]) + 1 if skip > 0 else 0
+    return lines[start:int(line_ends[skip + end - offset - 1]) + 1]
 
 
 def save_part(pair):
@@ -89,6 +347,19 @@ def save_part_csv(part_df: pd.DataFrame, part_file_name):
     part_df.to_csv(part_file_name, index=True, index_label='number')
 
 
+def save_part_bin(part_df: pd.DataFrame, part_file_name):
+    # columnar little-endian layout: n int64 numbers followed by n float64 data
+    with open(part_file_name, 'wb') as f:
+        part_df.index.to_numpy(dtype='<i8').tofile(f)
+        part_df['data'].to_numpy(dtype='<f8').tofile(f)
+
+
+BATCH_WRITERS = {
+    'csv': save_part_csv,
+    'bin': save_part_bin,
+}
+
+
 async def split_csv(df: pd.DataFrame, file_name: str, num_parts: int, output_dir: str):
     rows_per_part = len(df) // num_parts
     remainder = len(df) % num_parts
@@ -116,19 +387,22 @@ async def split_csv(df: pd.DataFrame, file_name: str, num_parts: int, output_dir
     return part_filenames
 
 
-async def boost_split_csv(df: pd.DataFrame, file: str, data_len: int, num_parts: int, output_dir: str):
-    rows_per_part = data_len // num_parts
-    remainder = data_len % num_parts
+async def boost_split_csv(
+    df: pd.DataFrame, 
+    file: str, 
+    data_len: int, 
+    num_parts: int, 
+    output_dir: str, 
+    batch_format: str = 'csv'
+):
     base_name = os.path.basename(file)
-    name, ext = os.path.splitext(base_name)
+    name, _ = os.path.splitext(base_name)
+    ext = f'.{batch_format}'
+    save_part = BATCH_WRITERS[batch_format]
 
     os.makedirs(output_dir, exist_ok=True)
     part_filenames = []
-
-    part_ranges = [
-        (i * rows_per_part + min(i, remainder), (i + 1) * rows_per_part + min(i + 1, remainder))
-        for i in range(num_parts)
-    ]
+    part_ranges = get_part_ranges(data_len, num_parts)
 
     with ThreadPoolExecutor() as executor:
         futures = []
@@ -136,7 +410,7 @@ async def boost_split_csv(df: pd.DataFrame, file: str, data_len: int, num_parts:
             part_df = df.iloc[start_idx:end_idx] 
             part_file_name = os.path.join(output_dir, f"{name}-{i + 1}{ext}")
             part_filenames.append(part_file_name)
-            futures.append(executor.submit(save_part_csv, part_df, part_file_name))
+            futures.append(executor.submit(save_part, part_df, part_file_name))
             await asyncio.sleep(0.01)
         
         for future in futures:
@@ -146,8 +420,134 @@ async def boost_split_csv(df: pd.DataFrame, file: str, data_len: int, num_parts:
     return part_filenames
 
 
-def check_equal_row_count(dfs: List[pd.DataFrame]):
-    row_counts = [len(df) for df in dfs]
+def get_part_ranges(data_len: int, num_parts: int):
+    rows_per_part = data_len // num_parts
+    remainder = data_len % num_parts
+    return [
+        (i * rows_per_part + min(i, remainder), (i + 1) * rows_per_part + min(i + 1, remainder))
+        for i in range(num_parts)
+    ]
+
+
+def sample_split_csv(
+    file: str, 
+    sample_indexes: np.ndarray, 
+    num_parts: int, 
+    output_dir: str, 
+    batch_format: str = 'csv', 
+    chunk_rows: int = SAMPLE_CHUNK_ROWS,
+    stop: Optional[threading.Event] = None,
+    parsed: Optional[np.ndarray] = None
+):
+    # sample_indexes must be sorted: the file is streamed once and every chunk only
+    # keeps the rows whose number is in the sample, so memory follows the sample size
+    name, _ = os.path.splitext(os.path.basename(file))
+    save_part = BATCH_WRITERS[batch_format]
+    sample_size = len(sample_indexes)
+    part_sizes = [end - start for start, end in get_part_ranges(sample_size, num_parts)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    part_filenames = []
+    pending: List[pd.DataFrame] = []
+    pending_rows, matched, last_number = 0, 0, None
+
+    def flush_ready_parts():
+        nonlocal pending, pending_rows
+
+        while len(part_filenames) < num_parts and pending_rows >= part_sizes[len(part_filenames)]:
+            take = part_sizes[len(part_filenames)]
+            block = pd.concat(pending) if len(pending) > 1 else pending[0]
+
+            part_file_name = os.path.join(output_dir, f"{name}-{len(part_filenames) + 1}.{batch_format}")
+            save_part(block.iloc[:take].set_index('number'), part_file_name)
+            part_filenames.append(part_file_name)
+
+            pending = [block.iloc[take:]]
+            pending_rows -= take
+
+    for chunk in iter_sampled_chunks(file, sample_indexes, chunk_rows, parsed):
+        if stop is not None and stop.is_set():
+            raise InterruptedError(f"Splitting {file} was stopped.")
+
+        numbers = chunk['number'].to_numpy()
+        if len(numbers) == 0:
+            continue
+
+        if (last_number is not None and numbers[0] < last_number) or np.any(numbers[1:] < numbers[:-1]):
+            raise ValueError(f"Rows of {file} must be sorted by 'number' for sampled reading.")
+        last_number = numbers[-1]
+
+        positions = np.searchsorted(sample_indexes, numbers)
+        in_range = positions < sample_size
+        hit = np.zeros(len(numbers), dtype=bool)
+        hit[in_range] = sample_indexes[positions[in_range]] == numbers[in_range]
+
+        picked = chunk[hit]
+        matched += len(picked)
+        pending.append(picked)
+        pending_rows += len(picked)
+        flush_ready_parts()
+
+    if matched != sample_size:
+        raise ValueError(f"Only {matched} of {sample_size} sampled rows were found in {file}.")
+
+    if not pending:
+        pending = [pd.DataFrame({'number': np.empty(0, np.int64), 'data': np.empty(0, np.float64)})]
+    flush_ready_parts()
+
+    return part_filenames
+
+
+def iter_sampled_chunks(
+    file: str,
+    sample_indexes: np.ndarray,
+    chunk_rows: int = SAMPLE_CHUNK_ROWS,
+    parsed: Optional[np.ndarray] = None
+):
+    # parsed: the memory-mapped columns of the file from the ColumnCache, picked without any parsing
+    if parsed is not None:
+        # only exact hits: a sampled number missing from the file is left out for the count check
+        positions = np.searchsorted(parsed['number'], sample_indexes)
+        in_range = positions < len(parsed)
+        hit = np.zeros(len(positions), dtype=bool)
+        hit[in_range] = parsed['number'][positions[in_range]] == sample_indexes[in_range]
+        positions = positions[hit]
+        for start in range(0, len(positions), chunk_rows):
+            block = parsed[positions[start:start + chunk_rows]]
+            yield pd.DataFrame({'number': block['number'], 'data': block['data']})
+        return
+
+    columns = {'number': np.int64, 'data': np.float64}
+
+    row_index = RowIndex.load(file)
+    if row_index is not None:
+        ranges = row_index.block_ranges(sample_indexes)
+        if sum(end - start for start, end in ranges) < INDEX_SCAN_RATIO * row_index.size:
+            for block in row_index.read_ranges(file, ranges):
+                yield pd.read_csv(
+                    block, header=None, names=row_index.columns, usecols=list(columns), dtype=columns
+                )
+            return
+
+    yield from pd.read_csv(file, usecols=list(columns), dtype=columns, chunksize=chunk_rows)
+
+
+def count_csv_rows(file: str):
+    newlines, last = 0, b'\n'
+    with open(file, 'rb') as f:
+        while chunk := f.read(16 * 1024 * 1024):
+            newlines += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        newlines += 1
+    return max(newlines - 1, 0)
+
+
+def check_equal_counts(row_counts: List[int]):
     if len(set(row_counts)) > 1:
         raise ValueError("Error: CSV files have different number of rows.")
     return row_counts[0]
+
+
+def check_equal_row_count(dfs: List[pd.DataFrame]):
+    return check_equal_counts([len(df) for df in dfs])
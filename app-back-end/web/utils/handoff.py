@@ -0,0 +1,34 @@
+import os
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+HANDOFF_TOKEN_FILE = ".handoff"
+
+
+def read_handoff_token(data_dir: Path) -> Optional[str]:
+    # only readable by a client sharing the verifier's filesystem, /link requires it
+    try:
+        return (Path(data_dir) / HANDOFF_TOKEN_FILE).read_text().strip() or None
+    except OSError:
+        return None
+
+
+def shared_data_dir(info: Optional[Dict[str, Any]], split_dir: Path) -> Optional[Path]:
+    # the verifier's data dir when we can read its handoff token there and it links files from split_dir
+    if not info or not info.get("data_dir") or not info.get("link_root"):
+        return None
+    if not Path(split_dir).resolve().is_relative_to(Path(info["link_root"])):
+        return None
+
+    data_dir = Path(info["data_dir"])
+    return data_dir if read_handoff_token(data_dir) is not None else None
+
+
+def take_result(shared_dir: Path, file_id: str, result_file: str) -> bool:
+    # moves the verifier's result into place, False when it has to be downloaded instead
+    try:
+        os.replace(shared_dir / file_id / "finalResult.csv", result_file)
+    except OSError:
+        return False
+    return True
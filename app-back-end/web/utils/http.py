@@ -1,19 +1,80 @@
+import os
 import json
-import requests
+import asyncio
+import httpx
+import aiofiles
 
+from typing import Optional
 
-def post_file(url, file_path, party, file_id):
+
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.)
+DEFAULT_TIMEOUT = httpx.Timeout(30.)
+UPLOAD_TIMEOUT = httpx.Timeout(30., write=600.)
+DOWNLOAD_TIMEOUT = httpx.Timeout(30., read=600.)
+VERIFY_TIMEOUT = httpx.Timeout(30., read=None)   # MPC verification of one batch may run for a long time
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(limits=POOL_LIMITS, timeout=DEFAULT_TIMEOUT)
+        _client_loop = loop
+    return _client
+
+
+async def close_client():
+    global _client, _client_loop
+
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client, _client_loop = None, None
+
+
+async def post_file(url, file_path, party, file_id, timeout=UPLOAD_TIMEOUT):
     with open(file_path, 'rb') as file:
-        files = {'file': file}
-        response = requests.post(url, data={'id': file_id, 'party': party}, files=files)
+        files = {'file': (os.path.basename(file_path), file)}
+        response = await get_client().post(
+            url,
+            data={'id': str(file_id), 'party': party},
+            files=files,
+            timeout=timeout
+        )
+    return response.text
+
+
+async def link_file(url, file_path, party, file_id, token, timeout=DEFAULT_TIMEOUT):
+    # same as post_file for a verifier sharing our filesystem, only the path and the handoff token are sent
+    response = await get_client().post(
+        url,
+        data={'id': str(file_id), 'party': party, 'path': os.path.abspath(file_path), 'token': token},
+        timeout=timeout
+    )
     return response.text
 
 
-def get_request(url, params):
-    response = requests.get(url, params=params)
+async def get_request(url, params, timeout=DEFAULT_TIMEOUT):
+    response = await get_client().get(url, params=params, timeout=timeout)
     return response
 
 
+async def download_file(url, params, save_path, timeout=DOWNLOAD_TIMEOUT):
+    async with get_client().stream('GET', url, params=params, timeout=timeout) as response:
+        if response.status_code != 200:
+            await response.aread()
+            check_exception(response.text)
+            response.raise_for_status()
+
+        async with aiofiles.open(save_path, 'wb') as f:
+            async for chunk in response.aiter_bytes(1024 * 1024):
+                await f.write(chunk)
+    return save_path
+
+
 def check_exception(response: str):
     resp_json = json.loads(response)
     if 'error' in resp_json:
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .file import RESULT_HEADER, RESULT_CHUNK_ROWS
+from .index import RowIndex
+from .sampler import draw_sample
+from .mismatch import mismatch_path
+
+INCREMENTAL_MAX_RATIO = 0.5     # beyond this share of changed sampled rows everything is verified again
+RESULT_DTYPES = {'number': np.int64, 'data': str}
+LAST_NUMBER = int(np.iinfo(np.int64).max)
+
+
+def snapshot_path(task_dir: Path) -> Path:
+    return Path(task_dir) / "Verified.blocks.npz"
+
+
+def remove_snapshot(task_dir: Path):
+    snapshot_path(task_dir).unlink(missing_ok=True)
+
+
+def save_snapshot(
+    task_dir: Path,
+    party_files: Dict[str, Path],
+    operate: int,
+    scale: int,
+    row_count: int,
+    sample_size: int,
+    seed: int
+) -> bool:
+    # block hashes of the uploads Verified.csv was produced from, what the next upload is compared to
+    row_indexes = {label: RowIndex.load(file) for label, file in party_files.items()}
+    if any(row_index is None or row_index.hashes is None for row_index in row_indexes.values()):
+        remove_snapshot(task_dir)
+        return False
+
+    numbers = row_indexes['R'].numbers
+    with open(snapshot_path(task_dir), 'wb') as f:
+        np.savez(
+            f,
+            numbers=numbers,
+            meta=np.array([row_indexes['R'].step, row_count, operate, scale, sample_size, seed], dtype=np.int64),
+            **{f"hashes_{label}": row_index.hashes for label, row_index in row_indexes.items()}
+        )
+    return True
+
+
+def plan_incremental(
+    task_dir: Path,
+    party_files: Dict[str, Path],
+    operate: int,
+    scale: int,
+    row_count: int,
+    sample_size: int,
+    seed: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    # None unless the last verification of the task can be updated: same operator, scale and sample,
+    # and every upload indexed with the same row layout, only the content of some blocks changed
+    path = snapshot_path(task_dir)
+    if not path.exists() or not (Path(task_dir) / "Verified.csv").exists() or not mismatch_path(task_dir).exists():
+        return None
+
+    with np.load(path) as saved:
+        step, snap_rows, snap_operate, snap_scale, snap_sample, snap_seed = (int(x) for x in saved['meta'])
+        numbers = saved['numbers']
+        hashes = {label: saved[f"hashes_{label}"] for label in party_files}
+
+    if (snap_operate, snap_scale, snap_rows, snap_sample) != (operate, scale, row_count, sample_size):
+        return None
+    if sample_size != row_count and seed is not None and seed != snap_seed:
+        return None
+
+    changed = np.zeros(len(numbers), dtype=bool)
+    for label, file in party_files.items():
+        row_index = RowIndex.load(file)
+        if row_index is None or row_index.hashes is None or row_index.step != step:
+            return None
+        if not np.array_equal(row_index.numbers, numbers):
+            return None
+        changed |= row_index.hashes != hashes[label]
+
+    sample_indexes = draw_sample(row_count, sample_size, snap_seed)
+    blocks = np.searchsorted(numbers, sample_indexes, side='right') - 1
+    picked = (blocks >= 0) & changed[np.maximum(blocks, 0)]
+
+    # runs of changed blocks as [first number, first number after the run) ranges
+    changed_blocks = np.flatnonzero(changed)
+    breaks = np.flatnonzero(np.diff(changed_blocks) != 1)
+    run_starts = np.concatenate([changed_blocks[:1], changed_blocks[breaks + 1]])
+    run_ends = np.concatenate([changed_blocks[breaks], changed_blocks[-1:]]) + 1
+    bounds = np.append(numbers, LAST_NUMBER)
+
+    return {
+        "seed": snap_seed,
+        "sample_indexes": sample_indexes[picked],
+        "changed": [[int(bounds[s]), int(bounds[e])] for s, e in zip(run_starts, run_ends)],
+        "changed_blocks": len(changed_blocks),
+    }
+
+
+def in_ranges(numbers: np.ndarray, ranges: List[List[int]]) -> np.ndarray:
+    if not ranges:
+        return np.zeros(len(numbers), dtype=bool)
+
+    starts, ends = np.array(ranges, dtype=np.int64).T
+    at = np.searchsorted(starts, numbers, side='right') - 1
+    return (at >= 0) & (numbers < ends[np.maximum(at, 0)])
+
+
+def merge_results(
+    verified_filename: str,
+    result_files: List[str],
+    changed: List[List[int]],
+    merged_filename: str,
+    chunk_rows: int = RESULT_CHUNK_ROWS
+):
+    # rows of the changed ranges are replaced by the re-verified ones; both sides are sorted by
+    # number, so they are merged a chunk at a time
+    fresh = (
+        chunk
+        for result_file in result_files
+        for chunk in pd.read_csv(result_file, dtype=RESULT_DTYPES, chunksize=chunk_rows)
+    )
+    pending = pd.DataFrame({'number': np.empty(0, np.int64), 'data': np.empty(0, str)})
+
+    def write(out, block: pd.DataFrame):
+        out.write(block.to_csv(header=False, index=False, lineterminator='\n').encode())
+
+    with open(merged_filename, 'wb') as out:
+        out.write(RESULT_HEADER)
+        for chunk in pd.read_csv(verified_filename, dtype=RESULT_DTYPES, chunksize=chunk_rows):
+            if len(chunk) == 0:
+                continue
+            last = chunk['number'].iloc[-1]
+            while len(pending) == 0 or pending['number'].iloc[-1] <= last:
+                block = next(fresh, None)
+                if block is None:
+                    break
+                pending = pd.concat([pending, block])
+
+            due = (pending['number'] <= last).to_numpy()
+            kept = chunk[~in_ranges(chunk['number'].to_numpy(), changed)]
+            write(out, pd.concat([kept, pending[due]]).sort_values('number', kind='stable'))
+            pending = pending[~due]
+
+        write(out, pending)
+        for block in fresh:
+            write(out, block)
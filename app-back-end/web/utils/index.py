@@ -0,0 +1,166 @@
+import os
+import hashlib
+import numpy as np
+
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+
+INDEX_STEP = 4096   # rows between two indexed offsets
+
+
+def index_path(file: str) -> Path:
+    file = Path(file)
+    return file.with_name(f"{file.stem}.idx.npz")
+
+
+def block_hash(hasher) -> int:
+    return int.from_bytes(hasher.digest(), 'little')
+
+
+class RowIndex:
+    def __init__(
+        self,
+        numbers: np.ndarray,
+        offsets: np.ndarray,
+        step: int,
+        rows: int,
+        size: int,
+        columns: List[str],
+        hashes: Optional[np.ndarray] = None
+    ):
+        self.numbers = numbers
+        self.offsets = offsets
+        self.step = step
+        self.rows = rows
+        self.size = size
+        self.columns = columns
+        self.hashes = hashes    # content hash of the raw lines of every indexed block, None if not hashed
+
+    def save(self, file: str):
+        stat = os.stat(file)
+        extra = {} if self.hashes is None else {"hashes": self.hashes}
+        with open(index_path(file), 'wb') as f:
+            np.savez(
+                f,
+                numbers=self.numbers,
+                offsets=self.offsets,
+                meta=np.array([self.step, self.rows, self.size, stat.st_mtime_ns], dtype=np.int64),
+                columns=np.array(self.columns),
+                **extra
+            )
+
+    @staticmethod
+    def load(file: str) -> Optional["RowIndex"]:
+        path = index_path(file)
+        if not path.exists():
+            return None
+
+        with np.load(path) as saved:
+            step, rows, size, mtime_ns = (int(x) for x in saved['meta'])
+            row_index = RowIndex(
+                saved['numbers'], saved['offsets'], step, rows, size, saved['columns'].tolist(),
+                saved['hashes'] if 'hashes' in saved.files else None
+            )
+
+        # a file rewritten after its index was saved makes the index useless
+        stat = os.stat(file)
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            return None
+        return row_index
+
+    @staticmethod
+    def remove(file: str):
+        path = index_path(file)
+        if path.exists():
+            os.remove(path)
+
+    def block_ranges(self, sorted_numbers: np.ndarray, max_blocks: int = 256) -> List[Tuple[int, int]]:
+        if len(sorted_numbers) == 0 or len(self.numbers) == 0:
+            return []
+
+        blocks = np.searchsorted(self.numbers, sorted_numbers, side='right') - 1
+        blocks = np.unique(blocks[blocks >= 0])
+
+        # coalesce neighbouring blocks so every contiguous run is one read of at most max_blocks blocks
+        breaks = np.flatnonzero((np.diff(blocks) != 1) | (np.arange(1, len(blocks)) % max_blocks == 0))
+        run_starts = np.concatenate([blocks[:1], blocks[breaks + 1]])
+        run_ends = np.concatenate([blocks[breaks], blocks[-1:]]) + 1
+
+        bounds = np.append(self.offsets, self.size)
+        return [(int(bounds[s]), int(bounds[e])) for s, e in zip(run_starts, run_ends)]
+
+    def read_ranges(self, file: str, ranges: List[Tuple[int, int]]):
+        with open(file, 'rb') as f:
+            for start, end in ranges:
+                f.seek(start)
+                yield BytesIO(f.read(end - start))
+
+
+class RowIndexBuilder:
+    def __init__(self, step: int = INDEX_STEP):
+        self.step = step
+        self.numbers: List[np.ndarray] = []
+        self.offsets: List[np.ndarray] = []
+        self.rows = 0
+        self.last_number = None
+        self.valid = True
+        self.hashes: List[int] = []
+        self.hasher = None
+
+    def add(self, lines: bytes, start_offset: int, numbers: np.ndarray):
+        if not self.valid or len(numbers) == 0:
+            self.rows += len(numbers)
+            return
+
+        if (self.last_number is not None and numbers[0] < self.last_number) or np.any(numbers[1:] < numbers[:-1]):
+            self.valid = False     # only files sorted by number can be searched
+            return
+        self.last_number = numbers[-1]
+
+        raw = np.frombuffer(lines, dtype=np.uint8)
+        line_ends = np.flatnonzero(raw == ord('\n'))
+        line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+
+        # blank lines are skipped by the parser, so they get no row either
+        non_blank = (line_ends - line_starts) > (raw[np.maximum(line_ends - 1, 0)] == ord('\r'))
+        row_starts = line_starts[non_blank]
+        if len(row_starts) != len(numbers):
+            self.valid = False
+            return
+
+        picked = np.arange((-self.rows) % self.step, len(numbers), self.step)
+        self.numbers.append(numbers[picked].astype(np.int64))
+        self.offsets.append(row_starts[picked].astype(np.int64) + start_offset)
+        self.rows += len(numbers)
+        self._hash_blocks(memoryview(lines), row_starts[picked].tolist())
+
+    def _hash_blocks(self, lines: memoryview, block_starts: List[int]):
+        # lines before the first block start belong to the block still open from the last chunk
+        ends = block_starts + [len(lines)]
+        if self.hasher is not None:
+            self.hasher.update(lines[:ends[0]])
+
+        for start, end in zip(block_starts, ends[1:]):
+            if self.hasher is not None:
+                self.hashes.append(block_hash(self.hasher))
+            self.hasher = hashlib.blake2b(lines[start:end], digest_size=8)
+
+    def build(self, size: int, columns: List[str]) -> Optional[RowIndex]:
+        if not self.valid:
+            return None
+
+        if self.hasher is not None:
+            self.hashes.append(block_hash(self.hasher))
+            self.hasher = None
+
+        return RowIndex(
+            np.concatenate(self.numbers) if self.numbers else np.empty(0, np.int64),
+            np.concatenate(self.offsets) if self.offsets else np.empty(0, np.int64),
+            self.step,
+            self.rows,
+            size,
+            columns,
+            np.array(self.hashes, dtype=np.uint64)
+        )
@@ -0,0 +1,195 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+from numpy.lib.format import open_memmap
+
+from .index import RowIndex
+
+try:
+    import pyarrow
+    import pyarrow.csv as pa_csv
+except ImportError:     # pandas parses the ranges when pyarrow is missing or unusable
+    pa_csv = None
+
+COLUMNS = {'number': np.int64, 'data': np.float64}
+COLUMN_DTYPE = np.dtype([('number', np.int64), ('data', np.float64)])
+INGEST_CHUNK_ROWS = 1_000_000
+INGEST_RANGE_ROWS = 4_000_000   # rows parsed by one worker at a time
+COLUMN_CACHE_BUDGET = 8 * 1024 ** 3     # 8GB
+
+
+def parse_csv_bytes(raw: bytes, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    if pa_csv is not None:
+        table = pa_csv.read_csv(
+            pyarrow.py_buffer(raw),
+            read_options=pa_csv.ReadOptions(column_names=names),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pyarrow.from_numpy_dtype(dtype) for name, dtype in COLUMNS.items()},
+                include_columns=list(COLUMNS)
+            )
+        )
+        return table['number'].to_numpy(), table['data'].to_numpy()
+
+    df = pd.read_csv(BytesIO(raw), header=None, names=names, usecols=list(COLUMNS), dtype=COLUMNS)
+    return df['number'].to_numpy(), df['data'].to_numpy()
+
+
+def parse_range(file: str, start: int, end: int, names: List[str], target: str, row_start: int, rows: int):
+    # runs in a worker process: parses one byte range of rows straight into the shared column file
+    with open(file, 'rb') as f:
+        f.seek(start)
+        numbers, data = parse_csv_bytes(f.read(end - start), names)
+    if len(numbers) != rows:
+        raise ValueError(f"Expected {rows} rows in bytes {start}-{end} of {file}, parsed {len(numbers)}.")
+
+    columns = open_memmap(target, mode='r+')
+    columns['number'][row_start:row_start + rows] = numbers
+    columns['data'][row_start:row_start + rows] = data
+    columns.flush()
+    del columns
+
+
+class ColumnCache:
+    # parsed number/data columns of uploaded files, keyed by the file's MD5 and memory-mapped
+    # when read; the least recently used files are evicted beyond the disk budget
+    def __init__(self, cache_dir: Path, budget: int = COLUMN_CACHE_BUDGET):
+        self.cache_dir = Path(cache_dir)
+        self.budget = budget
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, md5: str) -> Path:
+        return self.cache_dir / f"{md5}.npy"
+
+    def load(self, md5: str) -> Optional[np.ndarray]:
+        path = self.path(md5)
+        try:
+            columns = np.load(path, mmap_mode='r')
+            os.utime(path)      # the modification time orders the eviction
+        except (OSError, ValueError):
+            return None
+        return columns
+
+    def get(
+        self,
+        file: str,
+        md5: Optional[str],
+        rows: int,
+        executor: Optional[Executor] = None,
+        stop: Optional[threading.Event] = None
+    ) -> Optional[np.ndarray]:
+        # None when the file can't be cached: unknown MD5, or rows not sorted by number
+        if md5 is None:
+            return None
+
+        columns = self.load(md5)
+        if columns is not None:
+            return columns
+
+        target = self.cache_dir / f"{md5}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        try:
+            built = self.build(file, target, rows, executor, stop)
+            if not built:
+                return None
+            os.replace(target, self.path(md5))
+        finally:
+            if target.exists():
+                os.remove(target)
+
+        self.evict(keep=md5)
+        return self.load(md5)
+
+    def build(
+        self,
+        file: str,
+        target: Path,
+        rows: int,
+        executor: Optional[Executor],
+        stop: Optional[threading.Event]
+    ) -> bool:
+        row_index = RowIndex.load(file)
+        if row_index is None:
+            return self.build_sequential(file, target, rows, stop)
+        if row_index.rows != rows:
+            raise ValueError(f"{file} has {row_index.rows} rows, {rows} were uploaded.")
+
+        # indexed blocks start at known rows and byte offsets, so ranges are parsed in parallel
+        open_memmap(target, mode='w+', dtype=COLUMN_DTYPE, shape=(row_index.rows,)).flush()
+        bounds = np.append(row_index.offsets, row_index.size)
+        blocks_per_range = max(INGEST_RANGE_ROWS // row_index.step, 1)
+
+        jobs = []
+        for first in range(0, len(row_index.offsets), blocks_per_range):
+            last = min(first + blocks_per_range, len(row_index.offsets))
+            row_start = first * row_index.step
+            range_rows = min(last * row_index.step, row_index.rows) - row_start
+            jobs.append(
+                (file, int(bounds[first]), int(bounds[last]), row_index.columns, str(target), row_start, range_rows)
+            )
+
+        pool = executor if executor is not None else ThreadPoolExecutor(os.cpu_count() or 1)
+        try:
+            futures = [pool.submit(parse_range, *job) for job in jobs]
+            for future in as_completed(futures):
+                if stop is not None and stop.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    raise InterruptedError(f"Parsing {file} was stopped.")
+                future.result()
+        finally:
+            if executor is None:
+                pool.shutdown(wait=True)
+        return True
+
+    def build_sequential(self, file: str, target: Path, rows: int, stop: Optional[threading.Event]) -> bool:
+        columns = open_memmap(target, mode='w+', dtype=COLUMN_DTYPE, shape=(rows,))
+        filled, last_number = 0, None
+        for chunk in pd.read_csv(file, usecols=list(COLUMNS), dtype=COLUMNS, chunksize=INGEST_CHUNK_ROWS):
+            if stop is not None and stop.is_set():
+                raise InterruptedError(f"Parsing {file} was stopped.")
+
+            numbers = chunk['number'].to_numpy()
+            if len(numbers) == 0:
+                continue
+            if (last_number is not None and numbers[0] < last_number) or np.any(numbers[1:] < numbers[:-1]):
+                return False
+            if filled + len(numbers) > rows:
+                raise ValueError(f"{file} has more than the {rows} rows it was uploaded with.")
+            last_number = numbers[-1]
+
+            columns['number'][filled:filled + len(numbers)] = numbers
+            columns['data'][filled:filled + len(numbers)] = chunk['data'].to_numpy()
+            filled += len(numbers)
+
+        if filled != rows:
+            raise ValueError(f"{file} has {filled} rows, {rows} were uploaded.")
+        columns.flush()
+        del columns
+        return True
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        with self.lock:
+            cached = []
+            for path in self.cache_dir.glob("*.npy"):
+                if path.name.endswith(".tmp.npy"):
+                    continue
+                stat = path.stat()
+                cached.append((stat.st_mtime, stat.st_size, path))
+
+            removed, total = 0, sum(size for _, size, _ in cached)
+            for _, size, path in sorted(cached):
+                if total <= self.budget:
+                    break
+                if path.stem == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        return removed
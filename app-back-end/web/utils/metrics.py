@@ -0,0 +1,151 @@
+import time
+import threading
+
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# exported in the Prometheus text format, see render_metrics()
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1., 2.5, 5., 10., 30., 60., 120., 300., 600., 1800., 3600.)
+
+_registry: List["Metric"] = []
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1., **labels):
+        with self.lock:
+            self.values[self.key(labels)] += amount
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = dict(self.values)
+        return super().render() + [f"{self.name}{self.label_text(key)} {value}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.sums[key] += value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            counts = {key: list(value) for key, value in self.counts.items()}
+            sums = dict(self.sums)
+
+        lines = super().render()
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), bucket_counts):
+                cumulative += count
+                bound_label = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self.label_text(key, bound_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self.label_text(key)} {sums[key]}")
+            lines.append(f"{self.name}_count{self.label_text(key)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+@contextmanager
+def timed(timings: Dict[str, float], key: str, histogram: Optional[Histogram] = None, **labels):
+    # adds the elapsed seconds to timings[key] and to the histogram, also when the block raises
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        timings[key] = round(timings.get(key, 0.) + elapsed, 6)
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+
+
+class StageTimer:
+    # times consecutive stages: starting a stage ends the one before it
+    def __init__(self, timings: Dict[str, float], histogram: Histogram):
+        self.timings = timings
+        self.histogram = histogram
+        self.stage = None
+        self.started = 0.
+
+    def start(self, stage: str):
+        self.stop()
+        self.stage = stage
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if self.stage is None:
+            return
+
+        elapsed = time.perf_counter() - self.started
+        self.timings[self.stage] = round(self.timings.get(self.stage, 0.) + elapsed, 6)
+        self.histogram.observe(elapsed, stage=self.stage)
+        self.stage = None
+
+
+STAGE_SECONDS = Histogram(
+    "verify_stage_seconds", "Wall-clock seconds of each verification stage.", ("stage",)
+)
+SPLIT_SECONDS = Histogram(
+    "verify_split_seconds", "Wall-clock seconds to sample and split the data of one party.", ("party",)
+)
+BATCH_STEP_SECONDS = Histogram(
+    "verify_batch_step_seconds", "Wall-clock seconds of each step of one verified batch.", ("step",)
+)
+TASKS_TOTAL = Counter(
+    "verify_tasks_total", "Verification tasks by final status.", ("status",)
+)
+BATCHES_TOTAL = Counter(
+    "verify_batches_total", "Batches verified by the remote verifier."
+)
+ROWS_TOTAL = Counter(
+    "verify_rows_total", "Sampled rows verified."
+)
+MISMATCHES_TOTAL = Counter(
+    "verify_mismatches_total", "Verified rows found to be wrong."
+)
+RESULT_CACHE_TOTAL = Counter(
+    "verify_result_cache_total", "Lookups of verified results of identical inputs by result.", ("result",)
+)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+MISMATCH_CHUNK_ROWS = 1_000_000
+
+
+def mismatch_path(task_dir: Path) -> Path:
+    return Path(task_dir) / "Mismatches.npz"
+
+
+def collect_mismatches(mismatch_filename: str, chunk_rows: int = MISMATCH_CHUNK_ROWS) -> np.ndarray:
+    # sorted unique row numbers of Mismatched.csv
+    numbers = [
+        chunk['number'].to_numpy(dtype=np.int64)
+        for chunk in pd.read_csv(mismatch_filename, usecols=['number'], chunksize=chunk_rows)
+    ]
+    if not numbers:
+        return np.empty(0, np.int64)
+    return np.unique(np.concatenate(numbers))
+
+
+def save_mismatches(task_dir: Path, numbers: np.ndarray):
+    # gaps between sorted numbers are small and repetitive, so they compress far better than the numbers
+    with open(mismatch_path(task_dir), 'wb') as f:
+        np.savez_compressed(f, gaps=np.diff(numbers, prepend=0).astype(np.int64))
+
+
+def load_mismatches(task_dir: Path) -> np.ndarray:
+    with np.load(mismatch_path(task_dir)) as saved:
+        return np.cumsum(saved['gaps'], dtype=np.int64)
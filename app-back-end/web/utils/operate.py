@@ -0,0 +1,182 @@
+import os
+import numpy as np
+import pandas as pd
+
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .ingest import parse_csv_bytes
+
+# the cheap variants only differ inside MPC, in plaintext they compute the same values
+OPERATOR_UFUNCS = {
+    'add': np.add,
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'div': np.true_divide,
+    'cadd': np.add,
+    'cdiv': np.true_divide,
+    'exp': np.power,
+}
+OPERATE_RANGE_ROWS = 1_000_000      # rows one worker reads, computes and writes at a time
+SCAN_BUFFER_SIZE = 16 * 1024 * 1024
+HDF_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+CSV_HEADER = b"number,data\n"
+
+
+def operator_ufunc(operator: str) -> np.ufunc:
+    ufunc = OPERATOR_UFUNCS.get(operator.lower())
+    if ufunc is None:
+        raise ValueError(f"Unsupported operator: {operator}")
+    return ufunc
+
+
+def calculate(
+    data_a: np.ndarray,
+    data_b: np.ndarray,
+    operator: str,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    # out: a preallocated buffer the result is written into instead of a new array
+    return operator_ufunc(operator)(data_a, data_b, out=out)
+
+
+def is_hdf(file: str) -> bool:
+    with open(file, 'rb') as f:
+        return f.read(len(HDF_SIGNATURE)) == HDF_SIGNATURE
+
+
+def csv_ranges(file: str, range_rows: int) -> Tuple[List[tuple], int]:
+    # one pass over the newlines: byte ranges of range_rows rows each, nothing is parsed
+    with open(file, 'rb') as f:
+        header = f.readline()
+        columns = [c.strip() for c in header.decode().split(',')]
+        size = os.fstat(f.fileno()).st_size
+
+        starts, rows, offset = [len(header)], 0, len(header)
+        last = b'\n'
+        while block := f.read(SCAN_BUFFER_SIZE):
+            line_ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            picked = np.arange((-rows - 1) % range_rows, len(line_ends), range_rows)
+            starts.extend((line_ends[picked] + offset + 1).tolist())
+            rows += len(line_ends)
+            offset += len(block)
+            last = block[-1:]
+
+    if last != b'\n' and offset > len(header):
+        rows += 1
+    if starts[-1] >= size:
+        starts.pop()
+    bounds = starts + [size]
+    return [("csv", file, bounds[x], bounds[x + 1], columns) for x in range(len(starts))], rows
+
+
+def hdf_ranges(file: str, range_rows: int) -> Tuple[List[tuple], int]:
+    with pd.HDFStore(file, mode='r') as store:
+        storer = store.get_storer('data')
+        if not storer.is_table:
+            raise ValueError(f"{file} must be stored as an HDF table to be read in ranges.")
+        rows = storer.nrows
+
+    return [("hdf", file, start, min(start + range_rows, rows)) for start in range(0, rows, range_rows)], rows
+
+
+def file_ranges(file: str, range_rows: int) -> Tuple[List[tuple], int]:
+    return hdf_ranges(file, range_rows) if is_hdf(file) else csv_ranges(file, range_rows)
+
+
+def read_range(source: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    if source[0] == "hdf":
+        _, file, start, stop = source
+        df = pd.read_hdf(file, key='data', start=start, stop=stop)
+        numbers = df['number'].to_numpy() if 'number' in df.columns else df.index.to_numpy()
+        return numbers.astype(np.int64), df['data'].to_numpy(dtype=np.float64)
+
+    _, file, start, end, columns = source
+    with open(file, 'rb') as f:
+        f.seek(start)
+        return parse_csv_bytes(f.read(end - start), columns)
+
+
+def operate_range(source_a: tuple, source_b: tuple, operator: str, part_file: Optional[str]) -> Dict:
+    # runs in a worker process: one range of rows of A and B in, the same rows of R out
+    numbers, data_a = read_range(source_a)
+    numbers_b, data_b = read_range(source_b)
+    if not np.array_equal(numbers, numbers_b):
+        raise ValueError(f"Rows {numbers[:1].tolist()}... of A and B have different numbers.")
+
+    data_r = np.empty_like(data_a)
+    calculate(data_a, data_b, operator, out=data_r)
+
+    if part_file is None:
+        return {"numbers": numbers, "data": data_r}
+
+    with open(part_file, 'wb') as f:
+        f.write(pd.DataFrame({'number': numbers, 'data': data_r}).to_csv(
+            index=False, header=False, lineterminator='\n'
+        ).encode())
+    return {"path": part_file, "rows": len(numbers)}
+
+
+def operate_files(
+    file_a: str,
+    file_b: str,
+    file_r: str,
+    operator: str,
+    hdf_out: bool = False,
+    workers: Optional[int] = None,
+    range_rows: int = OPERATE_RANGE_ROWS,
+    executor: Optional[Executor] = None
+) -> int:
+    # R = A <operator> B for files of any size: ranges of rows are computed in parallel and written
+    # in order as they finish, so at most two ranges per worker are held at once
+    operator_ufunc(operator)     # unknown operators fail before any work
+    ranges_a, rows = file_ranges(file_a, range_rows)
+    ranges_b, rows_b = file_ranges(file_b, range_rows)
+    if rows != rows_b or len(ranges_a) != len(ranges_b):
+        raise ValueError(f"{file_a} has {rows} rows, {file_b} has {rows_b}.")
+
+    workers = workers or os.cpu_count() or 1
+    pool = executor if executor is not None else ProcessPoolExecutor(workers)
+    part_dir = f"{file_r}.parts"
+    os.makedirs(part_dir, exist_ok=True)
+
+    store = pd.HDFStore(file_r, mode='w') if hdf_out else None
+    out = open(file_r, 'wb') if not hdf_out else None
+    try:
+        if out is not None:
+            out.write(CSV_HEADER)
+
+        pending, written = deque(), 0
+        for x, (source_a, source_b) in enumerate(zip(ranges_a, ranges_b)):
+            part_file = None if hdf_out else os.path.join(part_dir, f"R-{x}.csv")
+            pending.append(pool.submit(operate_range, source_a, source_b, operator, part_file))
+            while len(pending) >= 2 * workers or (pending and x == len(ranges_a) - 1):
+                written += write_range(pending.popleft().result(), out, store)
+    finally:
+        if store is not None:
+            store.close()
+        if out is not None:
+            out.close()
+        if executor is None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        for name in os.listdir(part_dir):
+            os.remove(os.path.join(part_dir, name))
+        os.rmdir(part_dir)
+
+    if written != rows:
+        raise ValueError(f"Wrote {written} rows of the {rows} rows of {file_a}.")
+    return written
+
+
+def write_range(result: Dict, out, store: Optional[pd.HDFStore]) -> int:
+    if store is not None:
+        df = pd.DataFrame({'data': result["data"]}, index=pd.Index(result["numbers"], name='number'))
+        store.append('data', df, format='table', index=False)
+        return len(df)
+
+    with open(result["path"], 'rb') as f:
+        while block := f.read(SCAN_BUFFER_SIZE):
+            out.write(block)
+    os.remove(result["path"])
+    return result["rows"]
@@ -0,0 +1,204 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SIGNIFICANT_DIGITS = 6      # precision of CompareSignificantDigits in the verifier
+PRECHECK_CHUNK_ROWS = 1_000_000
+
+# constants of Go's amd64 math.Log (log_amd64.s), and 1/Ln10 rounded once from its exact value
+# like Go's constant expression in math.Log10
+GO_LN2_HI = 6.93147180369123816490e-01
+GO_LN2_LO = 1.90821492927058770002e-10
+GO_LOG_L = (
+    6.666666666666735130e-01, 3.999999999940941908e-01, 2.857142874366239149e-01, 2.222219843214978396e-01,
+    1.818357216161805012e-01, 1.531383769920937332e-01, 1.479819860511658591e-01,
+)
+GO_HALF_SQRT2 = 7.07106781186547524401e-01
+GO_INV_LN10 = 0.4342944819032518
+
+def precheck_path(task_dir: Path) -> Path:
+    return Path(task_dir) / "Precheck.npz"
+
+
+def verifier_scale(operate: int, scale: int) -> float:
+    # the tolerance the verifier compares with: 10 for subtraction unless a scale of 1 or more is given
+    compare_scale = 10. if operate == 1 else 1.
+    if scale >= 1:
+        compare_scale = float(scale)
+    return compare_scale
+
+
+def go_pow10(n: int) -> float:
+    # math.Pow(10, n) of Go for an integral n: the mantissa of 10 is squared and multiplied
+    # by the bits of n, which rounds differently from C's pow for large exponents
+    if n == 0:
+        return 1.
+    a1, ae = 1., 0
+    x1, xe = math.frexp(10.)
+    i = abs(n)
+    while i != 0:
+        if xe < -(1 << 12) or (1 << 12) < xe:
+            ae += xe
+            break
+        if i & 1 == 1:
+            a1 *= x1
+            ae += xe
+        x1 *= x1
+        xe <<= 1
+        if x1 < .5:
+            x1 += x1
+            xe -= 1
+        i >>= 1
+
+    if n < 0:
+        a1 = 1 / a1
+        ae = -ae
+    try:
+        return math.ldexp(a1, ae)
+    except OverflowError:
+        return math.inf
+
+
+def go_log(values: np.ndarray) -> np.ndarray:
+    # math.Log of Go on amd64 (a verifier built for another architecture may round differently),
+    # the steps of log_amd64.s one IEEE operation at a time; glibc's log, behind np.log, rounds
+    # differently in the last bit. tests/test_precheck.py compares it with values printed by Go
+    values = np.asarray(values, dtype=np.float64)
+    bits = values.view(np.uint64)
+    L1, L2, L3, L4, L5, L6, L7 = GO_LOG_L
+
+    # the frexp of the assembly: the exponent bits as they are, also for subnormal values
+    f1 = ((bits & np.uint64(0x000FFFFFFFFFFFFF)) | np.uint64(0x3FE0000000000000)).view(np.float64)
+    k = ((bits >> np.uint64(52)) & np.uint64(0x7FF)).astype(np.int64) - 0x3FE
+    low = f1 <= GO_HALF_SQRT2
+    k = (k - low).astype(np.float64)
+    f = f1 * np.where(low, 2., 1.) - 1.
+
+    s = f / (2. + f)
+    s2 = s * s
+    s4 = s2 * s2
+    t1 = s2 * (((L7 * s4 + L5) * s4 + L3) * s4 + L1)
+    t2 = s4 * ((L6 * s4 + L4) * s4 + L2)
+    hfsq = 0.5 * f * f
+    result = k * GO_LN2_HI - ((hfsq - (s * (hfsq + (t1 + t2)) + k * GO_LN2_LO)) - f)
+
+    with np.errstate(invalid='ignore'):
+        result = np.where(np.isnan(values) | (values == np.inf), values, result)
+        result = np.where(values < 0, np.nan, result)
+    return np.where(values == 0, -np.inf, result)
+
+
+def go_log10(values: np.ndarray) -> np.ndarray:
+    # math.Log10 of Go is Log(x) * (1/Ln10), which is not exact at powers of ten: Log10(1e15) < 15
+    return go_log(values) * GO_INV_LN10
+
+
+def significant_digits(values: np.ndarray, precision: int = SIGNIFICANT_DIGITS) -> np.ndarray:
+    # getMantissa of the verifier: |value| scaled so its first `precision` digits are the integral part
+    absolute = np.abs(values)
+    regular = np.isfinite(absolute) & (absolute != 0)
+
+    mantissa = np.zeros(len(values), dtype=np.float64)
+    exps = np.floor(go_log10(absolute[regular])).astype(np.int64) - precision + 1
+    unique_exps, at = np.unique(exps, return_inverse=True)
+    powers = np.array([go_pow10(int(exp)) for exp in unique_exps], dtype=np.float64)
+    mantissa[regular] = absolute[regular] / powers[at]
+
+    # infinities and NaN never compare equal in the verifier
+    mantissa[~np.isfinite(absolute)] = np.nan
+    return mantissa
+
+
+def expected_values(a: np.ndarray, b: np.ndarray, operate: int) -> np.ndarray:
+    # what the verifier computes from Alice and Bob, exp is checked as log(A) * B against log(R)
+    with np.errstate(all='ignore'):
+        if operate in (0, 4):
+            return np.add(a, b)
+        if operate == 1:
+            return np.subtract(a, b)
+        if operate == 2:
+            return np.multiply(a, b)
+        if operate in (3, 5):
+            return np.divide(a, b)
+        if operate == 6:
+            return np.multiply(go_log(a), b)
+    raise ValueError(f"Unsupported operate: {operate}.")
+
+
+def precheck_rows(a: np.ndarray, b: np.ndarray, r: np.ndarray, operate: int, scale: int) -> np.ndarray:
+    # True for rows the verifier would report as wrong
+    if operate == 6:
+        r = go_log(r)
+    expected = significant_digits(expected_values(a, b, operate))
+    with np.errstate(invalid='ignore'):
+        matched = np.abs(significant_digits(r) - expected) <= verifier_scale(operate, scale)
+    return ~matched
+
+
+def iter_party_chunks(file: str, parsed: Optional[np.ndarray], chunk_rows: int):
+    if parsed is not None:
+        for start in range(0, len(parsed), chunk_rows):
+            block = parsed[start:start + chunk_rows]
+            yield block['number'], block['data']
+        return
+
+    columns = {'number': np.int64, 'data': np.float64}
+    for chunk in pd.read_csv(file, usecols=list(columns), dtype=columns, chunksize=chunk_rows):
+        yield chunk['number'].to_numpy(), chunk['data'].to_numpy()
+
+
+def precheck_files(
+    files: Dict[str, str],
+    operate: int,
+    scale: int,
+    row_count: int,
+    parsed: Optional[Dict[str, Optional[np.ndarray]]] = None,
+    chunk_rows: int = PRECHECK_CHUNK_ROWS,
+    stop: Optional[threading.Event] = None
+) -> np.ndarray:
+    # mismatch flag of every row, the three files are read side by side a chunk at a time
+    parsed = parsed or {}
+    mismatched = np.zeros(row_count, dtype=bool)
+    readers = [iter_party_chunks(files[label], parsed.get(label), chunk_rows) for label in ('A', 'B', 'R')]
+
+    filled = 0
+    for (numbers, a), (numbers_b, b), (numbers_r, r) in zip(*readers):
+        if stop is not None and stop.is_set():
+            raise InterruptedError("Pre-check was stopped.")
+        if not (np.array_equal(numbers, numbers_b) and np.array_equal(numbers, numbers_r)):
+            raise ValueError(f"Rows {filled + 1}-{filled + len(numbers)} of the uploads have different numbers.")
+        if filled + len(numbers) > row_count:
+            raise ValueError(f"The uploads have more than {row_count} rows.")
+
+        mismatched[filled:filled + len(numbers)] = precheck_rows(a, b, r, operate, scale)
+        filled += len(numbers)
+
+    if filled != row_count:
+        raise ValueError(f"The uploads have {filled} rows, {row_count} were expected.")
+    return mismatched
+
+
+def save_precheck(task_dir: Path, mismatched: np.ndarray):
+    with open(precheck_path(task_dir), 'wb') as f:
+        np.savez_compressed(f, bitmap=np.packbits(mismatched), rows=np.array([len(mismatched)], dtype=np.int64))
+
+
+def load_precheck(task_dir: Path) -> np.ndarray:
+    with np.load(precheck_path(task_dir)) as saved:
+        return np.unpackbits(saved['bitmap'], count=int(saved['rows'][0])).astype(bool)
+
+
+def cross_check(precheck: np.ndarray, sample_indexes: np.ndarray, mismatches: np.ndarray) -> Dict[str, Any]:
+    # verified rows are numbered from 1 like the sample, so row n is bit n - 1 of the pre-check
+    plain = precheck[sample_indexes - 1]
+    verified = np.isin(sample_indexes, mismatches, assume_unique=True)
+    return {
+        "rows": len(sample_indexes),
+        "agreed": int((plain == verified).sum()),
+        "verifier_only": int((verified & ~plain).sum()),
+        "precheck_only": int((plain & ~verified).sum()),
+    }
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .index import index_path
+from .mismatch import mismatch_path
+
+RESULT_CACHE_DAYS = 7
+RESULT_CACHE_BUDGET = 16 * 1024 ** 3    # 16GB
+RESULT_META = "meta.json"
+
+
+def result_files(task_dir: Path):
+    # everything /result and /mismatch serve for a completed task
+    task_dir = Path(task_dir)
+    return [
+        task_dir / "Verified.csv",
+        index_path(task_dir / "Verified.csv"),
+        task_dir / "Mismatched.csv",
+        index_path(task_dir / "Mismatched.csv"),
+        mismatch_path(task_dir),
+    ]
+
+
+def remove_result_files(task_dir: Path):
+    # results may be hardlinked with the cache, so they are unlinked before being written again
+    for file in result_files(task_dir):
+        file.unlink(missing_ok=True)
+
+
+def result_key(
+    md5s: Dict[str, Optional[str]],
+    operate: int,
+    scale: int,
+    sample_size: int,
+    seed: Optional[int]
+) -> Optional[str]:
+    # seed is None for tasks that checked every row; None when an upload has no MD5
+    if any(md5 is None for md5 in md5s.values()):
+        return None
+
+    key = [md5s[party] for party in sorted(md5s)] + [operate, scale, sample_size, "full" if seed is None else seed]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def link_or_copy(source: Path, target: Path):
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)    # keeps the mtime the row indexes are checked against
+
+
+class ResultCache:
+    # verified results of identical inputs, restored into a task directory by hardlinks;
+    # entries expire after max_age_days and the least recently used go beyond the disk budget
+    def __init__(self, cache_dir: Path, max_age_days: float = RESULT_CACHE_DAYS, budget: int = RESULT_CACHE_BUDGET):
+        self.cache_dir = Path(cache_dir)
+        self.max_age_days = max_age_days
+        self.budget = budget
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def restore(self, key: str, task_dir: Path) -> Optional[Dict[str, Any]]:
+        entry = self.cache_dir / key
+        with self.lock:
+            try:
+                with open(entry / RESULT_META, "r") as f:
+                    meta = json.load(f)
+                if time.time() - os.path.getmtime(entry / RESULT_META) > self.max_age_days * 86400:
+                    return None
+
+                remove_result_files(task_dir)
+                for file in result_files(task_dir):
+                    link_or_copy(entry / file.name, file)
+                os.utime(entry / RESULT_META)   # the modification time orders the eviction
+            except (OSError, ValueError):
+                return None
+        return meta
+
+    def store(self, key: str, task_dir: Path, meta: Dict[str, Any]) -> bool:
+        # False when the results couldn't be cached, the task they belong to is complete anyway
+        entry = self.cache_dir / key
+        staging = self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for file in result_files(task_dir):
+                link_or_copy(file, staging / file.name)
+            with open(staging / RESULT_META, "w") as f:
+                json.dump(meta, f)
+
+            with self.lock:
+                shutil.rmtree(entry, ignore_errors=True)
+                os.replace(staging, entry)
+        except OSError:
+            return False
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict()
+        return True
+
+    def evict(self) -> int:
+        with self.lock:
+            entries = []
+            for entry in self.cache_dir.iterdir():
+                meta = entry / RESULT_META
+                if entry.name.endswith(".tmp") or not meta.exists():
+                    continue
+                # hardlinked files are counted too: they outlive the task that produced them
+                size = sum(file.stat().st_size for file in entry.iterdir())
+                entries.append((meta.stat().st_mtime, size, entry))
+
+            removed, total = 0, sum(size for _, size, _ in entries)
+            cutoff = time.time() - self.max_age_days * 86400
+            for mtime, size, entry in sorted(entries):
+                if mtime >= cutoff and total <= self.budget:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
@@ -0,0 +1,34 @@
+import secrets
+import numpy as np
+
+
+def new_seed() -> int:
+    # kept below 2 ** 53 so the seed survives a round trip through JSON numbers in the browser
+    return secrets.randbits(52)
+
+
+def draw_sample(row_count: int, sample_size: int, seed: int) -> np.ndarray:
+    # sorted int64 row numbers in [1, row_count], drawn in O(sample_size) time and memory
+    if sample_size >= row_count:
+        return np.arange(1, row_count + 1, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+
+    if sample_size > row_count // 2:
+        # dense samples are cheaper as the complement of a sparse one
+        excluded = draw_sample(row_count, row_count - sample_size, int(rng.integers(2 ** 63)))
+        keep = np.ones(row_count, dtype=bool)
+        keep[excluded - 1] = False
+        return np.flatnonzero(keep).astype(np.int64) + 1
+
+    picked = np.empty(0, dtype=np.int64)
+    while len(picked) < sample_size:
+        missing = sample_size - len(picked)
+        draws = rng.integers(1, row_count + 1, size=int(missing * 1.05) + 64, dtype=np.int64)
+        picked = np.union1d(picked, draws)
+
+    # the union is a uniformly random set, so a uniform subset of it is still uniform
+    if len(picked) > sample_size:
+        picked = np.sort(rng.choice(picked, size=sample_size, replace=False))
+
+    return picked
@@ -0,0 +1,144 @@
+import os
+import heapq
+import asyncio
+import itertools
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .store import TaskStore
+
+DEFAULT_MEMORY_BUDGET = 8 * 1024 ** 3   # 8GB, when the host doesn't report its memory
+CANCEL_WAIT = 10.                       # seconds /cancel waits for a running job to wind down
+
+
+def physical_memory() -> int:
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return DEFAULT_MEMORY_BUDGET
+
+
+class JobScheduler:
+    # runs at most max_jobs jobs whose estimated memory fits the budget together; the rest wait
+    # by priority (higher first), then in submission order, and a job at the head is never overtaken.
+    # A job is called with its slot, an index below max_jobs no other running job holds
+    def __init__(self, tasks: TaskStore, max_jobs: int, memory_budget: int):
+        self.tasks = tasks
+        self.max_jobs = max_jobs
+        self.memory_budget = memory_budget
+
+        self.waiting: List[Tuple[int, int, str, int, Callable[[int], Awaitable[Any]], Optional[float]]] = []
+        self.running: Dict[str, int] = {}
+        self.slots: Dict[str, int] = {}
+        self.jobs: Dict[str, asyncio.Task] = {}
+        self.counter = itertools.count()
+
+    def active(self, id: str) -> bool:
+        return id in self.running or id in self.jobs or any(job[2] == id for job in self.waiting)
+
+    def track(self, id: str, job: Awaitable[Any]) -> asyncio.Task:
+        # starts a job right away, outside the queue and its limits, which /cancel reaches like a running one
+        task = asyncio.create_task(job)
+        self.jobs[id] = task
+        task.add_done_callback(lambda _: self.jobs.pop(id) if self.jobs.get(id) is task else None)
+        return task
+
+    def submit(
+        self,
+        id: str,
+        job: Callable[[int], Awaitable[Any]],
+        memory: int,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> Optional[int]:
+        # the queue position of the job, None when it started right away; timeout counts from the start
+        heapq.heappush(self.waiting, (-priority, next(self.counter), id, memory, job, timeout))
+        self.tasks[id] = {
+            **self.tasks.get(id, {}),
+            "status": "queued",
+            "queue": {"position": None, "priority": priority, "memory": memory}
+        }
+        self._dispatch()
+        return self.position(id)
+
+    def position(self, id: str) -> Optional[int]:
+        for position, job in enumerate(sorted(self.waiting), 1):
+            if job[2] == id:
+                return position
+        return None
+
+    async def cancel(self, id: str, reason: str, status: str = "cancelled") -> bool:
+        # a waiting job is dropped, a running one is cancelled and given CANCEL_WAIT seconds to clean up;
+        # the job finds the reason and the status to record in the "cancel" field of its task
+        for job in self.waiting:
+            if job[2] == id:
+                self.waiting.remove(job)
+                heapq.heapify(self.waiting)
+                self.tasks[id] = {
+                    **{key: value for key, value in self.tasks.get(id, {}).items() if key != "queue"},
+                    "status": status,
+                    "error": reason
+                }
+                self._dispatch()
+                return True
+
+        running = self.jobs.get(id)
+        if running is None or running.done():
+            return False
+
+        self.tasks[id]["cancel"] = {"status": status, "reason": reason}
+        running.cancel()
+        await asyncio.wait([running], timeout=CANCEL_WAIT)
+        return True
+
+    async def shutdown(self, reason: str):
+        # fails every waiting and running job, so the running ones keep their checkpoints and
+        # record their status before the task store closes
+        waiting, self.waiting = self.waiting, []
+        for _, _, id, _, _, _ in waiting:
+            self.tasks[id] = {
+                **{key: value for key, value in self.tasks.get(id, {}).items() if key != "queue"},
+                "status": "failed",
+                "error": reason
+            }
+        await asyncio.gather(*(self.cancel(id, reason, "failed") for id in list(self.jobs)))
+
+    def _fits(self, memory: int) -> bool:
+        if len(self.running) >= self.max_jobs:
+            return False
+        # a job larger than the whole budget still runs, alone
+        return not self.running or sum(self.running.values()) + memory <= self.memory_budget
+
+    def _dispatch(self):
+        while self.waiting and self._fits(self.waiting[0][3]):
+            _, _, id, memory, job, timeout = heapq.heappop(self.waiting)
+            self.running[id] = memory
+            self.slots[id] = min(set(range(self.max_jobs)) - set(self.slots.values()))
+            self.tasks.get(id, {}).pop("queue", None)
+            self.jobs[id] = asyncio.create_task(self._run(id, job, timeout))
+
+        for position, (_, _, id, _, _, _) in enumerate(sorted(self.waiting), 1):
+            record = self.tasks.get(id)
+            if record is not None and record.get("queue", {}).get("position") != position:
+                record["queue"]["position"] = position
+                self.tasks.save(id)
+
+    async def _run(self, id: str, job: Callable[[int], Awaitable[Any]], timeout: Optional[float]):
+        deadline = None
+        if timeout is not None:
+            # a job over its deadline fails rather than being cancelled, so it can still be resumed
+            deadline = asyncio.get_running_loop().call_later(
+                timeout,
+                lambda: asyncio.create_task(self.cancel(id, f"Task exceeded its deadline of {timeout}s.", "failed"))
+            )
+        try:
+            await job(self.slots[id])
+        except (Exception, asyncio.CancelledError):
+            pass    # jobs record their own failures and cancellations in the task record
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+            del self.running[id]
+            del self.slots[id]
+            del self.jobs[id]
+            self._dispatch()
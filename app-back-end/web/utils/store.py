@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+ACTIVE_STATUS = {"running", "queued"}
+
+
+def _to_json(value: Any):
+    if hasattr(value, "item"):      # numpy scalars
+        return value.item()
+    if hasattr(value, "tolist"):    # numpy arrays
+        return value.tolist()
+    return str(value)
+
+
+class TaskStore(MutableMapping):
+    def __init__(
+        self,
+        db_path: Path,
+        max_age_days: Optional[float] = 30,
+        max_tasks: Optional[int] = 10000,
+        cache_size: int = 256
+    ):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.max_tasks = max_tasks
+        self.cache_size = cache_size
+
+        self.lock = threading.RLock()
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_updated_at ON tasks (updated_at)")
+
+    def __getitem__(self, id: str) -> Dict[str, Any]:
+        with self.lock:
+            if id in self.cache:
+                self.cache.move_to_end(id)
+                return self.cache[id]
+
+            row = self.conn.execute("SELECT record FROM tasks WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                raise KeyError(id)
+
+            record = json.loads(row[0])
+            self._cache(id, record)
+            return record
+
+    def __setitem__(self, id: str, record: Dict[str, Any]):
+        with self.lock:
+            self._cache(id, record)
+            self._write(id, record)
+        self._notify(id, record)
+
+    def __delitem__(self, id: str):
+        with self.lock:
+            self.cache.pop(id, None)
+            cursor = self.conn.execute("DELETE FROM tasks WHERE id = ?", (id,))
+            if cursor.rowcount == 0:
+                raise KeyError(id)
+
+    def __contains__(self, id: object) -> bool:
+        with self.lock:
+            if id in self.cache:
+                return True
+            return self.conn.execute("SELECT 1 FROM tasks WHERE id = ?", (id,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM tasks ORDER BY updated_at")]
+        return iter(ids)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def save(self, id: str):
+        # persist in-place changes made to a record returned by tasks[id]
+        with self.lock:
+            record = self.cache.get(id)
+            if record is not None:
+                self._write(id, record)
+        if record is not None:
+            self._notify(id, record)
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        # called with (id, record) whenever a record is written
+        self.listeners.append(listener)
+
+    def prune(self) -> int:
+        removed = 0
+        with self.lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self.conn.execute("DELETE FROM tasks WHERE updated_at < ?", (cutoff,)).rowcount
+
+            if self.max_tasks is not None:
+                removed += self.conn.execute(
+                    "DELETE FROM tasks WHERE id NOT IN "
+                    "(SELECT id FROM tasks ORDER BY updated_at DESC LIMIT ?)",
+                    (self.max_tasks,)
+                ).rowcount
+
+            for id in list(self.cache):
+                if self.conn.execute("SELECT 1 FROM tasks WHERE id = ?", (id,)).fetchone() is None:
+                    del self.cache[id]
+        return removed
+
+    def interrupt_active(self, reason: str, status: str = "failed") -> int:
+        # records left running or queued by a previous process, whose jobs are gone; their
+        # checkpoints are kept, so verifications can be resumed
+        interrupted = []
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, record FROM tasks WHERE record LIKE '%\"running\"%' OR record LIKE '%\"queued\"%'"
+            ).fetchall()
+            for id, raw in rows:
+                record = json.loads(raw)
+                if record.get("status") not in ACTIVE_STATUS:
+                    continue
+                record = {key: value for key, value in record.items() if key not in ("queue", "cancel")}
+                record.update(status=status, error=reason)
+                self.cache.pop(id, None)
+                self._write(id, record)
+                interrupted.append((id, record))
+
+        for id, record in interrupted:
+            self._notify(id, record)
+        return len(interrupted)
+
+    def import_json(self, json_path: Path) -> int:
+        # one-off migration of the task dict formerly dumped by PickleDB
+        if not os.path.exists(json_path):
+            return 0
+
+        with open(json_path, "r") as f:
+            legacy = json.load(f).get("tasks") or {}
+
+        with self.lock:
+            for id, record in legacy.items():
+                if id not in self:
+                    self._write(id, record)
+
+        os.replace(json_path, f"{json_path}.imported")
+        return len(legacy)
+
+    def close(self):
+        with self.lock:
+            for id, record in self.cache.items():
+                self._write(id, record)
+            self.cache.clear()
+            self.conn.close()
+
+    def _cache(self, id: str, record: Dict[str, Any]):
+        self.cache[id] = record
+        self.cache.move_to_end(id)
+
+        # records of active tasks are mutated in place, so they stay cached until they finish
+        for old_id in list(self.cache):
+            if len(self.cache) <= self.cache_size:
+                break
+            if self.cache[old_id].get("status") not in ACTIVE_STATUS:
+                del self.cache[old_id]
+
+    def _notify(self, id: str, record: Dict[str, Any]):
+        for listener in self.listeners:
+            listener(id, record)
+
+    def _write(self, id: str, record: Dict[str, Any]):
+        self.conn.execute(
+            "INSERT INTO tasks (id, record, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET record = excluded.record, updated_at = excluded.updated_at",
+            (id, json.dumps(record, default=_to_json), time.time())
+        )
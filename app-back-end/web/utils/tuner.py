@@ -0,0 +1,163 @@
+import math
+import time
+import sqlite3
+import threading
+import statistics
+
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .http import get_request
+
+BATCH_CANDIDATES = (250_000, 500_000, 1_000_000, 2_000_000, 4_000_000)
+DEFAULT_BATCH_ROWS = 1_000_000
+HISTORY_KEEP = 50           # measurements kept per (operate, batch rows, workers)
+DRIFT_RATIO = 0.3           # a batch this much slower than the best setting triggers a change
+PROBE_AFTER = 2             # batches measured on one setting before a neighbour is probed
+
+
+def batch_bucket(rows: int) -> int:
+    # measurements are grouped by the closest candidate batch size
+    return min(BATCH_CANDIDATES, key=lambda candidate: abs(math.log(candidate / max(rows, 1))))
+
+
+def worker_options(max_workers: int) -> List[int]:
+    options = [1 << x for x in range(max(max_workers, 1).bit_length()) if 1 << x <= max_workers]
+    if max_workers not in options:
+        options.append(max_workers)
+    return options
+
+
+async def fetch_capacity(base_url: str) -> Optional[Dict[str, int]]:
+    # None for verifiers that predate /info
+    try:
+        response = await get_request(base_url + "/info", params={})
+        if response.status_code != 200:
+            return None
+        return response.json()
+    except Exception:
+        return None
+
+
+class ThroughputHistory:
+    def __init__(self, db_path: Path, keep: int = HISTORY_KEEP):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS throughput ("
+            "operate INTEGER NOT NULL, batch_rows INTEGER NOT NULL, workers INTEGER NOT NULL, "
+            "rows_per_s REAL NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS throughput_key ON throughput (operate, batch_rows, workers, recorded_at)"
+        )
+
+    def record(self, operate: int, batch_rows: int, workers: int, rows_per_s: float):
+        key = (operate, batch_bucket(batch_rows), workers)
+        with self.lock:
+            self.conn.execute("INSERT INTO throughput VALUES (?, ?, ?, ?, ?)", (*key, rows_per_s, time.time()))
+            self.conn.execute(
+                "DELETE FROM throughput WHERE operate = ? AND batch_rows = ? AND workers = ? AND recorded_at < "
+                "(SELECT MIN(recorded_at) FROM (SELECT recorded_at FROM throughput "
+                "WHERE operate = ? AND batch_rows = ? AND workers = ? ORDER BY recorded_at DESC LIMIT ?))",
+                (*key, *key, self.keep)
+            )
+
+    def rates(self, operate: int) -> Dict[Tuple[int, int], float]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT batch_rows, workers, rows_per_s FROM throughput WHERE operate = ?", (operate,)
+            ).fetchall()
+
+        measured = defaultdict(list)
+        for batch_rows, workers, rows_per_s in rows:
+            measured[(batch_rows, workers)].append(rows_per_s)
+        return {key: statistics.median(values) for key, values in measured.items()}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def plan_batches(
+    sample_size: int,
+    operate: int,
+    max_workers: int,
+    window: int,
+    history: Optional[ThroughputHistory]
+):
+    # concurrent batches share the verifier, so each one gets its part of the workers
+    per_batch = max(1, max_workers // max(window, 1))
+    workers_options = worker_options(per_batch)
+
+    # candidates are keyed by the batch size they really produce for this sample, the same
+    # key their measurements are recorded under
+    splits = {}
+    for rows in BATCH_CANDIDATES:
+        split_n = min(max(math.ceil(sample_size / rows), 1), sample_size)
+        splits.setdefault(batch_bucket(math.ceil(sample_size / split_n)), split_n)
+    rows_options = sorted(splits)
+
+    rates = history.rates(operate) if history is not None else {}
+    known = {
+        (rows, workers): rates[(rows, workers)]
+        for rows in rows_options for workers in workers_options if (rows, workers) in rates
+    }
+
+    if not known:
+        default_rows = batch_bucket(math.ceil(sample_size / math.ceil(sample_size / DEFAULT_BATCH_ROWS)))
+        choice, source = (default_rows, per_batch), "default"
+    else:
+        best = max(known, key=known.get)
+        choice, source = best, "history"
+
+        # hill climbing across tasks: an untried neighbour of the best setting is tried once
+        rows_at, workers_at = rows_options.index(best[0]), workers_options.index(best[1])
+        for d_rows, d_workers in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            r, w = rows_at + d_rows, workers_at + d_workers
+            if 0 <= r < len(rows_options) and 0 <= w < len(workers_options):
+                neighbour = (rows_options[r], workers_options[w])
+                if neighbour not in known:
+                    choice, source = neighbour, "explore"
+                    break
+
+    batch_rows, workers = choice
+    return {
+        "split_n": splits[batch_rows],
+        "workers": workers,
+        "batch_rows": batch_rows,
+        "max_workers": per_batch,
+        "source": source,
+    }
+
+
+class WorkerTuner:
+    # adjusts workers between the batches of one task when their throughput drifts
+    def __init__(self, workers: int, max_workers: int):
+        self.workers = workers
+        self.options = worker_options(max_workers)
+        self.max_workers = max_workers
+        self.rates: Dict[int, List[float]] = defaultdict(list)
+
+    def rate_of(self, workers: int) -> float:
+        return statistics.median(self.rates[workers][-PROBE_AFTER:])
+
+    def record(self, workers: int, rows: int, seconds: float) -> int:
+        if seconds > 0:
+            self.rates[workers].append(rows / seconds)
+        if not self.rates[self.workers]:
+            return self.workers
+
+        best = max(self.rates, key=self.rate_of)
+        if self.rate_of(self.workers) < (1 - DRIFT_RATIO) * self.rate_of(best):
+            self.workers = best
+        elif len(self.rates[self.workers]) >= PROBE_AFTER and self.workers == best:
+            at = self.options.index(self.workers) if self.workers in self.options else 0
+            for neighbour in self.options[at + 1:at + 2] + self.options[max(at - 1, 0):at]:
+                if neighbour not in self.rates:
+                    self.workers = neighbour
+                    break
+        return self.workers
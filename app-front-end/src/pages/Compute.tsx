@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useRef, useState } from "react";
 import { 
   Upload, Button, InputNumber, Row, Col, Select, message, Table,
   Descriptions, Input, Slider, Modal, Skeleton, FloatButton
@@ -35,10 +35,27 @@ interface TaskInfo {
   sub_stage: string;
 }
 
+interface TaskProgress {
+  batch: number | null;
+  batches_done: number;
+  batches_total: number;
+  rows_done: number;
+  rows_total: number;
+  rows_per_s: number;
+  eta_s: number | null;
+}
+
+interface TaskQueue {
+  position: number | null;
+  priority: number;
+}
+
 interface TaskStatus {
   task_id: string;
   task_stat: string;
   task_info: TaskInfo;
+  task_queue?: TaskQueue;
+  task_progress?: TaskProgress;
   task_result?: TaskResult;
 }
 
@@ -46,9 +63,11 @@ const operate_to_text = ['ADD', 'SUB', 'MUL', 'DIV', 'Cheap ADD', 'Cheap DIV', '
 
 const BASIC_URI = ABY_BASIC_URI;
 const trans: {[key: string]: string} = {
+  "queued": "排队中",
   "running": "正在验证",
   "completed": "验证完成",
   "failed": "验证失败",
+  "cancelled": "已取消",
   "unknown": "未知状态"
 };
 
@@ -62,6 +81,7 @@ const Compute: React.FC = () => {
   const [loading, setLoading] = useState(false); 
   const [visible, setVisible] = useState(false);
   const [statusData, setStatusData] = useState<TaskStatus | undefined>(undefined);
+  const statusStream = useRef<EventSource | null>(null);
   
   const [addVisible, setAddVisible] = useState(false);
   const [genParams, setGenParams] = useState({
@@ -106,12 +126,25 @@ const Compute: React.FC = () => {
   const handleVerify = async (): Promise<void> => {
     try {
       const res = await axios.get(`${BASIC_URI}/verify`, { params: verifyParams });
-      message.success(`验算任务(ID = '${res.data.task_id}')已启动`);
+      if (res.data.queue_position) {
+        message.info(`验算任务(ID = '${res.data.task_id}')排队中，位置: ${res.data.queue_position}`);
+      } else {
+        message.success(`验算任务(ID = '${res.data.task_id}')已启动`);
+      }
     } catch (error) {
       message.error("验证任务启动失败");
     }
   };
 
+  const handleCancel = async (): Promise<void> => {
+    try {
+      const res = await axios.get(`${BASIC_URI}/cancel`, { params: { id: verifyParams.id } });
+      message.success(`验算任务(ID = '${res.data.task_id}')已取消`);
+    } catch (error) {
+      message.error("任务未在排队或运行");
+    }
+  };
+
   const handleDownload = async (): Promise<void> => {
     try {
       const res = await axios.get(`${BASIC_URI}/result`, { params: { id: verifyParams.id }, responseType: "blob" });
@@ -142,12 +175,40 @@ const Compute: React.FC = () => {
     }
   };
 
+  const closeStatusStream = () => {
+    statusStream.current?.close();
+    statusStream.current = null;
+  };
+
+  const handleStatusStream = () => {
+    closeStatusStream();
+    setLoading(true);
+
+    let received = false;
+    const source = new EventSource(`${BASIC_URI}/stat/stream?id=${encodeURIComponent(verifyParams.id)}`);
+    source.addEventListener("status", (event) => {
+      received = true;
+      setStatusData(JSON.parse((event as MessageEvent).data));
+      setLoading(false);
+    });
+    // the server ends the stream once the task is done; a stream that never
+    // delivered anything falls back to a single /stat request
+    source.onerror = () => {
+      closeStatusStream();
+      if (!received) {
+        handleStatus();
+      }
+    };
+    statusStream.current = source;
+  };
+
   const handleModalOpen = () => {
     setVisible(true);
-    handleStatus();
+    handleStatusStream();
   };
 
   const handleModalClose = () => {
+    closeStatusStream();
     setVisible(false);
     setStatusData(undefined);
   }; 
@@ -243,6 +304,7 @@ const Compute: React.FC = () => {
               <Button type="link" onClick={handleVerify}>验证</Button>
               <Button type="text" style={{ marginLeft: 16 }} onClick={handleDownload}>结果</Button>
               <Button type="text" style={{ marginLeft: 16 }} onClick={handleModalOpen}>状态</Button>
+              <Button type="text" danger style={{ marginLeft: 16 }} onClick={handleCancel}>取消</Button>
             </Descriptions.Item>
           </Descriptions>
         </Col>
@@ -269,9 +331,21 @@ const Compute: React.FC = () => {
             <p>任务ID: {statusData.task_id}</p>
             <p>状态: {trans[statusData.task_stat]}</p>
 
+            {statusData.task_stat === 'queued' && statusData.task_queue && (
+              <p>排队位置: {statusData.task_queue.position ?? '-'}</p>
+            )}
+
             {statusData.task_stat === 'running' && (
               <p>验证阶段: {statusData.task_info.desc} {statusData.task_info.sub_stage}</p>
             )}
+
+            {statusData.task_stat === 'running' && statusData.task_progress && (
+              <div>
+                <p>验证进度: {statusData.task_progress.rows_done} / {statusData.task_progress.rows_total}</p>
+                <p>吞吐量: {statusData.task_progress.rows_per_s} 条/秒</p>
+                <p>预计剩余: {statusData.task_progress.eta_s ?? '-'} 秒</p>
+              </div>
+            )}
             
             {statusData.task_stat === 'completed' && statusData.task_result && (
               <div>
@@ -11,15 +11,17 @@ import (
 )
 
 var (
-	port    string
-	procs   int
-	workDir string
+	port     string
+	procs    int
+	workDir  string
+	linkRoot string
 )
 
 func init() {
 	flag.StringVar(&port, "port", "9000", "Port to run the server on (short: -p)")
 	flag.IntVar(&procs, "cpus", 16, "Number of processes to use (short: -c)")
 	flag.StringVar(&workDir, "dir", "par_data", "Data directory for the server (short: -d)")
+	flag.StringVar(&linkRoot, "link-root", "", "Directory /link may take files from, /link is disabled when empty")
 
 	flag.StringVar(&port, "p", "9000", "Short for --port")
 	flag.IntVar(&procs, "c", 16, "Short for --cpus")
@@ -36,14 +38,20 @@ func main() {
 	cmds.DataDir = workDir
 	services.DataDir = workDir
 
+	if err := services.InitHandoff(workDir, linkRoot); err != nil {
+		fmt.Println("[Handoff-disabled]", err)
+	}
+
 	// gin.SetMode("release")
 	r := gin.Default()
 	r.Use(services.Cors())
 
 	r.POST("/update", services.UpdateHandler)
+	r.POST("/link", services.LinkHandler)
 	r.GET("/verify", services.VerifyHandler)
 	r.GET("/result", services.DownloadHandler)
 	r.GET("/delete", services.DeleteHandler)
+	r.GET("/info", services.InfoHandler)
 
 	r.Run(":" + port)
 }
@@ -32,11 +32,12 @@ func DoShareMultiWorkers(params utils.VerifyParams, workers int) gin.H {
 		go func() {
 			defer wg.Done()
 			output1[idx], error1[idx], exitCode1[idx] = utils.RunCommand(
+				params.Ctx,
 				"./sharer",
 				fmt.Sprintf("%s=%s", "ro", "1"),
 				fmt.Sprintf("%s=%s", "ip", params.Address),
 				fmt.Sprintf("%s=%s", "pt", strconv.Itoa(intPort)),
-				fmt.Sprintf("%s=%s", "csv", fmt.Sprintf("%dAliceData.csv", idx)),
+				fmt.Sprintf("%s=%s", "csv", fmt.Sprintf("%dAliceData.%s", idx, params.Format)),
 				fmt.Sprintf("%s=%s", "shr", fmt.Sprintf("%dShare.bin", idx)),
 				fmt.Sprintf("%s=%s", "pth", fmt.Sprintf("%s/%s/", DataDir, params.ID)),
 			)
@@ -45,11 +46,12 @@ func DoShareMultiWorkers(params utils.VerifyParams, workers int) gin.H {
 		go func() {
 			defer wg.Done()
 			output2[idx], error2[idx], exitCode2[idx] = utils.RunCommand(
+				params.Ctx,
 				"./sharer",
 				fmt.Sprintf("%s=%s", "ro", "2"),
 				fmt.Sprintf("%s=%s", "ip", params.Address),
 				fmt.Sprintf("%s=%s", "pt", strconv.Itoa(intPort)),
-				fmt.Sprintf("%s=%s", "csv", fmt.Sprintf("%dBobData.csv", idx)),
+				fmt.Sprintf("%s=%s", "csv", fmt.Sprintf("%dBobData.%s", idx, params.Format)),
 				fmt.Sprintf("%s=%s", "shr", fmt.Sprintf("%dShare.bin", idx)),
 				fmt.Sprintf("%s=%s", "pth", fmt.Sprintf("%s/%s/", DataDir, params.ID)),
 			)
@@ -150,6 +152,7 @@ func DoVerifyMultiWorkers(params utils.VerifyParams, workers int) gin.H {
 		go func() {
 			defer wg.Done()
 			output1[idx], error1[idx], exitCode1[idx] = utils.RunCommand(
+				params.Ctx,
 				"./verifier",
 				fmt.Sprintf("%s=%s", "ro", "1"),
 				fmt.Sprintf("%s=%s", "ip", params.Address),
@@ -164,6 +167,7 @@ func DoVerifyMultiWorkers(params utils.VerifyParams, workers int) gin.H {
 		go func() {
 			defer wg.Done()
 			output2[idx], error2[idx], exitCode2[idx] = utils.RunCommand(
+				params.Ctx,
 				"./verifier",
 				fmt.Sprintf("%s=%s", "ro", "2"),
 				fmt.Sprintf("%s=%s", "ip", params.Address),
@@ -19,11 +19,12 @@ func DoShare(params utils.VerifyParams) gin.H {
 	go func() {
 		defer wg.Done()
 		output1, error1, exitCode1 = utils.RunCommand(
+			params.Ctx,
 			"./sharer",
 			fmt.Sprintf("%s=%s", "ro", "1"),
 			fmt.Sprintf("%s=%s", "ip", params.Address),
 			fmt.Sprintf("%s=%s", "pt", params.Port),
-			fmt.Sprintf("%s=%s", "csv", "AliceData.csv"),
+			fmt.Sprintf("%s=%s", "csv", "AliceData."+params.Format),
 			fmt.Sprintf("%s=%s", "shr", "Share.bin"),
 			fmt.Sprintf("%s=%s", "pth", fmt.Sprintf("%s/%s/", DataDir, params.ID)),
 		)
@@ -32,11 +33,12 @@ func DoShare(params utils.VerifyParams) gin.H {
 	go func() {
 		defer wg.Done()
 		output2, error2, exitCode2 = utils.RunCommand(
+			params.Ctx,
 			"./sharer",
 			fmt.Sprintf("%s=%s", "ro", "2"),
 			fmt.Sprintf("%s=%s", "ip", params.Address),
 			fmt.Sprintf("%s=%s", "pt", params.Port),
-			fmt.Sprintf("%s=%s", "csv", "BobData.csv"),
+			fmt.Sprintf("%s=%s", "csv", "BobData."+params.Format),
 			fmt.Sprintf("%s=%s", "shr", "Share.bin"),
 			fmt.Sprintf("%s=%s", "pth", fmt.Sprintf("%s/%s/", DataDir, params.ID)),
 		)
@@ -66,6 +68,7 @@ func DoVerify(params utils.VerifyParams) gin.H {
 	go func() {
 		defer wg.Done()
 		output1, error1, exitCode1 = utils.RunCommand(
+			params.Ctx,
 			"./verifier",
 			fmt.Sprintf("%s=%s", "ro", "1"),
 			fmt.Sprintf("%s=%s", "ip", params.Address),
@@ -80,6 +83,7 @@ func DoVerify(params utils.VerifyParams) gin.H {
 	go func() {
 		defer wg.Done()
 		output2, error2, exitCode2 = utils.RunCommand(
+			params.Ctx,
 			"./verifier",
 			fmt.Sprintf("%s=%s", "ro", "2"),
 			fmt.Sprintf("%s=%s", "ip", params.Address),
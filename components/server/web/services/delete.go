@@ -10,6 +10,9 @@ import (
 func DeleteHandler(c *gin.Context) {
 	calID := c.Query("id")
 
+	// a verification still running on the files is stopped first
+	stopRun(calID)
+
 	err := os.RemoveAll(DataDir + "/" + calID)
 	if err != nil {
 		c.JSON(http.StatusNotFound, gin.H{"error": "failed to delete"})
@@ -0,0 +1,31 @@
+package services
+
+import (
+	"net/http"
+	"path/filepath"
+	"runtime"
+
+	"github.com/gin-gonic/gin"
+)
+
+// InfoHandler advertises the capacity of this verifier, so clients can size
+// their batches and workers instead of guessing. A client on the same
+// filesystem reads the handoff token from the data directory to use /link for
+// files below the link root; the token itself is never sent.
+func InfoHandler(c *gin.Context) {
+	maxProcs := runtime.GOMAXPROCS(0)
+
+	dataDir, err := filepath.Abs(DataDir)
+	if err != nil {
+		dataDir = DataDir
+	}
+
+	c.JSON(http.StatusOK, gin.H{
+		"max_procs":   maxProcs,
+		"max_workers": maxProcs / 2,
+		"num_cpu":     runtime.NumCPU(),
+
+		"data_dir":  dataDir,
+		"link_root": LinkRoot,
+	})
+}
@@ -0,0 +1,132 @@
+package services
+
+import (
+	"crypto/rand"
+	"crypto/subtle"
+	"encoding/hex"
+	"fmt"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strings"
+
+	"github.com/gin-gonic/gin"
+)
+
+const HandoffTokenFile = ".handoff"
+
+// InitHandoff writes a fresh token into the data directory and resolves the
+// root /link may take files from. Only a client that reads the token from the
+// directory reported by /info shares the filesystem; it sends the token back
+// with every /link. An empty root leaves /link disabled.
+func InitHandoff(dir string, root string) error {
+	err := os.MkdirAll(dir, os.ModePerm)
+	if err != nil {
+		return err
+	}
+
+	if root != "" {
+		root, err = filepath.Abs(root)
+		if err != nil {
+			return err
+		}
+		if LinkRoot, err = filepath.EvalSymlinks(root); err != nil {
+			return err
+		}
+	}
+
+	token := make([]byte, 16)
+	if _, err := rand.Read(token); err != nil {
+		return err
+	}
+
+	HandoffToken = hex.EncodeToString(token)
+	return os.WriteFile(filepath.Join(dir, HandoffTokenFile), []byte(HandoffToken), 0600)
+}
+
+// withinDir reports whether path, already resolved, is dir or below it
+func withinDir(path string, dir string) bool {
+	rel, err := filepath.Rel(dir, path)
+	return err == nil && rel != ".." && !strings.HasPrefix(rel, ".."+string(filepath.Separator))
+}
+
+func LinkHandler(c *gin.Context) {
+	token := c.PostForm("token")
+	if HandoffToken == "" || LinkRoot == "" ||
+		subtle.ConstantTimeCompare([]byte(token), []byte(HandoffToken)) != 1 {
+		c.JSON(http.StatusForbidden, gin.H{"error": "link is disabled or the handoff token is wrong"})
+		return
+	}
+
+	calID := c.PostForm("id")
+	if calID == "" || filepath.Base(calID) != calID {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "id should be a plain name"})
+		return
+	}
+
+	party := c.PostForm("party")
+	if party != "Alice" && party != "Bob" && party != "Result" {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "party should be Alice, Bob or Result"})
+		return
+	}
+
+	source := c.PostForm("path")
+	if !filepath.IsAbs(source) {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "path should be absolute"})
+		return
+	}
+
+	// the file itself is linked, not a symlink to it, so it can't be swapped
+	// for one pointing elsewhere after the check
+	source, err := filepath.EvalSymlinks(source)
+	if err != nil {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "path is not a regular file"})
+		return
+	}
+	dataDir, err := filepath.Abs(DataDir)
+	if err == nil {
+		dataDir, err = filepath.EvalSymlinks(dataDir)
+	}
+	if err != nil || !withinDir(source, LinkRoot) || withinDir(source, dataDir) {
+		c.JSON(http.StatusForbidden, gin.H{"error": "path is outside the link root"})
+		return
+	}
+
+	fileInfo, err := os.Stat(source)
+	if err != nil || !fileInfo.Mode().IsRegular() {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "path is not a regular file"})
+		return
+	}
+
+	err = os.MkdirAll(DataDir+"/"+calID, os.ModePerm)
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
+		return
+	}
+
+	format, staleFormat := "csv", "bin"
+	if filepath.Ext(source) == ".bin" {
+		format, staleFormat = "bin", "csv"
+	}
+	os.Remove(fmt.Sprintf("%s/%s/%sData.%s", DataDir, calID, party, staleFormat))
+
+	filePath := fmt.Sprintf("%s/%s/%sData.%s", DataDir, calID, party, format)
+	os.Remove(filePath)
+
+	// a hardlink shares the data without copying it, a symlink still works
+	// across devices
+	mode := "hardlink"
+	if err := os.Link(source, filePath); err != nil {
+		mode = "symlink"
+		if err := os.Symlink(source, filePath); err != nil {
+			c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
+			return
+		}
+	}
+
+	c.JSON(http.StatusOK, gin.H{
+		"message":  "file linked successfully",
+		"filePath": filePath,
+		"mode":     mode,
+	})
+}
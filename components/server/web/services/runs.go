@@ -0,0 +1,52 @@
+package services
+
+import (
+	"context"
+	"sync"
+)
+
+// run is a verification in progress, its processes end when cancel is called
+type run struct {
+	cancel context.CancelFunc
+	done   chan struct{}
+}
+
+var (
+	runs     = map[string]*run{}
+	runsLock sync.Mutex
+)
+
+// startRun registers the run of id, whose context also ends with parent, and
+// returns the function to call when it is over
+func startRun(parent context.Context, id string) (context.Context, func()) {
+	stopRun(id)
+
+	ctx, cancel := context.WithCancel(parent)
+	current := &run{cancel: cancel, done: make(chan struct{})}
+
+	runsLock.Lock()
+	runs[id] = current
+	runsLock.Unlock()
+
+	return ctx, func() {
+		cancel()
+		runsLock.Lock()
+		if runs[id] == current {
+			delete(runs, id)
+		}
+		runsLock.Unlock()
+		close(current.done)
+	}
+}
+
+// stopRun kills the processes of the run of id, if any, and waits for it to end
+func stopRun(id string) {
+	runsLock.Lock()
+	current := runs[id]
+	runsLock.Unlock()
+
+	if current != nil {
+		current.cancel()
+		<-current.done
+	}
+}
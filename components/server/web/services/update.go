@@ -4,6 +4,7 @@ import (
 	"fmt"
 	"net/http"
 	"os"
+	"path/filepath"
 
 	"github.com/gin-gonic/gin"
 )
@@ -40,7 +41,13 @@ func UpdateHandler(c *gin.Context) {
 		}
 	}
 
-	filePath := fmt.Sprintf("%s/%s/%s%s", DataDir, calID, party, "Data.csv")
+	format, staleFormat := "csv", "bin"
+	if filepath.Ext(file.Filename) == ".bin" {
+		format, staleFormat = "bin", "csv"
+	}
+	os.Remove(fmt.Sprintf("%s/%s/%sData.%s", DataDir, calID, party, staleFormat))
+
+	filePath := fmt.Sprintf("%s/%s/%sData.%s", DataDir, calID, party, format)
 	if err := c.SaveUploadedFile(file, filePath); err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
 		return
@@ -1,3 +1,8 @@
 package services
 
 var DataDir string
+
+var HandoffToken string
+
+// LinkRoot is the resolved directory /link takes files from, empty when /link is disabled
+var LinkRoot string
@@ -27,35 +27,63 @@ func VerifyHandler(c *gin.Context) {
 		return
 	}
 
+	// a dropped request or a /delete of the id kills the processes of the run
+	ctx, finish := startRun(c.Request.Context(), params.ID)
+	defer finish()
+	params.Ctx = ctx
+
 	basePath := DataDir + "/" + params.ID + "/"
 
-	_, err := os.Stat(basePath + "AliceData.csv")
+	params.Format = "csv"
+	_, err := os.Stat(basePath + "AliceData.bin")
+	if err == nil {
+		params.Format = "bin"
+	}
+	ext := "." + params.Format
+
+	_, err = os.Stat(basePath + "AliceData" + ext)
 	if err != nil && os.IsNotExist(err) {
 		c.JSON(http.StatusBadRequest, gin.H{"error": "no Alice's data on server"})
 		return
 	}
 
-	_, err = os.Stat(basePath + "BobData.csv")
+	_, err = os.Stat(basePath + "BobData" + ext)
 	if err != nil && os.IsNotExist(err) {
 		c.JSON(http.StatusBadRequest, gin.H{"error": "no Bob's data on server"})
 		return
 	}
 
 	resultDataExist := true
-	_, err = os.Stat(basePath + "ResultData.csv")
+	_, err = os.Stat(basePath + "ResultData" + ext)
 	if err != nil && os.IsNotExist(err) {
 		resultDataExist = false
 	}
 
+	transferData := utils.TransferData
+	if params.Format == "bin" {
+		transferData = utils.TransferBinaryData
+	}
+
 	if params.Operate == 6 {
-		err := utils.TransferData(basePath + "AliceData.csv")
+		// the logarithm is taken in place, files handed over by /link are copied first
+		for _, party := range []string{"AliceData", "ResultData"} {
+			if party == "ResultData" && !resultDataExist {
+				continue
+			}
+			if err := utils.DetachFile(basePath + party + ext); err != nil {
+				c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
+				return
+			}
+		}
+
+		err := transferData(basePath + "AliceData" + ext)
 		if err != nil {
 			c.JSON(http.StatusBadRequest, gin.H{"error": err.Error()})
 			return
 		}
 
 		if resultDataExist {
-			err := utils.TransferData(basePath + "ResultData.csv")
+			err := transferData(basePath + "ResultData" + ext)
 			if err != nil {
 				c.JSON(http.StatusBadRequest, gin.H{"error": err.Error()})
 				return
@@ -79,8 +107,13 @@ func VerifyHandler(c *gin.Context) {
 		stageShare = cmds.DoShare(params)
 		stageVerify = cmds.DoVerify(params)
 	} else {
-		utils.SplitCSV("AliceData.csv", basePath, params.Workers)
-		utils.SplitCSV("BobData.csv", basePath, params.Workers)
+		splitData := utils.SplitCSV
+		if params.Format == "bin" {
+			splitData = utils.SplitBinary
+		}
+
+		splitData("AliceData"+ext, basePath, params.Workers)
+		splitData("BobData"+ext, basePath, params.Workers)
 
 		stageShare = cmds.DoShareMultiWorkers(params, params.Workers)
 		stageVerify = cmds.DoVerifyMultiWorkers(params, params.Workers)
@@ -99,8 +132,13 @@ func VerifyHandler(c *gin.Context) {
 		scale = float64(params.Scale)
 	}
 
+	compareResult := utils.CompareResult
+	if params.Format == "bin" {
+		compareResult = utils.CompareBinaryResult
+	}
+
 	if resultDataExist {
-		errorNumber, err = utils.CompareResult(basePath+"ResultData.csv", basePath+"CalResult.txt", finalFilePath, scale)
+		errorNumber, err = compareResult(basePath+"ResultData"+ext, basePath+"CalResult.txt", finalFilePath, scale)
 	} else {
 		err = utils.TxtToCsv(basePath+"CalResult.txt", finalFilePath)
 	}
@@ -0,0 +1,139 @@
+package utils
+
+import (
+	"fmt"
+	"math"
+	"os"
+	"syscall"
+	"unsafe"
+)
+
+// A binary batch is stored column by column in host (little-endian) order:
+// n int64 row numbers followed by n float64 values.
+const binaryRowSize = 16
+
+type BinaryBatch struct {
+	Numbers []int64
+	Data    []float64
+
+	raw []byte
+}
+
+func MapBinaryBatch(filePath string, writable bool) (*BinaryBatch, error) {
+	flag, prot := os.O_RDONLY, syscall.PROT_READ
+	if writable {
+		flag, prot = os.O_RDWR, syscall.PROT_READ|syscall.PROT_WRITE
+	}
+
+	file, err := os.OpenFile(filePath, flag, 0)
+	if err != nil {
+		return nil, err
+	}
+	defer file.Close()
+
+	fileInfo, err := file.Stat()
+	if err != nil {
+		return nil, err
+	}
+
+	size := fileInfo.Size()
+	if size%binaryRowSize != 0 {
+		return nil, fmt.Errorf("binary batch %s has a truncated size of %d bytes", filePath, size)
+	}
+
+	batch := &BinaryBatch{}
+	if size == 0 {
+		return batch, nil
+	}
+
+	raw, err := syscall.Mmap(int(file.Fd()), 0, int(size), prot, syscall.MAP_SHARED)
+	if err != nil {
+		return nil, err
+	}
+
+	rows := int(size / binaryRowSize)
+	batch.raw = raw
+	batch.Numbers = unsafe.Slice((*int64)(unsafe.Pointer(&raw[0])), rows)
+	batch.Data = unsafe.Slice((*float64)(unsafe.Pointer(&raw[rows*8])), rows)
+	return batch, nil
+}
+
+func (b *BinaryBatch) Len() int {
+	return len(b.Numbers)
+}
+
+func (b *BinaryBatch) Close() error {
+	if b.raw == nil {
+		return nil
+	}
+
+	err := syscall.Munmap(b.raw)
+	b.raw, b.Numbers, b.Data = nil, nil, nil
+	return err
+}
+
+func writeBinaryColumns(filePath string, numbers []int64, data []float64) error {
+	file, err := os.Create(filePath)
+	if err != nil {
+		return err
+	}
+	defer file.Close()
+
+	if len(numbers) == 0 {
+		return nil
+	}
+
+	if _, err := file.Write(unsafe.Slice((*byte)(unsafe.Pointer(&numbers[0])), len(numbers)*8)); err != nil {
+		return err
+	}
+	if _, err := file.Write(unsafe.Slice((*byte)(unsafe.Pointer(&data[0])), len(data)*8)); err != nil {
+		return err
+	}
+	return nil
+}
+
+func TransferBinaryData(filePath string) error {
+	batch, err := MapBinaryBatch(filePath, true)
+	if err != nil {
+		return err
+	}
+	defer batch.Close()
+
+	for i, value := range batch.Data {
+		batch.Data[i] = math.Log(value)
+	}
+	return nil
+}
+
+func SplitBinary(filename, base string, parts int) error {
+	batch, err := MapBinaryBatch(base+filename, false)
+	if err != nil {
+		return err
+	}
+	defer batch.Close()
+
+	totalLines := batch.Len()
+	linesPerPart := totalLines / parts
+	if totalLines%parts != 0 {
+		linesPerPart += 1
+	}
+
+	for i := 0; i < parts; i++ {
+		start := i * linesPerPart
+		end := start + linesPerPart
+		if start > totalLines {
+			start = totalLines
+		}
+		if end > totalLines {
+			end = totalLines
+		}
+
+		partFilename := fmt.Sprintf("%d%s", i, filename)
+		err := writeBinaryColumns(base+partFilename, batch.Numbers[start:end], batch.Data[start:end])
+		if err != nil {
+			return err
+		}
+	}
+
+	return nil
+}
@@ -1,6 +1,7 @@
 package utils
 
 import (
+	"context"
 	"encoding/csv"
 	"fmt"
 	"io"
@@ -31,8 +32,12 @@ func CompareSignificantDigits(value1, value2 float64, precision int, scale float
 	return math.Abs(sigDigits1-sigDigits2) <= scale
 }
 
-func RunCommand(cmd string, args ...string) (string, string, int) {
-	command := exec.Command(cmd, args...)
+// RunCommand runs cmd to completion, or kills it once ctx is done
+func RunCommand(ctx context.Context, cmd string, args ...string) (string, string, int) {
+	if ctx == nil {
+		ctx = context.Background()
+	}
+	command := exec.CommandContext(ctx, cmd, args...)
 	stdout, err := command.StdoutPipe()
 	if err != nil {
 		return "", err.Error(), -1
@@ -70,23 +75,11 @@ func CompareResult(toCheckFileName, resultFileName, finalFileName string, scale
 		return -1, err
 	}
 
-	results, err := os.ReadFile(resultFileName)
+	txtValues, err := readResultValues(resultFileName)
 	if err != nil {
 		return -1, err
 	}
 
-	resultData := strings.Split(string(results), "\n")
-	txtValues := make([]float64, 0)
-	for _, line := range resultData {
-		if line != "" {
-			value, err := strconv.ParseFloat(line, 64)
-			if err != nil {
-				return -1, err
-			}
-			txtValues = append(txtValues, value)
-		}
-	}
-
 	checkResultFile, err := os.Create(finalFileName)
 	if err != nil {
 		return -1, err
@@ -113,24 +106,94 @@ func CompareResult(toCheckFileName, resultFileName, finalFileName string, scale
 			return -1, err
 		}
 
-		result := CompareSignificantDigits(dataValue, txtValues[i-1], 6, scale)
+		result, err := writeCompared(writer, number, dataValue, txtValues[i-1], scale)
+		if err != nil {
+			return -1, err
+		}
 		if !result {
-			err = writer.Write([]string{number, fmt.Sprintf("%g", txtValues[i-1])})
 			errorNumber += 1
-		} else {
-			err = writer.Write([]string{number, fmt.Sprintf("%t", result)})
 		}
-		// mistake := math.Abs(dataValue - txtValues[i - 1])
-		// if mistake <= math.Abs(1e-6 * txtValues[i - 1]) { result = true }
+	}
+
+	return errorNumber, nil
+}
+
+func CompareBinaryResult(toCheckFileName, resultFileName, finalFileName string, scale float64) (int, error) {
+	toCheck, err := MapBinaryBatch(toCheckFileName, false)
+	if err != nil {
+		return -1, err
+	}
+	defer toCheck.Close()
+
+	txtValues, err := readResultValues(resultFileName)
+	if err != nil {
+		return -1, err
+	}
+	if len(txtValues) < toCheck.Len() {
+		return -1, fmt.Errorf("got %d calculated values for %d rows", len(txtValues), toCheck.Len())
+	}
+
+	checkResultFile, err := os.Create(finalFileName)
+	if err != nil {
+		return -1, err
+	}
+	defer checkResultFile.Close()
+
+	writer := csv.NewWriter(checkResultFile)
+	defer writer.Flush()
+
+	err = writer.Write([]string{"number", "data"})
+	if err != nil {
+		return -1, err
+	}
 
+	errorNumber := 0
+	for i, dataValue := range toCheck.Data {
+		number := strconv.FormatInt(toCheck.Numbers[i], 10)
+		result, err := writeCompared(writer, number, dataValue, txtValues[i], scale)
 		if err != nil {
 			return -1, err
 		}
+		if !result {
+			errorNumber += 1
+		}
 	}
 
 	return errorNumber, nil
 }
 
+func readResultValues(resultFileName string) ([]float64, error) {
+	results, err := os.ReadFile(resultFileName)
+	if err != nil {
+		return nil, err
+	}
+
+	resultData := strings.Split(string(results), "\n")
+	txtValues := make([]float64, 0, len(resultData))
+	for _, line := range resultData {
+		if line != "" {
+			value, err := strconv.ParseFloat(line, 64)
+			if err != nil {
+				return nil, err
+			}
+			txtValues = append(txtValues, value)
+		}
+	}
+
+	return txtValues, nil
+}
+
+func writeCompared(writer *csv.Writer, number string, dataValue, calValue, scale float64) (bool, error) {
+	result := CompareSignificantDigits(dataValue, calValue, 6, scale)
+	if !result {
+		return result, writer.Write([]string{number, fmt.Sprintf("%g", calValue)})
+	}
+	// mistake := math.Abs(dataValue - calValue)
+	// if mistake <= math.Abs(1e-6 * calValue) { result = true }
+
+	return result, writer.Write([]string{number, fmt.Sprintf("%t", result)})
+}
+
 func ParseOutputToJson(output string) (*gin.H, int, float64) {
 	reComm := regexp.MustCompile(`Communication Cost:\s+(\d+)\s+bytes`)
 	reTime := regexp.MustCompile(`Total Time:\s+([\d.]+)\s+ms`)
@@ -8,6 +8,7 @@ import (
 	"math"
 	"os"
 	"strconv"
+	"syscall"
 )
 
 func TransferData(filePath string) error {
@@ -190,3 +191,39 @@ func MergeTxt(filename, base string, parts int) error {
 
 	return nil
 }
+
+// DetachFile gives a linked file its own copy before it is rewritten in place,
+// so the data shared with the client through /link stays untouched.
+func DetachFile(filePath string) error {
+	linkInfo, err := os.Lstat(filePath)
+	if err != nil {
+		return err
+	}
+
+	stat, ok := linkInfo.Sys().(*syscall.Stat_t)
+	if linkInfo.Mode()&os.ModeSymlink == 0 && (!ok || stat.Nlink <= 1) {
+		return nil
+	}
+
+	source, err := os.Open(filePath)
+	if err != nil {
+		return err
+	}
+	defer source.Close()
+
+	detached, err := os.Create(filePath + ".detached")
+	if err != nil {
+		return err
+	}
+
+	_, err = io.Copy(detached, source)
+	if closeErr := detached.Close(); err == nil {
+		err = closeErr
+	}
+	if err != nil {
+		os.Remove(filePath + ".detached")
+		return err
+	}
+
+	return os.Rename(filePath+".detached", filePath)
+}
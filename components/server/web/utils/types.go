@@ -1,5 +1,7 @@
 package utils
 
+import "context"
+
 type VerifyParams struct {
 	ID      string `form:"id"`
 	Port    string `form:"port"`
@@ -7,4 +9,8 @@ type VerifyParams struct {
 	Workers int    `form:"workers"`
 	Operate int    `form:"operate"`
 	Scale   int    `form:"scale"`
+
+	Format string `form:"-"`
+	// Ctx ends the sharer and verifier processes of the run when it is done
+	Ctx context.Context `form:"-"`
 }
@@ -28,6 +28,54 @@ std::vector<dataType> loadDataFromCsv(std::string& fileName, std::string& basic)
 }
 
 
+// Binary batches hold n int64 row numbers followed by n little-endian float64 values.
+std::vector<dataType> loadDataFromBin(std::string& fileName, std::string& basic) {
+    auto loadFilePath = basic + fileName;
+    std::vector<dataType> dataRows;
+
+    int fd = open(loadFilePath.c_str(), O_RDONLY);
+    if (fd < 0) {
+        std::cerr << "Could not open the file!" << std::endl;
+        return dataRows;
+    }
+
+    struct stat fileStat;
+    if (fstat(fd, &fileStat) < 0 || fileStat.st_size % (sizeof(int64_t) + sizeof(dataType)) != 0) {
+        std::cerr << "Malformed binary batch file!" << std::endl;
+        close(fd);
+        return dataRows;
+    }
+
+    size_t fileSize = fileStat.st_size;
+    size_t rows = fileSize / (sizeof(int64_t) + sizeof(dataType));
+    if (rows == 0) {
+        close(fd);
+        return dataRows;
+    }
+
+    void *mapped = mmap(nullptr, fileSize, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (mapped == MAP_FAILED) {
+        std::cerr << "Could not map the file!" << std::endl;
+        return dataRows;
+    }
+
+    auto dataPtr = reinterpret_cast<const char *>(mapped) + rows * sizeof(int64_t);
+    dataRows.resize(rows);
+    std::memcpy(dataRows.data(), dataPtr, rows * sizeof(dataType));
+
+    munmap(mapped, fileSize);
+    return dataRows;
+}
+
+
+bool isBinaryBatch(const std::string& fileName) {
+    const std::string suffix = ".bin";
+    return fileName.size() >= suffix.size() && 
+        fileName.compare(fileName.size() - suffix.size(), suffix.size(), suffix) == 0;
+}
+
+
 void shareInputData(FPOp *fpOp, int party, std::vector<dataType>& dataVec, std::string& fileName, std::string& basic) {
     auto dataLen = dataVec.size();
 
@@ -86,7 +134,9 @@ int main(int argc, char **argv) {
     auto commStart = iopack->get_comm();
     auto initRounds = iopack->get_rounds();
 
-    auto dataVec = loadDataFromCsv(conf.csvPth, conf.bPth);
+    auto dataVec = isBinaryBatch(conf.csvPth) 
+        ? loadDataFromBin(conf.csvPth, conf.bPth) 
+        : loadDataFromCsv(conf.csvPth, conf.bPth);
     shareInputData(fpOp, conf.role, dataVec, conf.shrPth, conf.bPth);
 
     auto commEnd = iopack->get_comm();
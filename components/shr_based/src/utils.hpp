@@ -4,6 +4,12 @@
 
 #include <iostream>
 #include <fstream>
+#include <cstring>
+
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 #define PUBLIC_ROLE 0
 #define ALICE_ROLE 1
@@ -37,6 +43,7 @@ enum class Operation { ADD, SUB, MUL, DIV, CHEAP_ADD, CHEAP_DIV };
 
 
 std::vector<dataType> loadDataFromCsv(std::string& fileName, std::string& basic);
+std::vector<dataType> loadDataFromBin(std::string& fileName, std::string& basic);
 void shareInputData(FPOp *fpOp, int party, std::vector<dataType>& dataVec, std::string& fileName, std::string& basic);
 
 std::pair<FPArray, FPArray> getArrayFromBinary(FPOp *fpOp, int party, std::string& fileName, std::string& basic);
@@ -0,0 +1,350 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import resource
+import itertools
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app-back-end'))
+
+
+OPERA_DICT = {
+    'add': 0,
+    'sub': 1,
+    'mul': 2,
+    'div': 3,
+    'cadd': 4,
+    'cdiv': 5,
+    'exp': 6
+}
+
+BENCH_TASK_ID = "bench"
+
+
+# ---- stand-in for the Go verifier -------------------------------------------------------------
+
+def load_batch(path_stem: str) -> pd.DataFrame:
+    if os.path.exists(path_stem + '.csv'):
+        return pd.read_csv(path_stem + '.csv')
+
+    raw = np.fromfile(path_stem + '.bin', dtype='<f8')
+    rows = len(raw) // 2
+    return pd.DataFrame({'number': raw[:rows].view('<i8'), 'data': raw[rows:]})
+
+
+def fake_verifier(data_dir: str, latency: float, row_latency: float, mistake_rate: float):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import FileResponse
+
+    app = FastAPI()
+
+    @app.post("/update")
+    async def update(request: Request):
+        # the pure Python multipart parser would dominate the timings, a batch is split by hand instead
+        boundary = b'--' + request.headers['content-type'].split('boundary=')[1].strip('"').encode()
+        fields, file_name, content = {}, None, b''
+        for part in (await request.body()).split(boundary)[1:-1]:
+            head, _, value = part.partition(b'\r\n\r\n')
+            name = re.search(rb'name="([^"]*)"', head).group(1).decode()
+            if name == 'file':
+                file_name, content = re.search(rb'filename="([^"]*)"', head).group(1).decode(), value[:-2]
+            else:
+                fields[name] = value[:-2].decode()
+
+        os.makedirs(os.path.join(data_dir, fields['id']), exist_ok=True)
+        ext = '.bin' if file_name.endswith('.bin') else '.csv'
+        with open(os.path.join(data_dir, fields['id'], f"{fields['party']}Data{ext}"), 'wb') as f:
+            f.write(content)
+        return {"message": "File uploaded successfully"}
+
+    def compare(id: str, operate: int):
+        base = os.path.join(data_dir, id)
+        df_a, df_b, df_r = (load_batch(os.path.join(base, f"{party}Data")) for party in ('Alice', 'Bob', 'Result'))
+        data_a, data_b = df_a['data'].to_numpy(), df_b['data'].to_numpy()
+        calculated = [
+            data_a + data_b, data_a - data_b, data_a * data_b, data_a / data_b,
+            data_a + data_b, data_a / data_b, data_a ** data_b
+        ][operate]
+
+        # a deterministic share of the rows is reported as wrong, like a broken computation would be
+        numbers = df_r['number'].to_numpy(dtype=np.int64)
+        broken = (numbers.astype(np.uint64) * np.uint64(2654435761) % np.uint64(2 ** 32)) < mistake_rate * 2 ** 32
+        checked = np.isclose(calculated, df_r['data'].to_numpy(), rtol=1e-6) & ~broken
+
+        output = np.full(len(numbers), 'true', dtype=object)
+        output[~checked] = [f'{value:g}' for value in calculated[~checked]]
+        pd.DataFrame({'number': numbers, 'data': output}).to_csv(os.path.join(base, "finalResult.csv"), index=False)
+        return len(numbers), int((~checked).sum())
+
+    @app.get("/verify")
+    async def verify(id: str, operate: int, workers: int = 8, scale: int = 1, port: str = "9050"):
+        started = time.time()
+        rows, errors = await asyncio.to_thread(compare, id, operate)
+        await asyncio.sleep(max(latency + row_latency * rows - (time.time() - started), 0.))
+
+        output = {"comm_cost": rows * 64, "total_time": (time.time() - started) * 1000}
+        info = {"output_alice": output, "output_bob": output, "error_alice": [], "error_bob": []}
+        return {"share_info": info, "verify_info": info, "checked_errors": errors}
+
+    @app.get("/result")
+    async def result(id: str):
+        return FileResponse(os.path.join(data_dir, id, "finalResult.csv"), media_type="text/csv")
+
+    return app
+
+
+def serve_fake(args):
+    import uvicorn
+
+    app = fake_verifier(args.fake_dir, args.latency, args.row_latency, args.mistake_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="error")
+
+
+def start_fake(args):
+    fake_dir = os.path.join(args.work_dir, "fake")
+    os.makedirs(fake_dir, exist_ok=True)
+    process = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "fake",
+        "--port", str(args.port),
+        "--fake-dir", fake_dir,
+        "--latency", str(args.latency),
+        "--row-latency", str(args.row_latency),
+        "--mistake-rate", str(args.mistake_rate),
+    ])
+
+    import httpx
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/docs", timeout=1.)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Fake verifier didn't start on port {args.port}.")
+
+
+# ---- input data ---------------------------------------------------------------------------------
+
+def prepare_data(rows: int, operator: str, data_dir: Path, seed: int):
+    from web.services.generate import generate_chunk, concat_parts, GEN_CHUNK_ROWS
+
+    data_dir = data_dir / f"{operator}_{rows}"
+    if (data_dir / "done").exists():
+        return data_dir
+
+    part_dir = data_dir / "gen"
+    os.makedirs(part_dir, exist_ok=True)
+
+    n_chunks = (rows + GEN_CHUNK_ROWS - 1) // GEN_CHUNK_ROWS
+    seed_seqs = np.random.SeedSequence(seed).spawn(n_chunks)
+    with ProcessPoolExecutor() as executor:
+        chunks = list(executor.map(
+            generate_chunk,
+            itertools.repeat(str(part_dir)),
+            range(n_chunks),
+            (x * GEN_CHUNK_ROWS for x in range(n_chunks)),
+            (min(GEN_CHUNK_ROWS, rows - x * GEN_CHUNK_ROWS) for x in range(n_chunks)),
+            itertools.repeat(operator),
+            seed_seqs
+        ))
+
+    for party in ("Alice", "Bob", "Result"):
+        concat_parts(data_dir / f"{party}.csv", [chunk[party] for chunk in chunks])
+    shutil.rmtree(part_dir)
+
+    (data_dir / "done").touch()
+    return data_dir
+
+
+# ---- one measured configuration ----------------------------------------------------------------
+
+STAGE_NAMES = {"1/4": "sample", "2/4": "split", "3/4": "verify", "4/4": "combine"}
+
+
+class StageClock(dict):
+    # stands in for the task store and stamps the time whenever verify_serv moves to a new stage
+    def __init__(self):
+        super().__init__()
+        self.marks = []
+
+    def __setitem__(self, id: str, record):
+        super().__setitem__(id, record)
+        self.save(id)
+
+    def save(self, id: str):
+        stage = self[id].get("stage")
+        if not self.marks or self.marks[-1][0] != stage:
+            self.marks.append((stage, time.perf_counter()))
+
+    def stage_times(self, end: float):
+        return {
+            STAGE_NAMES[stage]: round(next_mark - mark, 4)
+            for (stage, mark), (_, next_mark) in zip(self.marks, self.marks[1:] + [(None, end)])
+            if stage in STAGE_NAMES
+        }
+
+
+async def measure(config):
+    from starlette.datastructures import UploadFile
+    from web.services.update import update_serv
+    from web.services.verify import verify_serv
+    from web.utils.http import close_client
+
+    data_dir = Path(config["data_dir"])
+    dir_out = Path(config["work_dir"]) / "seq_data"
+    shutil.rmtree(dir_out / BENCH_TASK_ID, ignore_errors=True)
+
+    tasks = StageClock()
+    started = time.perf_counter()
+    for party in ("Alice", "Bob", "Result"):
+        with open(data_dir / f"{party}.csv", 'rb') as f:
+            await update_serv(UploadFile(f, filename=f"{party}.csv"), BENCH_TASK_ID, party, tasks, dir_out)
+    ingested = time.perf_counter()
+
+    try:
+        result = await verify_serv(
+            BENCH_TASK_ID,
+            config["operator"],
+            None,
+            config["split_n"],
+            config["workers"],
+            1,
+            0.9999,
+            0.001,
+            tasks,
+            OPERA_DICT,
+            dir_out,
+            config["uri"],
+            True,
+            window=config["window"],
+            batch_format=config["batch_format"],
+            seed=config["seed"]
+        )
+    finally:
+        await close_client()
+    finished = time.perf_counter()
+
+    stages = {"ingest": round(ingested - started, 4), **tasks.stage_times(finished)}
+    return {
+        **{key: config[key] for key in ("commit", "rows", "split_n", "workers", "window", "batch_format", "operator")},
+        "split_n_used": tasks[BENCH_TASK_ID]["checkpoint"]["split_n"],
+        "sample_size": tasks[BENCH_TASK_ID]["checkpoint"]["sample_size"],
+        "mistakes": result["checked_mistakes"],
+        "stages": stages,
+        "total_s": round(finished - started, 4),
+        "rows_per_s": round(config["rows"] / (finished - started), 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_one(args):
+    config = json.loads(args.config)
+    try:
+        record = asyncio.run(measure(config))
+    except Exception as e:
+        record = {**config, "error": str(e)}
+    finally:
+        shutil.rmtree(Path(config["work_dir"]) / "seq_data" / BENCH_TASK_ID, ignore_errors=True)
+    print(json.dumps(record))
+
+
+# ---- sweep -------------------------------------------------------------------------------------
+
+def current_commit():
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+    )
+    return result.stdout.strip() or None
+
+
+def sweep(args):
+    os.makedirs(args.work_dir, exist_ok=True)
+    output = open(args.output, 'a') if args.output else sys.stdout
+    fake = start_fake(args)
+    commit = current_commit()
+
+    try:
+        for rows in args.rows:
+            print(f"Preparing {rows} rows...", file=sys.stderr)
+            data_dir = prepare_data(rows, args.operator, Path(args.work_dir) / "data", args.seed)
+
+            for split_n, workers in itertools.product(args.split_n, args.workers):
+                config = {
+                    "commit": commit,
+                    "rows": rows,
+                    "split_n": split_n,
+                    "workers": workers,
+                    "window": args.window,
+                    "batch_format": args.batch_format,
+                    "operator": args.operator,
+                    "seed": args.seed,
+                    "uri": f"http://127.0.0.1:{args.port}",
+                    "data_dir": str(data_dir),
+                    "work_dir": args.work_dir,
+                }
+                print(f"Running {rows} rows, split_n={split_n}, workers={workers}...", file=sys.stderr)
+
+                # every configuration gets a fresh process, so its peak RSS is its own
+                result = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "one", "--config", json.dumps(config)],
+                    capture_output=True, text=True
+                )
+                lines = result.stdout.strip().splitlines()
+                record = lines[-1] if lines else json.dumps({**config, "error": result.stderr[-1000:]})
+                print(record, file=output, flush=True)
+
+    finally:
+        fake.terminate()
+        fake.wait()
+        if output is not sys.stdout:
+            output.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against a local stand-in verifier")
+    subparsers = parser.add_subparsers(dest="command")
+
+    for name in ("sweep", "fake"):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--port', type=int, default=9900, help="Port of the stand-in verifier")
+        sub.add_argument('--latency', type=float, default=0.5, help="Simulated compute seconds per batch")
+        sub.add_argument('--row-latency', type=float, default=1e-6, help="Simulated compute seconds per row")
+        sub.add_argument('--mistake-rate', type=float, default=0.001, help="Share of rows reported as wrong")
+
+    sweep_parser = subparsers.choices["sweep"]
+    sweep_parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000, 100_000_000], help="Data lengths")
+    sweep_parser.add_argument('--split-n', type=int, nargs='+', default=[0], help="Split numbers, 0 is auto")
+    sweep_parser.add_argument('--workers', type=int, nargs='+', default=[8], help="Verify workers")
+    sweep_parser.add_argument('--window', type=int, default=2, help="Batches verified concurrently")
+    sweep_parser.add_argument('--batch-format', type=str, default='csv', help="Batch format: csv or bin")
+    sweep_parser.add_argument('-o', '--operator', type=str, default='mul', help=f"Operator: {list(OPERA_DICT.keys())}")
+    sweep_parser.add_argument('--seed', type=int, default=0, help="Seed of the data and of the sample")
+    sweep_parser.add_argument('-d', '--work-dir', type=str, default='./bench/', help="Data and output dir")
+    sweep_parser.add_argument('-f', '--output', type=str, default=None, help="Append JSON lines here instead of stdout")
+
+    subparsers.choices["fake"].add_argument('--fake-dir', type=str, required=True, help="Data dir of the stand-in verifier")
+    subparsers.add_parser("one").add_argument('--config', type=str, required=True, help="Configuration as JSON")
+
+    args = parser.parse_args(sys.argv[1:] or ["sweep"])
+    if args.command == "fake":
+        serve_fake(args)
+    elif args.command == "one":
+        run_one(args)
+    else:
+        sweep(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,36 @@
-import dask.dataframe as dd
-import dask.array as da
+import os
+import sys
 import argparse
 
-from dask.diagnostics import ProgressBar
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app-back-end'))
 
+from web.utils.operate import operate_files, is_hdf, OPERATOR_UFUNCS, OPERATE_RANGE_ROWS
 
-def do_calculate(file_a, file_b, file_r, operator):
-    df_a = dd.read_hdf(file_a, key='data')
-    df_b = dd.read_hdf(file_b, key='data')
 
-    pbar = ProgressBar()
-    print('Init...')
-    pbar.register()
+def do_calculate(file_a, file_b, file_r, operator, is_csv=None, workers=None, range_rows=OPERATE_RANGE_ROWS):
+    # the result is written like the input unless the format is given, HDF tables or CSV
+    if is_csv is None:
+        is_csv = not is_hdf(file_a)
 
-    data_a = da.from_array(df_a['data'].compute())
-    data_b = da.from_array(df_b['data'].compute())
-
-    df_r = dd.from_array(da.arange(1, data_a.shape[0] + 1), columns=['number'])
-    df_r = df_r.set_index('number')
-
-    pbar.unregister()
-    print('Calculating...', data_a.shape, data_b.shape)
-
-    if operator.lower() == 'add':
-        data_r = data_a + data_b
-    elif operator.lower() == 'sub':
-        data_r = data_a - data_b
-    elif operator.lower() == 'mul':
-        data_r = data_a * data_b
-    elif operator.lower() == 'div':
-        data_r = data_a / data_b
-    elif operator.lower() == 'exp':
-        data_r = data_a ** data_b
-    else:
-        raise ValueError(f"Unsupported operator: {operator}")
-
-    pbar.register()
-    df_r['data'] = data_r.compute()
-    pbar.unregister()
-
-    print('Saving...')
-    pbar.register()
-    df_r.to_hdf(file_r, key='data', mode='w')
-    pbar.unregister()
+    print('Calculating...')
+    rows = operate_files(file_a, file_b, file_r, operator, not is_csv, workers, range_rows)
+    print(f'Calculated {rows} rows.')
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Perform operations on two CSV files.")
-    parser.add_argument('-a', '--file-a', required=True, help="First input CSV file.")
-    parser.add_argument('-b', '--file-b', required=True, help="Second input CSV file.")
-    parser.add_argument('-o', '--operator', required=True, help="Operator to apply.")
-    parser.add_argument('-f', '--file-out', default='result.csv', help="Output CSV file.")
+    parser = argparse.ArgumentParser(description="Perform operations on two CSV or HDF files.")
+    parser.add_argument('-a', '--file-a', required=True, help="First input file.")
+    parser.add_argument('-b', '--file-b', required=True, help="Second input file.")
+    parser.add_argument('-o', '--operator', required=True, help=f"Operator to apply: {list(OPERATOR_UFUNCS)}.")
+    parser.add_argument('-f', '--file-out', default='result.csv', help="Output file.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes, all cores by default.")
+    parser.add_argument('-r', '--range-rows', type=int, default=OPERATE_RANGE_ROWS, help="Rows computed at a time by one worker.")
+    parser.add_argument('--csv', action='store_true', default=None, help="Write CSV whatever the input format.")
     args = parser.parse_args()
 
     import time
     start = time.time()
-    do_calculate(args.file_a, args.file_b, args.file_out, args.operator)
+    do_calculate(args.file_a, args.file_b, args.file_out, args.operator, args.csv, args.workers, args.range_rows)
     print(f"Calculation with operator '{args.operator}' completed successfully! Output saved to {args.file_out}.")
     print(f"Time cost: {time.time() - start}")
 
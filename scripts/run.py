@@ -2,10 +2,9 @@ import os
 import sys
 import time
 import json
-import secrets
+import asyncio
 import argparse
 
-import requests
 import pandas as pd
 # import dask.dataframe as dd
 # import dask.array as da
@@ -16,6 +15,11 @@ from typing import List
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app-back-end'))
+from web.utils.http import post_file, get_request, download_file, close_client, VERIFY_TIMEOUT
+from web.utils.file import combine_results
+from web.utils.sampler import draw_sample, new_seed
+
 
 OPERA_MAP = ['+', '-', '*', '/', "+'", "/'", '^']
 OPERA_DICT = {
@@ -84,17 +88,6 @@ def split_csv(df: pd.DataFrame, file: str, num_parts: int, output_dir: str):
     return part_filenames
 
 
-def post_file(url, file_path, party, file_id):
-    files = { 'file': open(file_path, 'rb') }
-    response = requests.post(url, data={'id': str(file_id), 'party': party}, files=files)
-    return response.text
-
-
-def get_request(url, params):
-    response = requests.get(url, params=params)
-    return response
-
-
 def check_exception(response: str):
     resp_json = json.loads(response)
     if 'error' in resp_json:
@@ -102,19 +95,20 @@ def check_exception(response: str):
         sys.exit(1)
 
 
-def process_files(part_files, file_id, result_dir, operate=2, base_url="http://localhost:9000", workers=8, scale=1):
-    check_exception(post_file(base_url + "/update", part_files['A'], 'Alice', file_id))
-    check_exception(post_file(base_url + "/update", part_files['B'], 'Bob', file_id))
-    check_exception(post_file(base_url + "/update", part_files['R'], 'Result', file_id))
+async def process_files(part_files, file_id, result_dir, operate=2, base_url="http://localhost:9000", workers=8, scale=1):
+    check_exception(await post_file(base_url + "/update", part_files['A'], 'Alice', file_id))
+    check_exception(await post_file(base_url + "/update", part_files['B'], 'Bob', file_id))
+    check_exception(await post_file(base_url + "/update", part_files['R'], 'Result', file_id))
 
-    response = get_request(
+    response = await get_request(
         base_url + "/verify", 
         params={
             'id': str(file_id), 
             'operate': str(operate), 
             'workers': workers,
             'scale': scale
-        }
+        },
+        timeout=VERIFY_TIMEOUT
     )
     verify_response = json.loads(response.text)
     checked_errors = verify_response['checked_errors']
@@ -136,27 +130,46 @@ def process_files(part_files, file_id, result_dir, operate=2, base_url="http://l
     real_time += max(verify_info['output_alice']['total_time'], verify_info['output_bob']['total_time'])
 
     os.makedirs(result_dir, exist_ok=True)
-    response = get_request(base_url + "/result", params={'id': str(file_id)})
     result_file = os.path.join(result_dir, f"result_{file_id}.csv")
-    with open(result_file, 'wb') as f:
-        f.write(response.content)
+    await download_file(base_url + "/result", {'id': str(file_id)}, result_file)
 
-    # response = get_request(base_url + "/delete", params={'id': str(file_id)})
-    # print(f"Delete Response: {response.text}")\
+    # response = await get_request(base_url + "/delete", params={'id': str(file_id)})
+    # print(f"Delete Response: {response.text}")
 
     return result_file, checked_errors, real_comm, real_time
 
 
-def combine_results(result_files, sample_indexes, combined_filename):
-    combined_df = pd.concat(
-        [pd.read_csv(f, dtype={'number': int, 'data': str}) for f in result_files])
-    combined_df['number'] = sample_indexes
-    combined_df['data_numeric'] = pd.to_numeric(combined_df['data'], errors='coerce')
-    combined_df = combined_df.sort_values(by='data_numeric', ascending=True, na_position='last')
-    
-    combined_df = combined_df.drop(columns='data_numeric')
-    combined_df.to_csv(combined_filename, index=False)
-    print(f"combined results saved as {combined_filename}")
+async def verify_batches(split_files, split_n, args):
+    result_file_names = []
+    difference, comm_cost, time_cost = 0, 0, 0.
+
+    try:
+        for x in tqdm(range(split_n), desc='Verifying', ncols=100, ascii=' #'):
+            part_files = {
+                'A': split_files['A'][x],
+                'B': split_files['B'][x],
+                'R': split_files['R'][x]
+            }
+
+            f_name, diff, c_cost, t_cost = await process_files(
+                part_files, 
+                file_id=x+1, 
+                result_dir=args.result_file_dir, 
+                operate=OPERA_DICT[args.operator.lower()], 
+                base_url=args.uri,
+                workers=args.workers, 
+                scale=args.scale
+            )
+
+            result_file_names.append(f_name)
+            difference += diff
+            comm_cost += c_cost
+            time_cost += t_cost
+
+    finally:
+        await close_client()
+
+    return result_file_names, difference, comm_cost, time_cost
 
 
 def main():
@@ -175,6 +188,7 @@ def main():
     parser.add_argument('--confidence-level', type=float, default=0.9999, help="Confidence level setting")
     parser.add_argument('--error-rate', type=float, default=0.001, help="Error rate setting")
     parser.add_argument('--all', action='store_true', default=False, help="Completely check")
+    parser.add_argument('--seed', type=int, default=None, help="Sample seed, to reproduce an earlier run")
     args = parser.parse_args()
 
     files = {
@@ -202,10 +216,10 @@ def main():
 
     if row_count <= 100_0000 or args.all:
         sample_size = row_count
-        sample_indexes = np.arange(1, row_count + 1).tolist()
-    else:
-        np.random.seed(secrets.randbelow(2 ** 32 - 2))
-        sample_indexes = np.random.choice(np.arange(1, row_count + 1), size=sample_size, replace=False).tolist()
+
+    if args.seed is None:
+        args.seed = new_seed()
+    sample_indexes = draw_sample(row_count, sample_size, args.seed)
 
     if args.split_n == 0:   # auto detect
         args.split_n = sample_size // 100_0000
@@ -236,30 +250,9 @@ def main():
         part_files = split_csv(dfs[label], file, args.split_n, args.dir_out)
         split_files[label] = part_files
 
-    result_file_names = []
-    difference, comm_cost, time_cost = 0, 0, 0.
-
-    for x in tqdm(range(args.split_n), desc='Verifying', ncols=100, ascii=' #'):
-        part_files = {
-            'A': split_files['A'][x],
-            'B': split_files['B'][x],
-            'R': split_files['R'][x]
-        }
-
-        f_name, diff, c_cost, t_cost = process_files(
-            part_files, 
-            file_id=x+1, 
-            result_dir=args.result_file_dir, 
-            operate=OPERA_DICT[args.operator.lower()], 
-            workers=args.workers, 
-            scale=args.scale
-        )
-
-        result_file_names.append(f_name)
-        difference += diff
-        comm_cost += c_cost
-        time_cost += t_cost
-        time.sleep(0.1)
+    result_file_names, difference, comm_cost, time_cost = asyncio.run(
+        verify_batches(split_files, args.split_n, args)
+    )
 
     total_mistake_rate = float(difference) / sample_size
     if row_count <= 100_0000 or args.all:
@@ -276,12 +269,14 @@ def main():
     print(f'\tmistake rate of the calculation result - '
           f'{round(total_mistake_rate * 100, 4)}% ± {round(args.error_rate * 100, 2)}%')
     print(f'\tconfidence level of checking - {args.confidence_level * 100}%')
+    print(f'\tsample seed - {args.seed}')
     print(f'\terror rate of checking - {args.error_rate * 100}%')
     print(f'\tcalculation comm cost - {comm_cost} bits')
     print(f'\tcalculation time cost - {time_cost} ms')
     
     print('Saving...', end=' ')
-    combine_results(result_file_names, sample_indexes, args.combined_file)
+    combine_results(result_file_names, args.combined_file, sample_indexes, mismatches_first=True)
+    print(f"combined results saved as {args.combined_file}")
 
 
 if __name__ == "__main__":